@@ -0,0 +1,120 @@
+"""Асинхронный HTTP-клиент к симулятору поверх requests
+
+Запросы выполняет requests.Session в потоках (asyncio.to_thread), поэтому
+цикл событий не блокируется, а разбор ответов (chunked, gzip, keep-alive)
+остаётся на requests и urllib3. Соединения с каждым сервером держатся
+открытыми и переиспользуются; одновременно выполняется не больше
+pool_size запросов.
+"""
+
+import asyncio
+import json
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Сколько запросов выполняется одновременно (и соединений с одним сервером)
+HTTP_POOL_SIZE = 16
+
+# Время ожидания соединения и каждого чтения ответа, с
+HTTP_TIMEOUT = 5.0
+
+
+class HttpError(Exception):
+    """Ответ с кодом ошибки (4xx, 5xx)"""
+
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.body = body
+
+
+class AsyncHttpClient:
+    """Пул постоянных соединений; один клиент на весь цикл событий"""
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = asyncio.Semaphore(pool_size)
+        self._closed_connections = 0  # соединения пулов, закрытых в close()
+        self.requests = 0
+
+    @property
+    def connections_opened(self):
+        """Сколько соединений открыто за всё время работы клиента"""
+        return self._closed_connections + self._pool_connections()
+
+    def _pool_connections(self):
+        total = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    total += pool.num_connections
+        return total
+
+    async def request(self, method, url, params=None, body=None, headers=None):
+        """(код ответа, заголовки, тело) для запроса; заголовки - в нижнем регистре"""
+        async with self._slots:
+            self.requests += 1
+            response = await asyncio.to_thread(
+                self.session.request,
+                method,
+                url,
+                params=params,
+                data=body,
+                headers=headers,
+                timeout=self.timeout,
+            )
+        if response.status_code >= 400:
+            raise HttpError(response.status_code, response.content)
+        headers = {name.lower(): value for name, value in response.headers.items()}
+        return response.status_code, headers, response.content
+
+    async def iter_lines(self, url, params=None):
+        """Строки тела ответа на GET по мере поступления (например, /stream)
+
+        Бесконечный ответ не занимает место среди pool_size запросов и
+        закрывается вместе с генератором. Время ожидания ограничивает
+        каждое чтение, а не весь ответ.
+        """
+        self.requests += 1
+        response = await asyncio.to_thread(
+            self.session.get,
+            url,
+            params=params,
+            headers={"Accept-Encoding": "identity"},
+            stream=True,
+            timeout=self.timeout,
+        )
+        try:
+            if response.status_code >= 400:
+                raise HttpError(response.status_code, b"")
+            lines = response.iter_lines()
+            while True:
+                line = await asyncio.to_thread(next, lines, None)
+                if line is None:
+                    break
+                yield line.decode("utf-8")
+        finally:
+            response.close()
+
+    async def get_json(self, url, params=None):
+        _, _, body = await self.request("GET", url, params=params)
+        return json.loads(body)
+
+    async def post_json(self, url, data):
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        _, _, body = await self.request(
+            "POST", url, body=body, headers={"Content-Type": "application/json"}
+        )
+        return json.loads(body) if body else None
+
+    async def close(self):
+        self._closed_connections += self._pool_connections()
+        self.session.close()
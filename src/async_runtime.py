@@ -0,0 +1,707 @@
+"""Сущности АРПБТ в одном процессе на asyncio
+
+    python -m src.async_runtime --vehicles 20 --duration 30
+    python -m src.async_runtime --vehicles 20 --duration 30 --processes
+
+Те же сущности и сообщения Event, что в src/entities.py, но вместо
+процесса с очередью multiprocessing у каждой сущности своя очередь
+asyncio.Queue и своя задача в общем цикле событий. Сообщения доставляются
+маршрутизатором (entities.MessageRouter) сразу, без диспетчера и pickle,
+запросы к симулятору идут через общий пул постоянных соединений
+(async_http.AsyncHttpClient), остановка - сообщением в очередь сущности.
+
+Позиции и команды идут в двоичном формате (src/wire.py), а у машин парка
+собираются в общие запросы /vehicles/batch (см. SimulatorLink).
+
+Изоляции процессов здесь нет: сущности делят память и интерпретатор.
+Где она нужна (модель безопасности с монитором), остаётся вариант с
+процессами - в командной строке он включается флагом --processes.
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import sys
+from collections import OrderedDict
+from multiprocessing import Queue
+from time import monotonic, sleep
+
+import requests
+
+# Запуск как скрипта (python src/async_runtime.py) тоже поддерживается
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import entities, wire
+from src.async_http import AsyncHttpClient, HttpError
+from src.entities import (
+    METRICS_REPORT_INTERVAL,
+    ControlSystem,
+    Drill,
+    MessageRouter,
+    QueueManage,
+)
+from src.events import ControlEvent, Event
+from src.recorder import MissionRecorder
+from src.telemetry_client import OBSTACLE_CHUNK, SIMULATOR_URL
+
+__all__ = [
+    "AsyncRuntime",
+    "Communication",
+    "ControlSystem",
+    "Drill",
+    "Navigation",
+    "Sensors",
+    "Servos",
+    "SimulatorLink",
+    "load_config",
+]
+
+# Ошибки запроса к симулятору, после которых сущность просто ждёт следующего такта
+REQUEST_ERRORS = (OSError, asyncio.TimeoutError, HttpError, ValueError)
+
+# Загруженные карты: (сервер, ETag заголовка карты) -> карта. Машины одного
+# симулятора получают один и тот же список препятствий, поэтому и индекс
+# препятствий (geometry.get_obstacle_index) у них общий.
+_configs = {}
+_loading = {}  # те же ключи -> задача загрузки, которая ещё идёт
+
+_BINARY_ACCEPT = {"Accept": wire.CONTENT_TYPE}
+_BINARY_BATCH = {"Content-Type": wire.CONTENT_TYPE, "Accept": wire.CONTENT_TYPE}
+_BINARY_BODY = {"Content-Type": wire.CONTENT_TYPE}
+
+# Ответ симулятора, который не принимает двоичную команду (Unsupported Media Type);
+# 400 - испорченная команда, её JSON-повтор ничего не исправит
+_UNSUPPORTED = (415,)
+
+
+async def _maybe(result):
+    # обработчики и такты сущностей могут быть обычными функциями и корутинами
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
+def _split_vehicle(url):
+    # (адрес симулятора, номер машины) для адреса машины парка .../vehicles/<id>
+    base, separator, vehicle = url.rpartition("/vehicles/")
+    if separator and vehicle.isdigit():
+        return base, int(vehicle)
+    return url, None
+
+
+async def _fetch_config(http, url, header, chunk_size):
+    config = dict(header)
+    total = config.pop("obstacle_count")
+    config["obstacles"] = []
+    while len(config["obstacles"]) < total:
+        chunk = await http.get_json(
+            f"{url}/obstacles",
+            params={"start": len(config["obstacles"]), "count": chunk_size},
+        )
+        if not chunk["obstacles"]:
+            break
+        config["obstacles"].extend(chunk["obstacles"])
+    return config
+
+
+async def load_config(http, url=SIMULATOR_URL, chunk_size=OBSTACLE_CHUNK):
+    """Карта шахты, как telemetry_client.get_config, но одна на все машины
+
+    Заголовок карты запрашивается всегда, препятствия - только если карту
+    с таким ETag ещё никто не загрузил и не загружает сейчас.
+    """
+    _, headers, body = await http.request(
+        "GET", f"{url}/config", params={"obstacles": 0}
+    )
+    header = json.loads(body)
+    key = (_split_vehicle(url)[0], headers.get("etag"))
+    if key in _configs:
+        return _configs[key]
+    task = _loading.get(key)
+    if task is None:
+        task = _loading[key] = asyncio.ensure_future(
+            _fetch_config(http, url, header, chunk_size)
+        )
+        task.add_done_callback(lambda _: _loading.pop(key, None))
+    # shield: отмена одной машины не прерывает загрузку для остальных
+    config = await asyncio.shield(task)
+    _configs[key] = config
+    return config
+
+
+class _Batch:
+    def __init__(self):
+        self.positions = {}  # номер машины -> future с позицией
+        self.commands = []  # (номер машины, команда, future)
+
+
+class SimulatorLink:
+    """Запросы сущностей к симулятору: двоичный формат и пакеты
+
+    Позиция запрашивается в двоичном формате, команда приводам
+    отправляется в нём же (старому симулятору - в JSON). Запросы машин
+    парка (адреса .../vehicles/<id>), пришедшие за одну итерацию цикла
+    событий, уходят одним запросом /vehicles/batch, а Navigation и
+    Sensors одной машины получают одну и ту же позицию. Если симулятор
+    не знает /vehicles/batch, запросы идут по одному. Машина вне парка
+    получает координаты из потока /stream, а показания датчиков - из /telemetry.
+    """
+
+    def __init__(self, http, batch=True):
+        self.http = http
+        self.batch = batch
+        self.batches = 0  # отправлено пакетов
+        self.batched = 0  # запросов в них
+        self._pending = {}  # адрес симулятора -> _Batch
+        self._no_batch = set()
+        self._json_only = set()
+
+    def in_batches(self, url):
+        """Запросы машины по адресу url уходят в пакетах /vehicles/batch"""
+        base, vehicle_id = _split_vehicle(url)
+        return self.batch and vehicle_id is not None and base not in self._no_batch
+
+    def _batch_for(self, url):
+        base, vehicle_id = _split_vehicle(url)
+        if not self.in_batches(url):
+            return None, vehicle_id
+        batch = self._pending.get(base)
+        if batch is None:
+            batch = self._pending[base] = _Batch()
+            # всё, что запросят до следующей итерации цикла, уйдёт вместе
+            asyncio.get_running_loop().call_soon(
+                lambda: asyncio.ensure_future(self._send(base))
+            )
+        return batch, vehicle_id
+
+    async def position(self, url):
+        """{"x", "y", "tick"} машины по адресу url"""
+        batch, vehicle_id = self._batch_for(url)
+        if batch is None:
+            return await self._get_position(url)
+        future = batch.positions.get(vehicle_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            batch.positions[vehicle_id] = future
+        # shield: отмена одной сущности не отменяет позицию для другой
+        return await asyncio.shield(future)
+
+    async def set_velocity(self, url, data):
+        """Команда {"speed", "direction", "trace"} машине по адресу url"""
+        batch, vehicle_id = self._batch_for(url)
+        if batch is None:
+            return await self._post_velocity(url, data)
+        future = asyncio.get_running_loop().create_future()
+        batch.commands.append((vehicle_id, data, future))
+        await asyncio.shield(future)
+
+    async def telemetry(self, url, sectors, detect_range):
+        """{"tick", "x", "y", "distances"} из /telemetry в двоичном формате"""
+        _, headers, body = await self.http.request(
+            "GET",
+            f"{url}/telemetry",
+            params={
+                "fields": "tick,x,y,distances",
+                "sectors": sectors,
+                "range": detect_range,
+            },
+            headers=_BINARY_ACCEPT,
+        )
+        if headers.get("content-type") == wire.CONTENT_TYPE:
+            return wire.unpack_telemetry(body)
+        return json.loads(body)
+
+    async def stream(self, url, rate):
+        """Снимки {"x", "y", "tick"} из потока /stream (Server-Sent Events)
+
+        Как telemetry_client.iter_stream; HttpError 404 - потока нет.
+        """
+        data = []
+        async for line in self.http.iter_lines(f"{url}/stream", {"rate": rate}):
+            if line.startswith("data:"):
+                data.append(line[5:].lstrip())
+            elif not line and data:
+                snapshot = json.loads("\n".join(data))
+                data = []
+                yield {"x": snapshot["x"], "y": snapshot["y"], "tick": snapshot["tick"]}
+
+    async def _get_position(self, url):
+        _, headers, body = await self.http.request(
+            "GET", f"{url}/position", headers=_BINARY_ACCEPT
+        )
+        if headers.get("content-type") == wire.CONTENT_TYPE:
+            return wire.unpack_position(body)
+        return json.loads(body)
+
+    async def _post_velocity(self, url, data):
+        if url not in self._json_only:
+            try:
+                await self.http.request(
+                    "POST",
+                    f"{url}/set_velocity",
+                    body=wire.pack_velocity(data),
+                    headers=_BINARY_BODY,
+                )
+                return
+            except HttpError as e:
+                if e.status not in _UNSUPPORTED:
+                    raise
+                self._json_only.add(url)
+        await self.http.post_json(f"{url}/set_velocity", data)
+
+    async def _send(self, base):
+        batch = self._pending.pop(base)
+        commands = [(vehicle_id, data) for vehicle_id, data, _ in batch.commands]
+        try:
+            _, headers, body = await self.http.request(
+                "POST",
+                f"{base}/vehicles/batch",
+                body=wire.pack_batch(commands, list(batch.positions)),
+                headers=_BINARY_BATCH,
+            )
+        except HttpError as e:
+            if e.status == 404:
+                # старый симулятор: этот и следующие запросы - по одному
+                self._no_batch.add(base)
+                await self._send_each(base, batch)
+                return
+            self._fail(batch, e)
+            return
+        except REQUEST_ERRORS as e:
+            self._fail(batch, e)
+            return
+        self.batches += 1
+        self.batched += len(commands) + len(batch.positions)
+
+        if headers.get("content-type") == wire.CONTENT_TYPE:
+            positions = wire.unpack_positions(body)
+        else:
+            positions = {p["id"]: p for p in json.loads(body)["positions"]}
+        for vehicle_id, future in batch.positions.items():
+            if future.done():
+                continue
+            if vehicle_id in positions:
+                future.set_result(positions[vehicle_id])
+            else:
+                future.set_exception(HttpError(404, b"Unknown vehicle"))
+        for *_, future in batch.commands:
+            if not future.done():
+                future.set_result(None)
+
+    async def _send_each(self, base, batch):
+        calls = [
+            (future, self._post_velocity(f"{base}/vehicles/{vehicle_id}", data))
+            for vehicle_id, data, future in batch.commands
+        ] + [
+            (future, self._get_position(f"{base}/vehicles/{vehicle_id}"))
+            for vehicle_id, future in batch.positions.items()
+        ]
+        for future, call in calls:
+            try:
+                result = await call
+            except REQUEST_ERRORS as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _fail(batch, error):
+        futures = list(batch.positions.values())
+        futures += [future for *_, future in batch.commands]
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+
+class Communication(entities.Communication):
+    """Передаёт полётное задание при запуске"""
+
+    def setup(self):
+        print(f"[{self.__class__.__name__}] отправляем новое задание")
+        self.send("ControlSystem", "new_task", self._task)
+
+
+class Navigation(entities.Navigation):
+    # задачи в одном цикле событий не пишут координаты одновременно,
+    # поэтому опрос в tick() просто пропускается, пока идёт поток
+    _streaming = False
+
+    def setup(self):
+        if self._record_path is not None:
+            self._recorder = MissionRecorder(self._record_path)
+        self._stream_task = asyncio.ensure_future(self._follow_stream())
+
+    def teardown(self):
+        self._stream_task.cancel()
+        super().teardown()
+
+    async def _follow_stream(self):
+        while True:
+            try:
+                snapshots = self.link.stream(self.simulator_url, 1 / self.period)
+                async for coordinates in snapshots:
+                    self._streaming = True
+                    self._publish(coordinates)
+            except HttpError as e:
+                if e.status == 404:
+                    # симулятор не отдаёт поток (например, машине парка)
+                    return
+                print(f"[{self.__class__.__name__}] поток /stream: {e}")
+            except REQUEST_ERRORS as e:
+                print(f"[{self.__class__.__name__}] поток /stream: {e}")
+            finally:
+                self._streaming = False
+            await asyncio.sleep(entities.STREAM_RETRY_INTERVAL)
+
+    async def tick(self):
+        if self._streaming:
+            return
+        try:
+            coordinates = await self.link.position(self.simulator_url)
+        except REQUEST_ERRORS as e:
+            print(f"[{self.__class__.__name__}]Ошибка запроса: {e}")
+            return
+        self._publish(coordinates)
+
+
+class Sensors(entities.Sensors):
+    # машины в одном процессе делят кэш показаний датчиков
+    shared_readings = OrderedDict()
+
+    async def setup(self):
+        if self._record_path is not None:
+            self._recorder = MissionRecorder(self._record_path)
+        if self.link.in_batches(self.simulator_url):
+            # позиция машины парка приходит в одном пакете с позицией для
+            # Navigation, поэтому датчики считаются на месте
+            self._remote = False
+            self._use_config(await load_config(self.http, self.simulator_url))
+
+    async def tick(self):
+        try:
+            if self._remote:
+                telemetry = await self._remote_reading()
+                if telemetry is not None:
+                    self._publish(telemetry, telemetry["distances"])
+                    return
+            if self._cache is None:
+                self._use_config(await load_config(self.http, self.simulator_url))
+            coordinates = await self.link.position(self.simulator_url)
+        except REQUEST_ERRORS as e:
+            print(f"[{self.__class__.__name__}]Ошибка запроса: {e}")
+            return
+        self._publish(coordinates)
+
+    async def _remote_reading(self):
+        try:
+            return await self.link.telemetry(
+                self.simulator_url, self.num_sectors, self.max_detect_distance
+            )
+        except HttpError as e:
+            if e.status != 404:
+                raise
+        self._remote = False
+        return None
+
+
+class Servos(entities.Servos):
+    def _latest_command(self, event):
+        # пока шёл запрос, в очереди могли накопиться новые команды
+        deferred = []
+        while not self._inbox.empty():
+            pending = self._inbox.get_nowait()
+            if isinstance(pending, Event) and pending.operation == "set_velocity":
+                pending.consumed = monotonic()
+                event = pending
+            else:
+                deferred.append(pending)
+        for pending in deferred:
+            self._inbox.put_nowait(pending)
+        return event
+
+    async def on_set_velocity(self, event):
+        data = self._command_data(self._latest_command(event))
+        try:
+            await self.link.set_velocity(self.simulator_url, data)
+        except REQUEST_ERRORS as e:
+            print(f"[{self.__class__.__name__}]Ошибка запроса: {e}")
+
+
+class AsyncRuntime:
+    """Сущности одной машины с общей шиной сообщений в цикле событий asyncio
+
+    Сущности создаются с очередью событий runtime.bus и регистрируются
+    через add. Подходят и сущности из src/entities.py, и их потомки
+    (например, модуль безопасности из тетрадки): обработчики on_<op>, setup,
+    tick и teardown могут быть как функциями, так и корутинами. Несколько
+    машин - несколько AsyncRuntime с общим link (и его http) в одном цикле
+    событий: тогда их запросы к симулятору объединяются в пакеты.
+    """
+
+    def __init__(
+        self,
+        http=None,
+        policy=None,
+        link=None,
+        record_path=None,
+        report_url=None,
+        report_interval=METRICS_REPORT_INTERVAL,
+    ):
+        if link is not None:
+            http = link.http
+        self.http = http if http is not None else AsyncHttpClient()
+        self.link = link if link is not None else SimulatorLink(self.http)
+        self.bus = MessageRouter(policy)
+        self.entities = []
+        self._record_path = record_path
+        self._report_url = report_url
+        self._report_interval = report_interval
+        self._stopped = None
+
+    def add(self, entity):
+        entity._inbox = asyncio.Queue()
+        entity.http = self.http
+        entity.link = self.link
+        self.bus.routes[entity.__class__.__name__] = entity._inbox.put_nowait
+        self.entities.append(entity)
+        return entity
+
+    async def _run_entity(self, entity):
+        name = entity.__class__.__name__
+        print(f"[{name}] старт")
+        entity._bind_handlers()
+        await _maybe(entity.setup())
+        next_tick = None if entity.period is None else monotonic()
+
+        while True:
+            event = None
+            timeout = None if next_tick is None else max(next_tick - monotonic(), 0)
+            try:
+                # wait_for с нулевым временем не забирает уже пришедшее сообщение
+                if entity._inbox.empty() and timeout != 0:
+                    event = await asyncio.wait_for(entity._inbox.get(), timeout)
+                else:
+                    event = entity._inbox.get_nowait()
+                if isinstance(event, ControlEvent):
+                    if event.operation == "stop":
+                        break
+                else:
+                    await _maybe(entity._handle(event))
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                pass
+            except Exception as e:
+                print(f"[{name}] ошибка обработки {e}, {event}")
+
+            if next_tick is not None and monotonic() >= next_tick:
+                try:
+                    await _maybe(entity.tick())
+                except Exception as e:
+                    print(f"[{name}] ошибка {e}")
+                # пропущенные из-за долгой обработки периоды не навёрстываются
+                next_tick = max(next_tick + entity.period, monotonic())
+
+        await _maybe(entity.teardown())
+        print(f"[{name}] завершение работы")
+
+    async def _report_metrics(self):
+        while not self._stopped.is_set():
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self._report_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.http.post_json(
+                    f"{self._report_url}/metrics", self.bus.report()
+                )
+            except REQUEST_ERRORS:
+                pass
+
+    async def run(self, duration=None):
+        """Работа сущностей до stop() или в течение duration с"""
+        self._stopped = asyncio.Event()
+        if self._record_path is not None:
+            self.bus.recorder = MissionRecorder(self._record_path)
+        tasks = [asyncio.ensure_future(self._run_entity(e)) for e in self.entities]
+        if self._report_url is not None:
+            tasks.append(asyncio.ensure_future(self._report_metrics()))
+        if duration is not None:
+            asyncio.get_running_loop().call_later(duration, self.stop)
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if self.bus.recorder is not None:
+                self.bus.recorder.close()
+                self.bus.recorder = None
+
+    def stop(self):
+        # каждая сущность получает маркер остановки после уже пришедших сообщений
+        self._stopped.set()
+        for entity in self.entities:
+            entity._inbox.put_nowait(ControlEvent(operation="stop"))
+
+
+def _loop_latency(url):
+    # (сумма, число) гистограммы задержки контура управления симулятора
+    totals = {"sum": 0.0, "count": 0}
+    text = requests.get(f"{url}/metrics").text
+    for line in text.splitlines():
+        for suffix in totals:
+            if line.startswith(f"control_loop_latency_seconds_{suffix} "):
+                totals[suffix] = float(line.split()[-1])
+    return totals["sum"], totals["count"]
+
+
+def _rss_kb(pids):
+    # суммарная резидентная память процессов (только Linux)
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                total += next(
+                    int(line.split()[1]) for line in f if line.startswith("VmRSS")
+                )
+        except (OSError, StopIteration):
+            return None
+    return total
+
+
+def _vehicles(url, count):
+    route = requests.post(f"{url}/plan_route", json=[]).json()
+    ids = [requests.post(f"{url}/vehicles", json={}).json()["id"] for _ in range(count)]
+    return route, [f"{url}/vehicles/{vehicle_id}" for vehicle_id in ids]
+
+
+def _remove_vehicles(urls):
+    for vehicle_url in urls:
+        requests.delete(vehicle_url)
+
+
+async def run_fleet(urls, route, duration, policy=None, batch=True):
+    """Сущности всех машин в одном цикле событий; возвращает связь с симулятором"""
+    link = SimulatorLink(AsyncHttpClient(), batch)
+    runtimes = []
+    for url in urls:
+        runtime = AsyncRuntime(policy=policy, link=link)
+        for entity in (
+            Communication(runtime.bus, route),
+            ControlSystem(runtime.bus),
+            Navigation(runtime.bus, simulator_url=url),
+            Sensors(runtime.bus, simulator_url=url),
+            Servos(runtime.bus, url),
+            Drill(runtime.bus),
+        ):
+            runtime.add(entity)
+        runtimes.append(runtime)
+    rss = []
+    loop = asyncio.get_running_loop()
+    loop.call_later(duration * 0.9, lambda: rss.append(_rss_kb([os.getpid()])))
+    await asyncio.gather(*(runtime.run(duration) for runtime in runtimes))
+    await link.http.close()
+    return link, rss[0] if rss else None
+
+
+def run_fleet_processes(urls, route, duration, policy=None):
+    """Те же сущности, каждая в своём процессе; возвращает память процессов"""
+    processes = []
+    for url in urls:
+        events_queue = Queue()
+        queue_manager = QueueManage(events_queue, report_url=None, policy=policy)
+        vehicle = [
+            entities.Communication(events_queue, route),
+            ControlSystem(events_queue),
+            entities.Navigation(events_queue, simulator_url=url),
+            entities.Sensors(events_queue, simulator_url=url),
+            entities.Servos(events_queue, url),
+            Drill(events_queue),
+        ]
+        for entity in vehicle:
+            queue_manager.add_entity_queue(
+                entity.__class__.__name__, entity.entity_queue()
+            )
+        processes.append((queue_manager, vehicle))
+    for queue_manager, vehicle in processes:
+        queue_manager.start()
+        for entity in vehicle:
+            entity.start()
+    sleep(duration * 0.9)
+    pids = [os.getpid()] + [
+        process.pid
+        for queue_manager, vehicle in processes
+        for process in (queue_manager, *vehicle)
+        if process.is_alive()
+    ]
+    rss = _rss_kb(pids)
+    sleep(duration * 0.1)
+    for queue_manager, vehicle in processes:
+        queue_manager.stop()
+        for entity in vehicle[1:]:
+            entity.stop()
+    for queue_manager, vehicle in processes:
+        for process in (queue_manager, *vehicle):
+            process.join()
+    return rss
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=SIMULATOR_URL, help="адрес симулятора")
+    parser.add_argument("--vehicles", type=int, default=1, help="число машин")
+    parser.add_argument("--duration", type=float, default=30, help="время работы, с")
+    parser.add_argument(
+        "--processes",
+        action="store_true",
+        help="каждая сущность в своём процессе (как в тетрадках)",
+    )
+    parser.add_argument(
+        "--no-batch",
+        action="store_true",
+        help="запросы машин по одному, без /vehicles/batch",
+    )
+    args = parser.parse_args(argv)
+
+    route, urls = _vehicles(args.url, args.vehicles)
+    latency_before = _loop_latency(args.url)
+    started = monotonic()
+    try:
+        if args.processes:
+            rss = run_fleet_processes(urls, route, args.duration)
+            connections = None
+        else:
+            link, rss = asyncio.run(
+                run_fleet(urls, route, args.duration, batch=not args.no_batch)
+            )
+            connections = (
+                f"{link.http.connections_opened} на {link.http.requests} запросов"
+            )
+            if link.batches:
+                connections += (
+                    f", в пакетах /vehicles/batch: {link.batched} "
+                    f"(в среднем {link.batched / link.batches:.1f} на пакет)"
+                )
+    finally:
+        _remove_vehicles(urls)
+    elapsed = monotonic() - started
+
+    latency_sum, latency_count = (
+        after - before for after, before in zip(_loop_latency(args.url), latency_before)
+    )
+    print(f"Машин: {len(urls)}, время работы: {elapsed:.1f} с")
+    if rss is not None:
+        print(f"Память процессов: {rss / 1024:.0f} МБ")
+    if latency_count:
+        print(
+            f"Команд приводам: {latency_count:.0f}, задержка контура управления: "
+            f"{latency_sum / latency_count * 1000:.1f} мс"
+        )
+    if connections is not None:
+        print(f"Соединений с симулятором: {connections}")
+
+
+if __name__ == "__main__":
+    main()
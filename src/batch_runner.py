@@ -0,0 +1,224 @@
+"""Пакетный прогон миссий по сетке параметров регулятора, маршрутов и карт
+
+Пример запуска из корня проекта:
+
+    python -m src.batch_runner sweep.json results.npz
+
+Файл сетки (JSON):
+
+    {
+        "maps": {"shaft": "maps/shaft.json"},
+        "routes": {"m1": [{"type": "checkpoint", "x": 321, "y": 42}]},
+        "params": {"safe_distance": [10, 20, 30], "max_speed": [20, 30]},
+        "max_time": 300
+    }
+
+Карты и маршруты задаются прямо в файле или путями к JSON-файлам (карты
+можно сжать gzip, см. src/maps.py). Без "maps" используется карта
+симулятора, без "routes" - маршрут от планировщика.
+Каждый готовый результат сразу дописывается в журнал results.npz.jsonl,
+поэтому прерванный прогон при повторном запуске продолжается с того же места.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Запуск как скрипта (python src/batch_runner.py) тоже поддерживается
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.engine import DEFAULT_DT, run_mission
+from src.maps import load_map
+from src.planner import plan_route
+
+# Параметры, которые передаются в run_mission, а не в регулятор
+MISSION_PARAMS = ("max_speed", "max_detect_distance")
+
+# Параметры update_speed_and_direction
+CONTROLLER_PARAMS = ("stop_radius", "safe_distance", "num_sectors", "cyber_obstacle")
+
+# Столбцы результата из отчёта run_mission
+RESULT_COLUMNS = (
+    "success",
+    "time",
+    "checkpoints",
+    "path_length",
+    "min_clearance",
+    "collisions",
+)
+
+# Карты и маршруты процесса-исполнителя (передаются один раз при запуске)
+_worker = {}
+
+
+def _load(value):
+    # значение из файла сетки: сами данные или путь к JSON-файлу с ними
+    if isinstance(value, str):
+        with open(value, encoding="utf-8") as f:
+            return json.load(f)
+    return value
+
+
+def load_grid(path):
+    """Карты, маршруты и список сценариев из файла сетки"""
+    with open(path, encoding="utf-8") as f:
+        grid = json.load(f)
+
+    if "maps" in grid:
+        maps = {
+            name: load_map(value) if isinstance(value, str) else value
+            for name, value in grid["maps"].items()
+        }
+    else:
+        from src.simulation import CONFIG
+
+        maps = {"default": CONFIG}
+
+    routes = {name: _load(value) for name, value in grid.get("routes", {}).items()}
+
+    params = grid.get("params", {})
+    unknown = set(params) - set(MISSION_PARAMS) - set(CONTROLLER_PARAMS)
+    if unknown:
+        raise SystemExit(f"Неизвестные параметры: {', '.join(sorted(unknown))}")
+    names = sorted(params)
+
+    scenarios = []
+    # сценарии одной карты идут подряд: индекс препятствий в исполнителе
+    # строится заново только при смене карты
+    for map_name in maps:
+        for route_name in routes or [None]:
+            for values in itertools.product(*(params[name] for name in names)):
+                scenario = {
+                    "map": map_name,
+                    "route": route_name,
+                    "params": dict(zip(names, values)),
+                }
+                scenario["key"] = json.dumps(scenario, sort_keys=True)
+                scenarios.append(scenario)
+
+    options = {
+        "max_time": grid.get("max_time", 300.0),
+        "dt": grid.get("dt", DEFAULT_DT),
+    }
+    return maps, routes, scenarios, options
+
+
+def _init_worker(maps, routes, options):
+    _worker.update(maps=maps, routes=routes, options=options, planned={})
+
+
+def run_scenario(scenario):
+    """Прогон одного сценария в процессе-исполнителе"""
+    config = _worker["maps"][scenario["map"]]
+    route_name = scenario["route"]
+    if route_name is None:
+        if scenario["map"] not in _worker["planned"]:
+            _worker["planned"][scenario["map"]] = plan_route(config)
+        route = _worker["planned"][scenario["map"]]
+    else:
+        route = _worker["routes"][route_name]
+
+    params = scenario["params"]
+    if route is None:
+        # планировщик не нашёл маршрут: миссия заведомо не выполнена
+        report = {"success": False, "time": 0.0, "checkpoints": 0}
+        report.update(path_length=0.0, min_clearance=0.0, collisions=0)
+    else:
+        report = run_mission(
+            config,
+            route,
+            controller={k: params[k] for k in CONTROLLER_PARAMS if k in params},
+            **{k: params[k] for k in MISSION_PARAMS if k in params},
+            **_worker["options"],
+        )
+    result = {column: report[column] for column in RESULT_COLUMNS}
+    result["key"] = scenario["key"]
+    return result
+
+
+def read_journal(path):
+    """Готовые результаты из журнала (обрезанная последняя строка пропускается)"""
+    results = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                results[result["key"]] = result
+    return results
+
+
+def write_columns(path, scenarios, results):
+    """Результаты в столбцовом виде (.npz): по массиву на каждое поле"""
+    done = [s for s in scenarios if s["key"] in results]
+    param_names = sorted({name for s in done for name in s["params"]})
+    columns = {
+        "map": np.array([s["map"] for s in done], dtype=str),
+        "route": np.array([s["route"] or "planned" for s in done], dtype=str),
+    }
+    for name in param_names:
+        columns[name] = np.array(
+            [s["params"].get(name, np.nan) for s in done], dtype=np.float64
+        )
+    for column in RESULT_COLUMNS:
+        columns[column] = np.array([results[s["key"]][column] for s in done])
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **columns)
+    os.replace(tmp_path, path)
+    return len(done)
+
+
+def run_batch(grid_path, out_path, workers=None):
+    maps, routes, scenarios, options = load_grid(grid_path)
+    journal_path = f"{out_path}.jsonl"
+    results = read_journal(journal_path)
+    pending = [s for s in scenarios if s["key"] not in results]
+    print(f"Сценариев: {len(scenarios)}, готово: {len(scenarios) - len(pending)}")
+
+    try:
+        with open(journal_path, "a", encoding="utf-8") as journal:
+            with ProcessPoolExecutor(
+                max_workers=workers or os.cpu_count(),
+                initializer=_init_worker,
+                initargs=(maps, routes, options),
+            ) as executor:
+                futures = [executor.submit(run_scenario, s) for s in pending]
+                try:
+                    for done, future in enumerate(as_completed(futures), 1):
+                        result = future.result()
+                        results[result["key"]] = result
+                        journal.write(json.dumps(result) + "\n")
+                        journal.flush()
+                        print(f"\r{done}/{len(pending)}", end="", flush=True)
+                except KeyboardInterrupt:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    print("\nПрервано, при повторном запуске прогон продолжится")
+                    raise
+    finally:
+        count = write_columns(out_path, scenarios, results)
+        print(f"\nЗаписано результатов: {count} -> {out_path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("grid", help="файл сетки сценариев (JSON)")
+    parser.add_argument("out", help="файл результатов (.npz)")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="число процессов"
+    )
+    args = parser.parse_args(argv)
+    try:
+        run_batch(args.grid, args.out, args.workers)
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Замеры скорости датчиков, столкновений, регулятора и HTTP-обработчиков
+
+    python -m src.benchmark run benchmarks/baseline.json
+    python -m src.benchmark compare benchmarks/baseline.json benchmarks/new.json
+
+Входные данные и карты генерируются с фиксированным seed, поэтому
+прогоны на одной машине сравнимы между собой. compare завершается
+с кодом 1, если какой-то замер стал медленнее больше чем на порог.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+import numpy as np
+
+# Запуск как скрипта (python src/benchmark.py) тоже поддерживается
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import wire
+from src.control_systems_calc import update_speed_and_direction
+from src.engine import SimulationEngine
+from src.events import Event
+from src.geometry import get_obstacle_index
+from src.maps import random_map
+from src.policy import Policy, default_policy
+from src.sensor_cache import SensorCache
+from src.sensors_calc import calculate_obstacle_distances
+
+# Число препятствий на сгенерированных картах
+MAP_SIZES = (100, 1000, 10000)
+
+# Сколько раз повторяется каждый замер и сколько длится один повтор, с
+REPEATS = 7
+TARGET_TIME = 0.05
+
+# Порог регрессии для compare: относительное замедление медианы
+DEFAULT_THRESHOLD = 0.10
+
+SEED = 0
+
+# Смещение машины за такт датчиков при медленном подъезде к точке, px
+SLOW_APPROACH_STEP = 0.25
+
+# Машин в замере пакетного запроса /vehicles/batch
+BATCH_VEHICLES = 16
+
+
+def measure(func, inputs):
+    """Медиана и минимум времени одного вызова func(*args), мкс
+
+    Вызовы идут по кругу по списку входных данных, число вызовов в повторе
+    подбирается так, чтобы повтор длился около TARGET_TIME.
+    """
+    count = len(inputs)
+    state = {"i": 0}
+
+    def call():
+        args = inputs[state["i"] % count]
+        state["i"] += 1
+        func(*args)
+
+    timer = timeit.Timer(call)
+    number, _ = timer.autorange()
+    number = max(1, int(number * TARGET_TIME / 0.2))
+    runs = [t / number * 1e6 for t in timer.repeat(REPEATS, number)]
+    return {
+        "median_us": statistics.median(runs),
+        "min_us": min(runs),
+        "calls": number,
+    }
+
+
+def bench_map(name, config, rng, results):
+    field_size = (config["field_width"], config["field_height"])
+    obstacles = config["obstacles"]
+    index = get_obstacle_index(obstacles, field_size)
+    points = rng.uniform((0, 0), field_size, size=(256, 2)).tolist()
+
+    results[f"sensors/{name}"] = measure(
+        lambda x, y: calculate_obstacle_distances(x, y, obstacles, field_size, 30),
+        points,
+    )
+    results[f"collision/{name}"] = measure(index.contains, points)
+
+    engine = SimulationEngine(config)
+    directions = [(d,) for d in rng.uniform(0, 360, 64).tolist()]
+
+    def step(direction):
+        # после остановки у препятствия машина снова трогается
+        engine.set_velocity(30, direction)
+        engine.step()
+
+    results[f"step/{name}"] = measure(step, directions)
+
+
+def bench_sensor_cache(config, rng, results):
+    """Датчики с кэшем: машина стоит и медленно подъезжает к точке"""
+    x, y = rng.uniform((100, 100), (700, 500))
+    cache = SensorCache(config, 30)
+    results["sensor_cache/stationary"] = measure(cache.distances, [(x, y)])
+
+    # шаг SLOW_APPROACH_STEP px за такт, позиции округлены, как в /position;
+    # кэш меньше числа пикселей пути, поэтому повторный проход - снова промахи
+    steps = np.arange(1024) * SLOW_APPROACH_STEP
+    path = [(round(x + s), round(y + s / 2)) for s in steps.tolist()]
+    cache = SensorCache(config, 30, size=16)
+    results["sensor_cache/approach"] = measure(cache.distances, path)
+
+
+def bench_controller(rng, results):
+    inputs = [
+        (
+            tuple(rng.uniform(0, 800, 2)),
+            tuple(rng.uniform(0, 800, 2)),
+            rng.uniform(0, 30),
+            rng.uniform(0, 360),
+            rng.uniform(0, 30, 6).tolist(),
+            30,
+        )
+        for _ in range(256)
+    ]
+    results["controller"] = measure(update_speed_and_direction, inputs)
+
+
+def bench_policy(rng, results):
+    rules = default_policy()
+    policy = Policy(rules)
+    events = []
+    for source, destination, operation, _ in rules:
+        parameters = {}
+        if operation == "set_velocity":
+            parameters = {"speed": 20.0, "direction": 90.0}
+        events.append((Event(source, destination, operation, parameters),))
+    # запрещённые: превышение скорости и сообщение вне политики
+    events.append(
+        (
+            Event(
+                "ControlSystem", "Servos", "set_velocity", {"speed": 99, "direction": 0}
+            ),
+        )
+    )
+    events.append((Event("Sensors", "Servos", "set_velocity", {}),))
+    results["policy/check"] = measure(policy.check, events)
+
+
+def bench_server(rng, results):
+    import src.simulation as simulation
+
+    # шаги делает сам замер update_position, поток физики не нужен
+    simulation.PHYSICS_THREAD = False
+    client = simulation.app.test_client()
+    dt = simulation.engine.dt
+
+    def update_position():
+        # сдвигаем начало отсчёта, чтобы каждый вызов делал ровно один шаг
+        simulation.state["started"] -= dt
+        simulation.update_position()
+
+    results["update_position"] = measure(update_position, [()])
+    results["is_collision"] = measure(
+        simulation.is_collision,
+        rng.uniform((0, 0), (800, 600), size=(256, 2)).tolist(),
+    )
+
+    velocities = [
+        ({"speed": s, "direction": d},)
+        for s, d in zip(
+            rng.uniform(0, 30, 64).tolist(), rng.uniform(0, 360, 64).tolist()
+        )
+    ]
+    results["http/position"] = measure(lambda: client.get("/position"), [()])
+    results["http/status"] = measure(lambda: client.get("/status"), [()])
+    results["http/config"] = measure(
+        lambda: client.get("/config", headers={"Accept-Encoding": "gzip"}), [()]
+    )
+    results["http/set_velocity"] = measure(
+        lambda data: client.post("/set_velocity", json=data), velocities
+    )
+
+    # то же в двоичном формате (src/wire.py)
+    accept = {"Accept": wire.CONTENT_TYPE}
+    binary = {"Content-Type": wire.CONTENT_TYPE}
+    results["http/position_binary"] = measure(
+        lambda: client.get("/position", headers=accept), [()]
+    )
+    results["http/set_velocity_binary"] = measure(
+        lambda body: client.post("/set_velocity", data=body, headers=binary),
+        [(wire.pack_velocity(data),) for (data,) in velocities],
+    )
+
+    # команды и позиции BATCH_VEHICLES машин парка одним запросом
+    vehicle_ids = [
+        client.post("/vehicles", json={}).json["id"] for _ in range(BATCH_VEHICLES)
+    ]
+    commands = [data for (data,) in velocities]
+    batches = [
+        (wire.pack_batch(list(zip(vehicle_ids, group)), vehicle_ids),)
+        for group in (
+            commands[i : i + BATCH_VEHICLES]
+            for i in range(0, len(commands), BATCH_VEHICLES)
+        )
+    ]
+    results[f"http/vehicles_batch{BATCH_VEHICLES}"] = measure(
+        lambda body: client.post(
+            "/vehicles/batch", data=body, headers={**binary, **accept}
+        ),
+        batches,
+    )
+
+
+def bench_wire(rng, results):
+    """Разбор позиции и сборка команды на стороне клиента: JSON и двоичный формат"""
+    positions = [
+        (round(x), round(y), int(tick))
+        for x, y, tick in zip(
+            rng.uniform(0, 800, 64).tolist(),
+            rng.uniform(0, 600, 64).tolist(),
+            rng.integers(0, 10**6, 64).tolist(),
+        )
+    ]
+    results["wire/position_json"] = measure(
+        json.loads,
+        [(json.dumps({"x": x, "y": y, "tick": tick}),) for x, y, tick in positions],
+    )
+    results["wire/position_binary"] = measure(
+        wire.unpack_position,
+        [(wire.pack_position(x, y, tick),) for x, y, tick in positions],
+    )
+
+    stamps = rng.uniform(0, 1000, (64, 7)).tolist()
+    commands = [
+        (
+            {
+                "speed": s[0] % 30,
+                "direction": s[1] % 360,
+                "trace": {
+                    "sample": s[:3],
+                    "tick": 100,
+                    "command": s[3:6],
+                    "sent": s[6],
+                },
+            },
+        )
+        for s in stamps
+    ]
+    results["wire/velocity_json"] = measure(json.dumps, commands)
+    results["wire/velocity_binary"] = measure(wire.pack_velocity, commands)
+
+
+def run(path):
+    rng = np.random.default_rng(SEED)
+    results = {}
+
+    from src.simulation import CONFIG
+
+    bench_map("config", CONFIG, rng, results)
+    for size in MAP_SIZES:
+        bench_map(f"random{size}", random_map(size, SEED), rng, results)
+    bench_controller(rng, results)
+    bench_policy(rng, results)
+    bench_server(rng, results)
+    bench_wire(rng, results)
+    bench_sensor_cache(random_map(MAP_SIZES[-1], SEED), rng, results)
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    for name, result in results.items():
+        print(f"{name:28} {result['median_us']:12.2f} мкс")
+    print(f"Сохранено: {path}")
+
+
+def compare(baseline_path, current_path, threshold=DEFAULT_THRESHOLD):
+    """Сравнение медиан; возвращает число регрессий"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    with open(current_path, encoding="utf-8") as f:
+        current = json.load(f)["results"]
+
+    regressions = 0
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            missing = "нет в базе" if name not in baseline else "нет в замере"
+            print(f"{name:28} {missing}")
+            continue
+        before = baseline[name]["median_us"]
+        after = current[name]["median_us"]
+        ratio = after / before
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  РЕГРЕССИЯ"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            mark = "  ускорение"
+        print(f"{name:28} {before:12.2f} -> {after:12.2f} мкс  x{ratio:5.2f}{mark}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="выполнить замеры и сохранить JSON")
+    run_parser.add_argument("out", help="файл результатов")
+
+    compare_parser = commands.add_parser("compare", help="сравнить два прогона")
+    compare_parser.add_argument("baseline", help="базовый прогон")
+    compare_parser.add_argument("current", help="новый прогон")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="допустимое замедление (0.1 = 10%%)",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args.out)
+    elif compare(args.baseline, args.current, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
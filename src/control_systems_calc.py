@@ -2,13 +2,13 @@ import math
 
 CYBER_OBSTACLE = True
 
-def update_speed_and_direction(current_pos, target_pos, current_speed, current_direction, obstacle_distances, max_speed):
+def update_speed_and_direction(current_pos, target_pos, current_speed, current_direction, obstacle_distances, max_speed,
+                               stop_radius=5, safe_distance=20, num_sectors=6, cyber_obstacle=None):
     current_x, current_y = current_pos
     target_x, target_y = target_pos
-    stop_radius = 5
-    safe_distance = 20
-    num_sectors = 6
-    sector_angle = 60  # 360/360=1 градусов
+    sector_angle = 360 / num_sectors  # 360/6=60 градусов
+    if cyber_obstacle is None:
+        cyber_obstacle = CYBER_OBSTACLE
 
     dx = target_x - current_x
     dy = target_y - current_y
@@ -27,11 +27,11 @@ def update_speed_and_direction(current_pos, target_pos, current_speed, current_d
     # Объезд препятствий
     if len(obstacle_distances) > 0:
         if obstacle_distances[target_sector] < safe_distance:
-            # Ищем лучший сектор из 6 возможных
+            # Ищем лучший сектор из num_sectors возможных
             best_sector = max(range(num_sectors), key=lambda x: obstacle_distances[x])
             new_direction = best_sector * sector_angle
 
-    if CYBER_OBSTACLE:
+    if cyber_obstacle:
         new_direction -= 60
 
     # Торможение у цели
@@ -0,0 +1,278 @@
+import math
+import os
+
+import numpy as np
+
+from src.geometry import (
+    CONTACT_GAP,
+    field_distances,
+    get_obstacle_index,
+    map_hash,
+    sector_directions,
+)
+
+# Каталог кэша растров карты (по одному набору файлов на хэш карты)
+CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".field_cache"
+)
+
+# Версия формата: меняется при изменении алгоритма растеризации
+FIELD_VERSION = 1
+
+DEFAULT_RESOLUTION = 1.0  # размер ячейки растра, px
+DEFAULT_MAX_DISTANCE = 64.0  # дальше этого расстояние поля обрезается, px
+
+# Параметры трассировки лучей по полю расстояний
+_HIT_EPSILON = 0.5
+_MAX_STEPS = 64
+
+# Уточнение точки касания в sweep: шаг поиска смены знака поля, px, и число
+# делений пополам найденного интервала (0.25 / 2**20 - доли нанопикселя)
+_CROSSING_STEP = 0.25
+_REFINE_STEPS = 20
+
+# Кэш загруженного поля для одного и того же CONFIG
+_field_cache = {"config": None, "field": None}
+
+
+def rasterize(index, resolution=DEFAULT_RESOLUTION, max_distance=DEFAULT_MAX_DISTANCE):
+    """Знаковое поле расстояний до препятствий в центрах ячеек растра
+
+    Отрицательные значения - внутри препятствия, значения обрезаны сверху
+    величиной max_distance, поэтому каждое препятствие обновляет только
+    ячейки в своей окрестности.
+    """
+    cols = int(np.ceil(index.field_width / resolution))
+    rows = int(np.ceil(index.field_height / resolution))
+    sdf = np.full((rows, cols), max_distance, dtype=np.float32)
+
+    def window(left, top, right, bottom):
+        # срез растра вокруг препятствия и координаты центров его ячеек
+        c0 = max(int((left - max_distance) / resolution), 0)
+        c1 = min(int(np.ceil((right + max_distance) / resolution)), cols)
+        r0 = max(int((top - max_distance) / resolution), 0)
+        r1 = min(int(np.ceil((bottom + max_distance) / resolution)), rows)
+        xs = (np.arange(c0, c1) + 0.5) * resolution
+        ys = (np.arange(r0, r1) + 0.5) * resolution
+        return (slice(r0, r1), slice(c0, c1)), xs[None, :], ys[:, None]
+
+    for cx, cy, radius in index.circles.tolist():
+        area, xs, ys = window(cx - radius, cy - radius, cx + radius, cy + radius)
+        dist = np.hypot(xs - cx, ys - cy) - radius
+        np.minimum(sdf[area], dist, out=sdf[area], casting="unsafe")
+
+    for left, top, right, bottom in index.rectangles.tolist():
+        area, xs, ys = window(left, top, right, bottom)
+        qx = np.maximum(left - xs, xs - right)
+        qy = np.maximum(top - ys, ys - bottom)
+        outside = np.hypot(np.maximum(qx, 0), np.maximum(qy, 0))
+        inside = np.minimum(np.maximum(qx, qy), 0)
+        np.minimum(sdf[area], outside + inside, out=sdf[area], casting="unsafe")
+
+    return sdf
+
+
+class DistanceField:
+    """Растр занятости и поле расстояний карты шахты"""
+
+    def __init__(self, sdf, occupancy, resolution, field_size, key=None):
+        self.sdf = sdf
+        self.occupancy = occupancy
+        self.resolution = resolution
+        self.field_width, self.field_height = field_size
+        self.key = key
+        self._rows, self._cols = sdf.shape
+
+    def contains(self, x, y):
+        """Проверка занятости точки за O(1) по растру"""
+        col = min(max(int(x / self.resolution), 0), self._cols - 1)
+        row = min(max(int(y / self.resolution), 0), self._rows - 1)
+        return bool(self.occupancy[row, col])
+
+    def sweep(self, x0, y0, x1, y1):
+        """Первое касание препятствия на отрезке трассировкой по полю расстояний
+
+        Аналог ObstacleIndex.sweep: доля пути 0..1 до контакта (с зазором
+        CONTACT_GAP) или None. Как и там, касанием считается только движение
+        к препятствию: от препятствия и вдоль него машина уходит свободно.
+        Вдали от препятствий отрезок проходится шагами по полю расстояний,
+        рядом с ними (или когда шаги кончились) точка, где поле меняет знак,
+        ищется мелким шагом и уточняется делением пополам.
+        """
+        dx = x1 - x0
+        dy = y1 - y0
+        length = math.hypot(dx, dy)
+        if length == 0:
+            return None
+        ux, uy = dx / length, dy / length
+
+        t = 0.0
+        for _ in range(_MAX_STEPS):
+            d = float(self.distance(x0 + t * ux, y0 + t * uy))
+            if d < _HIT_EPSILON:
+                break
+            t += d
+            if t >= length:
+                return None
+
+        contact = self._crossing(x0, y0, ux, uy, t, length)
+        if contact is None:
+            return None
+        return max(0.0, contact - CONTACT_GAP) / length
+
+    def _crossing(self, x0, y0, ux, uy, t, length):
+        # первое место на [t, length], где поле становится <= 0 при движении
+        # вглубь; None, если такого нет
+        ts = np.append(np.arange(t, length, _CROSSING_STEP), length)
+        ds = self.distance(x0 + ts * ux, y0 + ts * uy)
+        if ds[0] <= 0 and len(ds) > 1 and ds[1] < ds[0]:
+            return float(ts[0])  # уже на препятствии и движемся вглубь
+        entered = np.flatnonzero((ds[:-1] > 0) & (ds[1:] <= 0))
+        if not len(entered):
+            return None
+        low, high = float(ts[entered[0]]), float(ts[entered[0] + 1])
+        for _ in range(_REFINE_STEPS):
+            middle = (low + high) / 2
+            if self.distance(x0 + middle * ux, y0 + middle * uy) > 0:
+                low = middle
+            else:
+                high = middle
+        return low
+
+    def clearance(self, positions, max_distance):
+        """Аналог ObstacleIndex.clearance по полю расстояний
+
+        Расстояние обрезано ещё и max_distance растра (DEFAULT_MAX_DISTANCE).
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        distances = self.distance(positions[:, 0], positions[:, 1])
+        return np.clip(distances, 0, max_distance).astype(np.float64)
+
+    def distance(self, xs, ys):
+        """Билинейная интерполяция поля расстояний в точках (xs, ys)"""
+        u = np.clip(xs / self.resolution - 0.5, 0, self._cols - 1)
+        v = np.clip(ys / self.resolution - 0.5, 0, self._rows - 1)
+        c0 = np.minimum(u.astype(np.int64), max(self._cols - 2, 0))
+        r0 = np.minimum(v.astype(np.int64), max(self._rows - 2, 0))
+        c1 = np.minimum(c0 + 1, self._cols - 1)
+        r1 = np.minimum(r0 + 1, self._rows - 1)
+        fu = u - c0
+        fv = v - r0
+        sdf = self.sdf
+        top = sdf[r0, c0] * (1 - fu) + sdf[r0, c1] * fu
+        bottom = sdf[r1, c0] * (1 - fu) + sdf[r1, c1] * fu
+        return top * (1 - fv) + bottom * fv
+
+    def cast_rays(self, positions, max_distance, num_sectors=6):
+        """Расстояния до препятствий по секторам трассировкой по полю расстояний
+
+        Аналог ObstacleIndex.cast_rays: positions формы (N, 2),
+        результат - массив (N, num_sectors).
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        dx_dir, dy_dir = sector_directions(num_sectors)
+        px = positions[:, 0, None]
+        py = positions[:, 1, None]
+
+        field_size = (self.field_width, self.field_height)
+        limit = np.minimum(
+            field_distances(positions, dx_dir, dy_dir, field_size), max_distance
+        )
+        t = np.zeros_like(limit)
+        active = t < limit
+        for _ in range(_MAX_STEPS):
+            if not active.any():
+                break
+            d = self.distance(px + t * dx_dir, py + t * dy_dir)
+            hit = d < _HIT_EPSILON
+            active &= ~hit
+            t = np.where(active, t + d, t)
+            active &= t < limit
+
+        return np.minimum(t, limit)
+
+
+def _cache_paths(key, cache_dir):
+    return (
+        os.path.join(cache_dir, f"{key}-sdf.npy"),
+        os.path.join(cache_dir, f"{key}-occ.npy"),
+    )
+
+
+def _save_atomic(path, array):
+    # запись через временный файл, чтобы параллельные процессы
+    # никогда не увидели недописанный файл
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def load_distance_field(
+    config,
+    resolution=DEFAULT_RESOLUTION,
+    max_distance=DEFAULT_MAX_DISTANCE,
+    cache_dir=CACHE_DIR,
+):
+    """Загрузка поля расстояний из кэша на диске (или построение и сохранение)
+
+    Файлы открываются через np.load(mmap_mode="r"), поэтому повторный запуск
+    почти мгновенный, а несколько процессов делят одни и те же страницы памяти.
+    """
+    field_size = (config["field_width"], config["field_height"])
+    key = f"{map_hash(config)[:16]}-v{FIELD_VERSION}-r{resolution:g}-d{max_distance:g}"
+    sdf_path, occ_path = _cache_paths(key, cache_dir)
+
+    if not (os.path.exists(sdf_path) and os.path.exists(occ_path)):
+        os.makedirs(cache_dir, exist_ok=True)
+        index = get_obstacle_index(config["obstacles"], field_size)
+        sdf = rasterize(index, resolution, max_distance)
+        _save_atomic(sdf_path, sdf)
+        _save_atomic(occ_path, sdf <= 0)
+
+    return DistanceField(
+        np.load(sdf_path, mmap_mode="r"),
+        np.load(occ_path, mmap_mode="r"),
+        resolution,
+        field_size,
+        key,
+    )
+
+
+def get_distance_field(config):
+    """Поле расстояний с кэшированием по самому объекту config"""
+    if _field_cache["config"] is not config:
+        _field_cache["field"] = load_distance_field(config)
+        _field_cache["config"] = config
+    return _field_cache["field"]
+
+
+def accuracy_report(
+    field, config, samples=5000, max_distance=30, num_sectors=6, seed=0
+):
+    """Погрешность растра по сравнению с точным аналитическим расчётом
+
+    Сравниваются проверка столкновений и расстояния датчиков
+    в случайных точках поля.
+    """
+    field_size = (config["field_width"], config["field_height"])
+    index = get_obstacle_index(config["obstacles"], field_size)
+    rng = np.random.default_rng(seed)
+    points = rng.uniform((0, 0), field_size, size=(samples, 2))
+
+    exact_hits = np.array([index.contains(x, y) for x, y in points.tolist()])
+    raster_hits = np.array([field.contains(x, y) for x, y in points.tolist()])
+
+    # расстояния сравниваются только для точек вне препятствий
+    free = points[~exact_hits]
+    exact = index.cast_rays(free, max_distance, num_sectors)
+    approx = field.cast_rays(free, max_distance, num_sectors)
+    error = np.abs(approx - exact)
+
+    return {
+        "samples": samples,
+        "collision_mismatch_rate": float(np.mean(exact_hits != raster_hits)),
+        "ray_mean_error": float(error.mean()) if error.size else 0.0,
+        "ray_max_error": float(error.max()) if error.size else 0.0,
+        "ray_p99_error": float(np.percentile(error, 99)) if error.size else 0.0,
+    }
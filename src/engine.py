@@ -0,0 +1,201 @@
+import math
+
+from src.control_systems_calc import update_speed_and_direction
+from src.geometry import get_obstacle_index
+from src.sensors_calc import calculate_obstacle_distances
+from src.trail import TrailBuffer
+
+# Шаг симуляции по умолчанию, с
+DEFAULT_DT = 0.05
+
+# Дальше этого расстояние до препятствий в отчёте миссии не уточняется, px
+CLEARANCE_RANGE = 64.0
+
+
+class SimulationEngine:
+    """Симуляция движения АРПБТ с фиксированным шагом времени
+
+    Не зависит от Flask и настенных часов: время продвигается только
+    вызовами step()/run(), поэтому прогоны полностью воспроизводимы.
+    """
+
+    def __init__(
+        self,
+        config,
+        dt=DEFAULT_DT,
+        collider=None,
+        trail_max_points=None,
+        trail_tolerance=0.0,
+    ):
+        self.config = config
+        self.dt = dt
+        self.trail = TrailBuffer(trail_max_points, trail_tolerance)
+        self.field_size = (config["field_width"], config["field_height"])
+        # объект с методом sweep(x0, y0, x1, y1): индекс препятствий или растр
+        if collider is None:
+            collider = get_obstacle_index(config["obstacles"], self.field_size)
+        self.collider = collider
+
+        self.tick = 0  # номер шага симуляции
+        self.collisions = 0  # число остановок из-за столкновения
+        self.reset()
+
+    @property
+    def time(self):
+        """Симулированное время, с"""
+        return self.tick * self.dt
+
+    def reset(self):
+        """Возврат АРПБТ в стартовую точку (часы симуляции не сбрасываются)"""
+        self.x, self.y = self.config["start_position"]
+        self.speed = 0.0
+        self.direction = 0.0
+        self.trail.clear()
+
+    def set_velocity(self, speed, direction):
+        self.speed = float(speed)
+        self.direction = float(direction)
+
+    def step(self):
+        """Один шаг физики длительностью dt
+
+        Столкновение ищется непрерывно вдоль всего перемещения за шаг:
+        при касании АРПБТ останавливается в CONTACT_GAP от точки контакта.
+        """
+        if self.speed > 0:
+            self.trail.append(self.x, self.y)
+
+            # Преобразование в математические координаты
+            math_angle = math.radians(90 - self.direction)
+            distance = self.speed * self.dt
+            field_width, field_height = self.field_size
+
+            new_x = self.x + distance * math.cos(math_angle)
+            new_y = self.y - distance * math.sin(math_angle)
+            new_x = max(0, min(new_x, field_width))
+            new_y = max(0, min(new_y, field_height))
+
+            contact = self.collider.sweep(self.x, self.y, new_x, new_y)
+            if contact is not None:
+                new_x = self.x + contact * (new_x - self.x)
+                new_y = self.y + contact * (new_y - self.y)
+                self.speed = 0.0
+                self.collisions += 1
+
+            self.x = new_x
+            self.y = new_y
+
+        if self.speed <= 0:
+            # у стоящей машины траектория доведена до её текущей позиции
+            self.trail.flush(self.x, self.y)
+
+        self.tick += 1
+
+    def run(self, n):
+        """n шагов физики подряд"""
+        for _ in range(n):
+            self.step()
+
+    def advance_to(self, sim_time):
+        """Догнать заданный момент времени целыми шагами; возвращает число шагов"""
+        steps = int((sim_time - self.time) / self.dt)
+        if steps > 0:
+            self.run(steps)
+        return max(steps, 0)
+
+
+def run_mission(
+    config,
+    route,
+    max_time=300.0,
+    dt=DEFAULT_DT,
+    max_speed=30,
+    max_detect_distance=30,
+    security=None,
+    controller=None,
+    recorder=None,
+    collider=None,
+):
+    """Прогон миссии без сервера: датчики и регулятор вызываются на каждом шаге
+
+    route - список точек в формате /load_points, security - необязательная
+    функция (speed, direction) -> (speed, direction), через которую проходят
+    команды перед приводами (как модуль безопасности в блокноте).
+    controller - параметры update_speed_and_direction (stop_radius,
+    safe_distance, num_sectors, cyber_obstacle), recorder - необязательный
+    MissionRecorder для записи измерений, решений регулятора и команд (для
+    повтора создаётся с теми же controller и max_speed), collider - проверка
+    столкновений для SimulationEngine (например, DistanceField).
+    """
+    engine = SimulationEngine(config, dt=dt, collider=collider)
+    targets = list(route)
+    obstacles = config["obstacles"]
+    controller = controller or {}
+    num_sectors = controller.get("num_sectors", 6)
+    positions = []
+
+    # начальные значения как у ControlSystem в блокнотах
+    speed, direction = 30, 90
+    checkpoints = 0
+    path_length = 0.0
+    max_ticks = int(max_time / dt)
+
+    while targets and engine.tick < max_ticks:
+        # Navigation/Sensors видят координаты, округлённые до пикселя
+        x, y = round(engine.x, 0), round(engine.y, 0)
+        distances = calculate_obstacle_distances(
+            x, y, obstacles, engine.field_size, max_detect_distance, num_sectors
+        )
+        if recorder is not None:
+            recorder.sample(engine.time, engine.tick, x, y, distances)
+        target = targets[0]
+        inputs = (speed, direction)
+        speed, direction, status = update_speed_and_direction(
+            (x, y),
+            (target["x"], target["y"]),
+            speed,
+            direction,
+            distances,
+            max_speed,
+            **controller,
+        )
+        if recorder is not None:
+            recorder.decision(
+                engine.time,
+                engine.tick,
+                (x, y),
+                (target["x"], target["y"]),
+                *inputs,
+                distances,
+                max_speed,
+                (speed, direction, status),
+            )
+        if status == "success":
+            if target["type"] == "checkpoint":
+                checkpoints += 1
+            targets.pop(0)
+
+        command = (speed, direction)
+        if security is not None:
+            command = security(*command)
+        if recorder is not None:
+            recorder.command(engine.time, engine.tick, *command)
+        engine.set_velocity(*command)
+
+        prev_x, prev_y = engine.x, engine.y
+        positions.append((prev_x, prev_y))
+        engine.step()
+        path_length += math.hypot(engine.x - prev_x, engine.y - prev_y)
+
+    positions.append((engine.x, engine.y))
+    clearance = engine.collider.clearance(positions, CLEARANCE_RANGE)
+    return {
+        "success": not targets,
+        "time": engine.time,
+        "ticks": engine.tick,
+        "checkpoints": checkpoints,
+        "path_length": path_length,
+        "min_clearance": float(clearance.min()),
+        "collisions": engine.collisions,
+        "position": (engine.x, engine.y),
+    }
@@ -0,0 +1,833 @@
+import math
+from multiprocessing import Event as StopFlag
+from multiprocessing import Process, Queue
+from multiprocessing.queues import Empty
+from threading import Lock, Thread
+from time import monotonic
+
+import requests
+
+from src.control_systems_calc import update_speed_and_direction
+from src.events import ControlEvent, Event
+from src.metrics import MetricsRegistry
+from src.recorder import MissionRecorder
+from src.sensor_cache import SENSOR_CACHE_SIZE, SensorCache
+from src.telemetry_client import (
+    SIMULATOR_URL,
+    get_config,
+    get_position,
+    get_telemetry,
+    iter_stream,
+    set_velocity,
+)
+
+# Как часто проверяется флаг остановки, если очередь молчит, с
+STOP_CHECK_INTERVAL = 1.0
+
+# Сколько сообщений диспетчер забирает из очереди за один раз
+DISPATCH_BATCH_SIZE = 64
+
+# Период отправки статистики шины сообщений на /metrics симулятора, с
+METRICS_REPORT_INTERVAL = 1.0
+
+# Получатель сообщений для самого маршрутизатора: операция metrics с
+# параметрами {имя метрики: значение} попадает в его отчёт для /metrics
+ROUTER_NAME = "QueueManage"
+
+# Команда приводам отправляется, только если скорость или направление
+# изменились больше допуска, либо с прошлой отправки прошло COMMAND_KEEPALIVE с
+COMMAND_SPEED_TOLERANCE = 2.0
+COMMAND_DIRECTION_TOLERANCE = 2.0  # градусы
+COMMAND_KEEPALIVE = 1.0
+
+# Сколько Navigation ждёт очередного снимка из /stream, прежде чем перейти
+# на опрос, и через сколько пробует подключиться к потоку снова, с
+STREAM_TIMEOUT = 1.0
+STREAM_RETRY_INTERVAL = 5.0
+
+# Расхождение измеренной и досчитанной позиции, после которого команда
+# отправляется повторно (например, АРПБТ остановился у препятствия)
+COMMAND_POSITION_TOLERANCE = 3.0
+
+
+class MessageRouter:
+    """Доставка сообщения получателю: политика, маршрут, статистика, журнал
+
+    routes - получатель -> функция, кладущая сообщение в его очередь.
+    Маршрутизатор можно передать сущностям вместо очереди событий:
+    put сразу доставляет сообщение (так работает async_runtime).
+    Сообщения для ROUTER_NAME не доставляются, а обрабатываются на месте.
+    """
+
+    def __init__(self, policy=None):
+        self.routes = {}
+        self.policy = policy
+        self.recorder = None  # журнал всех сообщений шины
+        self.metrics = MetricsRegistry()
+        self._policy_warned = False
+
+    def put(self, event):
+        if self.policy is not None and self.policy.check(event) is None:
+            if not self._policy_warned:
+                # дальше запреты видны только в счётчиках policy_denied_total
+                print(f"[ИНФО] сообщение запрещено политикой {event}")
+                self._policy_warned = True
+            return
+        labels = (
+            ("source", event.source),
+            ("destination", event.destination),
+            ("operation", event.operation),
+        )
+        if event.destination == ROUTER_NAME:
+            self._receive(event)
+            self.metrics.inc("bus_messages_total", labels)
+            return
+        # найдём очередь получателя события и положим запрос в эту очередь
+        put = self.routes.get(event.destination)
+        if put is None:
+            # например, запрос пришёл для неизвестной сущности
+            print(f"[ИНФО] ошибка выполнения запроса: неизвестный получатель {event}")
+            self.metrics.inc("bus_undeliverable_total", labels)
+            return
+        event.dispatched = monotonic()
+        put(event)
+        self.metrics.inc("bus_messages_total", labels)
+        if self.recorder is not None:
+            self.recorder.event(event)
+
+    def _receive(self, event):
+        # показатели сущностей (например, кэша Sensors) с меткой отправителя
+        if event.operation == "metrics":
+            for name, value in event.parameters.items():
+                self.metrics.set(name, (("source", event.source),), value)
+
+    def report(self):
+        """Статистика шины, политики и показатели сущностей для POST /metrics"""
+        if self.policy is not None:
+            self.policy.export(self.metrics)
+        return self.metrics.to_dict()
+
+
+class QueueManage(Process):
+    """Диспетчер сообщений между сущностями
+
+    Блокируется на очереди событий (без опроса с паузами), забирает сообщения
+    пачками и раскладывает их по очередям получателей через заранее
+    построенную таблицу маршрутов.
+
+    Число сообщений по (отправитель, получатель, операция) и длины очередей
+    раз в report_interval отправляются на report_url/metrics
+    (None - не отправлять).
+
+    С policy (policy.Policy) сообщения, не разрешённые политикой, не
+    доставляются; счётчики политики отправляются вместе со статистикой.
+    """
+
+    def __init__(
+        self,
+        events_q: Queue,
+        batch_size=DISPATCH_BATCH_SIZE,
+        report_url=SIMULATOR_URL,
+        report_interval=METRICS_REPORT_INTERVAL,
+        record_path=None,
+        policy=None,
+    ):
+        # вызываем конструктор базового класса
+        super().__init__()
+        self._events_q = events_q  # очередь событий входящие сообщения
+        self._entity_queues = {}  # словарь очередей известных сущностей
+        self._router = MessageRouter(policy)
+        self._batch_size = batch_size
+        self._stop_flag = StopFlag()  # флаг завершения работы
+        self._report_url = report_url
+        self._report_interval = report_interval
+        self._record_path = record_path  # журнал всех сообщений шины
+        self.metrics = self._router.metrics
+
+    # регистрация очереди новой сущности
+    def add_entity_queue(self, entity_id: str, queue: Queue):
+        print(f"[ИНФО] регистрируем сущность {entity_id}")
+        self._entity_queues[entity_id] = queue
+
+    def _queue_depths(self):
+        queues = [("events", self._events_q)] + list(self._entity_queues.items())
+        for name, queue in queues:
+            try:
+                depth = queue.qsize()
+            except NotImplementedError:
+                # на macOS размер очереди multiprocessing недоступен
+                return
+            self.metrics.set("bus_queue_depth", (("queue", name),), depth)
+
+    def _report_metrics(self):
+        # отдельный поток, чтобы HTTP-запрос не задерживал раздачу сообщений
+        session = requests.Session()
+        while not self._stop_flag.wait(self._report_interval):
+            self._queue_depths()
+            try:
+                session.post(
+                    f"{self._report_url}/metrics",
+                    json=self._router.report(),
+                    timeout=self._report_interval,
+                )
+            except requests.exceptions.RequestException:
+                pass
+
+    def _next_batch(self):
+        # ждём первое сообщение, остальные забираем без ожидания
+        try:
+            batch = [self._events_q.get(timeout=STOP_CHECK_INTERVAL)]
+        except Empty:
+            return []
+        try:
+            while len(batch) < self._batch_size:
+                batch.append(self._events_q.get_nowait())
+        except Empty:
+            pass
+        return batch
+
+    # основной код работы диспетчера
+    def run(self):
+        print("[ИНФО] старт")
+        self._router.routes = {
+            entity_id: queue.put for entity_id, queue in self._entity_queues.items()
+        }
+        if self._report_url is not None:
+            Thread(target=self._report_metrics, daemon=True).start()
+        if self._record_path is not None:
+            self._router.recorder = MissionRecorder(self._record_path)
+
+        while not self._stop_flag.is_set():
+            for event in self._next_batch():
+                if isinstance(event, ControlEvent):
+                    if event.operation == "stop":
+                        self._stop_flag.set()
+                        break
+                    continue
+                try:
+                    self._router.put(event)
+                except Exception as e:
+                    # что-то пошло не так, выведем сообщение об ошибке
+                    print(f"[ИНФО] ошибка обработки {e}, {event}")
+        if self._router.recorder is not None:
+            self._router.recorder.close()
+        print("[ИНФО] завершение работы")
+
+    # запрос на остановку для завершения работы
+    # может вызываться вне процесса
+    def stop(self):
+        # флаг виден сразу, а сообщение-маркер будит ожидающий процесс
+        self._stop_flag.set()
+        self._events_q.put(ControlEvent(operation="stop"))
+
+
+class BlockingEntity(Process):
+    """Базовая сущность, которая спит на своей очереди до прихода сообщения
+
+    Сообщение с операцией op обрабатывается методом on_<op>. Если задан period,
+    метод tick() вызывается с этим периодом, а ожидание очереди ограничено
+    временем до следующего вызова.
+    """
+
+    period = None  # период вызова tick(), с
+
+    def __init__(self, events_queue: Queue, simulator_url=SIMULATOR_URL):
+        # вызываем конструктор базового класса
+        super().__init__()
+        self.events_queue = events_queue
+        # адрес симулятора; для машины парка - {SIMULATOR_URL}/vehicles/<номер>
+        self.simulator_url = simulator_url
+        # очередь и флаг остановки нужны только процессу сущности, поэтому
+        # создаются при регистрации или запуске (в async_runtime - никогда)
+        self._own_queue = None
+        self._stop_flag = None
+        self._handlers = {}
+
+    def _create_ipc(self):
+        if self._own_queue is None:
+            self._own_queue = Queue()
+            self._stop_flag = StopFlag()
+
+    def start(self):
+        # до запуска процесса, чтобы очередь и флаг были общими с ним
+        self._create_ipc()
+        super().start()
+
+    # выдаёт собственную очередь для взаимодействия
+    def entity_queue(self):
+        self._create_ipc()
+        return self._own_queue
+
+    # управляющие команды приходят в ту же очередь, что и сообщения
+    def control_entity_queue(self):
+        return self.entity_queue()
+
+    def send(self, destination, operation, parameters):
+        event = Event(
+            source=self.__class__.__name__,
+            destination=destination,
+            operation=operation,
+            parameters=parameters,
+        )
+        self.events_queue.put(event)
+
+    def setup(self):
+        """Подготовка внутри процесса сущности перед основным циклом"""
+
+    def tick(self):
+        """Периодическая работа сущности"""
+
+    def teardown(self):
+        """Завершение внутри процесса сущности после основного цикла"""
+
+    def _wait_timeout(self, next_tick):
+        if next_tick is None:
+            return STOP_CHECK_INTERVAL
+        return min(max(next_tick - monotonic(), 0), STOP_CHECK_INTERVAL)
+
+    def _bind_handlers(self):
+        self._handlers = {
+            name[3:]: getattr(self, name)
+            for name in dir(self)
+            if name.startswith("on_")
+        }
+
+    def _handle(self, event):
+        event.consumed = monotonic()
+        handler = self._handlers.get(event.operation)
+        if handler is not None:
+            return handler(event)
+
+    # основной код сущности
+    def run(self):
+        print(f"[{self.__class__.__name__}] старт")
+        self._bind_handlers()
+        self.setup()
+        next_tick = None if self.period is None else monotonic()
+
+        while not self._stop_flag.is_set():
+            event = None
+            try:
+                event = self._own_queue.get(timeout=self._wait_timeout(next_tick))
+                if isinstance(event, ControlEvent):
+                    if event.operation == "stop":
+                        break
+                else:
+                    self._handle(event)
+            except Empty:
+                pass
+            except Exception as e:
+                # что-то пошло не так, выведем сообщение об ошибке
+                print(f"[{self.__class__.__name__}] ошибка обработки {e}, {event}")
+
+            if next_tick is not None and monotonic() >= next_tick:
+                try:
+                    self.tick()
+                except Exception as e:
+                    print(f"[{self.__class__.__name__}] ошибка {e}")
+                # пропущенные из-за долгой обработки периоды не навёрстываются
+                next_tick = max(next_tick + self.period, monotonic())
+
+        self.teardown()
+        print(f"[{self.__class__.__name__}] завершение работы")
+
+    def stop(self):
+        # поскольку работает в отдельном процессе, поднимаем общий флаг
+        # и кладём маркер в очередь, чтобы разбудить ожидающий процесс
+        self._create_ipc()
+        self._stop_flag.set()
+        self._own_queue.put(ControlEvent(operation="stop"))
+
+
+class Communication(BlockingEntity):
+    """Передаёт полётное задание и завершает работу"""
+
+    def __init__(self, events_queue: Queue, task):
+        super().__init__(events_queue)
+        self._task = task
+
+    def run(self):
+        print(f"[{self.__class__.__name__}] старт")
+        print(f"[{self.__class__.__name__}] отправляем новое задание")
+        self.send("ControlSystem", "new_task", self._task)
+        print(f"[{self.__class__.__name__}] завершение работы")
+
+
+class ControlSystem(BlockingEntity):
+    """Расчёт скорости и направления при каждом новом измерении
+
+    Если передан канал telemetry (TelemetryChannel), координаты и расстояния
+    не приходят через очередь: ControlSystem сама читает последний образец
+    из разделяемой памяти с периодом control_period.
+
+    С record_path каждое решение регулятора и отправленная команда
+    пишутся в журнал миссии (см. recorder.replay).
+
+    Между измерениями позиция досчитывается по последней отправленной
+    команде (счисление пути), а команда приводам уходит, только если
+    скорость или направление изменились больше допуска
+    (COMMAND_SPEED_TOLERANCE, COMMAND_DIRECTION_TOLERANCE), измерение
+    разошлось с досчитанной позицией больше COMMAND_POSITION_TOLERANCE
+    или истёк COMMAND_KEEPALIVE.
+    """
+
+    control_period = 0.02
+    dead_reckoning_limit = 0.25  # дольше без измерений позиция не досчитывается, с
+
+    def __init__(
+        self, events_queue: Queue, max_speed=30, telemetry=None, record_path=None
+    ):
+        super().__init__(events_queue)
+        self._telemetry = telemetry
+        self._record_path = record_path
+        self._recorder = None
+        self._seen = (0, 0)  # версии последних прочитанных образцов
+        if telemetry is not None:
+            self.period = self.control_period
+        self._targets_points = []  # Точки маршрута
+        self._current_coordinates = None  # Текущие координаты АРПБТ
+        self._fix_time = None  # когда сделано последнее измерение координат
+        self._sent = None  # (скорость, направление, время) последней команды
+        self._diverged = False  # приводы выполняют не то, что досчитано
+        self._decisions = 0
+        self._commands = 0
+        self._current_speed = 30  # Скорость АРПБТ
+        self._current_direction = 90  # Базовое направление движения АРПБТ в градусах
+        self._obstacle_distances = []  # Расстояния до препятствий по секторам
+        self._sample = None  # событие с последним измерением (для трассы задержек)
+        self._counter = 1  # Счётчик пройденных точек маршрута
+        self.max_speed = max_speed
+
+    def setup(self):
+        if self._record_path is not None:
+            self._recorder = MissionRecorder(
+                self._record_path, max_speed=self.max_speed
+            )
+
+    def teardown(self):
+        if self._recorder is not None:
+            self._recorder.close()
+        print(
+            f"[{self.__class__.__name__}] решений: {self._decisions}, "
+            f"команд приводам: {self._commands}"
+        )
+
+    def on_new_task(self, event):
+        print(f"[{self.__class__.__name__}] новое задание: {event.parameters}!")
+        self._targets_points = list(event.parameters)
+
+    def on_get_coordinates(self, event):
+        self._new_fix(event.parameters, event.created)
+        self._sample = event
+        self.mission_move()
+
+    def on_get_directions(self, event):
+        # последние два элемента - координаты, для которых сделано измерение
+        *distances, x, y = event.parameters
+        self._new_fix({"x": x, "y": y}, event.created)
+        self._obstacle_distances = distances
+        self._sample = event
+        self.mission_move()
+
+    def tick(self):
+        position_seq, position = self._telemetry.position.read()
+        sensors_seq, sensors = self._telemetry.sensors.read()
+        if (position_seq, sensors_seq) == self._seen:
+            # нового измерения нет - решение по досчитанной позиции
+            if self._sent is not None:
+                self.mission_move()
+            return
+
+        if sensors_seq != self._seen[1]:
+            *self._obstacle_distances, x, y = sensors
+        if position_seq != self._seen[0]:
+            x, y = position
+        self._seen = (position_seq, sensors_seq)
+        self._new_fix({"x": x, "y": y}, monotonic())
+        self.mission_move()
+
+    def _new_fix(self, coordinates, fix_time):
+        if self._sent is not None and self._current_coordinates:
+            expected_x, expected_y = self._position(fix_time)
+            error = math.hypot(
+                coordinates["x"] - expected_x, coordinates["y"] - expected_y
+            )
+            if error > COMMAND_POSITION_TOLERANCE:
+                self._diverged = True
+        self._current_coordinates = coordinates
+        self._fix_time = fix_time
+
+    def _position(self, now):
+        # последнее измерение, сдвинутое по команде, которую выполняют приводы
+        x, y = self._current_coordinates["x"], self._current_coordinates["y"]
+        if self._sent is None:
+            return x, y
+        speed, direction, _ = self._sent
+        age = min(now - self._fix_time, self.dead_reckoning_limit)
+        distance = speed * max(age, 0)
+        math_angle = math.radians(90 - direction)
+        return (
+            x + distance * math.cos(math_angle),
+            y - distance * math.sin(math_angle),
+        )
+
+    def _command_changed(self, now):
+        if self._sent is None or self._diverged:
+            return True
+        speed, direction, sent_at = self._sent
+        if now - sent_at >= COMMAND_KEEPALIVE:
+            return True
+        if (speed == 0) != (self._current_speed == 0):
+            # остановка и трогание отправляются всегда
+            return True
+        turn = abs((self._current_direction - direction + 180) % 360 - 180)
+        return (
+            abs(self._current_speed - speed) > COMMAND_SPEED_TOLERANCE
+            or turn > COMMAND_DIRECTION_TOLERANCE
+        )
+
+    def mission_move(self):
+        if not self._current_coordinates or not self._targets_points:
+            return
+
+        now = monotonic()
+        target_point = self._targets_points[0]
+        position = self._position(now)
+        target = (target_point["x"], target_point["y"])
+        inputs = (self._current_speed, self._current_direction)
+        self._current_speed, self._current_direction, status = (
+            update_speed_and_direction(
+                position,
+                target,
+                self._current_speed,
+                self._current_direction,
+                self._obstacle_distances,
+                self.max_speed,
+            )
+        )
+        self._decisions += 1
+        send = self._command_changed(now)
+        if self._recorder is not None:
+            tick = self._current_coordinates.get("tick", 0)
+            self._recorder.decision(
+                now,
+                tick,
+                position,
+                target,
+                *inputs,
+                self._obstacle_distances,
+                self.max_speed,
+                (self._current_speed, self._current_direction, status),
+            )
+            if send:
+                self._recorder.command(
+                    now, tick, self._current_speed, self._current_direction
+                )
+
+        if status == "success":
+            if target_point["type"] == "checkpoint":
+                print(
+                    f"[{self.__class__.__name__}] точка бурения {self._counter} достигнута"
+                )
+                self.send("Drill", "drilling", "")
+            self._counter += 1
+            self._targets_points.pop(0)
+
+        if not send:
+            return
+        self._sent = (self._current_speed, self._current_direction, now)
+        self._diverged = False
+        self._commands += 1
+        data = {"speed": self._current_speed, "direction": self._current_direction}
+        if self._sample is not None:
+            # по трассе симулятор считает задержку от измерения до применения
+            data["trace"] = {
+                "sample": self._sample.trace(),
+                "tick": self._current_coordinates.get("tick"),
+            }
+        self.send("Servos", "set_velocity", data)
+
+
+class Navigation(BlockingEntity):
+    """Координаты АРПБТ от симулятора с периодом period
+
+    Если симулятор отдаёт поток /stream, координаты приходят из него
+    (отдельный поток читает снимки с частотой 1/period); пока оборвавшийся
+    поток не восстановлен, тот же поток опрашивает /position. Если /stream
+    нет совсем (например, у машины парка), координаты запрашиваются в tick().
+    С каналом telemetry координаты пишутся в разделяемую память, а не в очередь.
+    С record_path каждое измерение пишется в журнал миссии.
+    """
+
+    period = 0.05
+
+    def __init__(
+        self,
+        events_queue: Queue,
+        telemetry=None,
+        simulator_url=SIMULATOR_URL,
+        record_path=None,
+    ):
+        super().__init__(events_queue, simulator_url)
+        self._telemetry = telemetry
+        self._record_path = record_path
+        self._recorder = None
+        self._recorder_lock = Lock()  # поток /stream и teardown() делят журнал
+        self._stream_thread = None
+
+    def setup(self):
+        self._session = requests.Session()
+        if self._record_path is not None:
+            self._recorder = MissionRecorder(self._record_path)
+        self._stream_thread = Thread(target=self._follow_stream, daemon=True)
+        self._stream_thread.start()
+
+    def teardown(self):
+        if self._recorder is not None:
+            with self._recorder_lock:
+                self._recorder.close()
+                self._recorder = None
+
+    def _follow_stream(self):
+        # Пока поток жив, координаты публикует только он: из /stream, а пока
+        # /stream недоступен - опросом /position. У канала координат один
+        # писатель; tick() начинает опрос, только когда поток завершился
+        retry_at = 0.0
+        while not self._stop_flag.is_set():
+            if monotonic() >= retry_at:
+                try:
+                    for snapshot in iter_stream(
+                        1 / self.period, url=self.simulator_url, timeout=STREAM_TIMEOUT
+                    ):
+                        self._publish(
+                            {
+                                "x": snapshot["x"],
+                                "y": snapshot["y"],
+                                "tick": snapshot["tick"],
+                            }
+                        )
+                        if self._stop_flag.is_set():
+                            return
+                except requests.exceptions.HTTPError as e:
+                    if e.response is not None and e.response.status_code == 404:
+                        # симулятор не отдаёт поток (например, машине парка)
+                        return
+                    print(f"[{self.__class__.__name__}] поток /stream: {e}")
+                except requests.exceptions.RequestException as e:
+                    print(f"[{self.__class__.__name__}] поток /stream: {e}")
+                # поток оборвался - до новой попытки координаты опрашиваются
+                retry_at = monotonic() + STREAM_RETRY_INTERVAL
+            self._poll()
+            self._stop_flag.wait(self.period)
+
+    def tick(self):
+        if self._stream_thread is not None and self._stream_thread.is_alive():
+            return
+        self._poll()
+
+    def _poll(self):
+        try:
+            # текущие координаты (в двоичном формате, если симулятор умеет)
+            coordinates = get_position(self.simulator_url, self._session)
+        except requests.exceptions.RequestException as e:
+            print(f"[{self.__class__.__name__}]Ошибка запроса: {e}")
+            return
+        self._publish(coordinates)
+
+    def _publish(self, coordinates):
+        if self._recorder is not None:
+            with self._recorder_lock:
+                if self._recorder is not None:
+                    self._recorder.sample(
+                        monotonic(),
+                        coordinates.get("tick", 0),
+                        coordinates["x"],
+                        coordinates["y"],
+                    )
+        if self._telemetry is not None:
+            self._telemetry.position.write((coordinates["x"], coordinates["y"]))
+        else:
+            self.send("ControlSystem", "get_coordinates", coordinates)
+
+
+class Sensors(BlockingEntity):
+    """Периодически измеряет расстояния до препятствий по секторам
+
+    Расстояния и координаты берутся из одного снимка /telemetry симулятора
+    (в двоичном формате), поэтому относятся к одному шагу. Если симулятор
+    /telemetry не отдаёт (например, машине парка), датчики считаются
+    на месте по карте и позиции /position, а показания кэшируются
+    по позиции (sensor_cache.SensorCache): стоящей или медленно едущей
+    машине расстояния заново не пересчитываются.
+    С каналом telemetry измерения пишутся в разделяемую память, а не в очередь.
+    С record_path каждое измерение пишется в журнал миссии.
+    Статистика кэша раз в METRICS_REPORT_INTERVAL уходит маршрутизатору
+    шины (ROUTER_NAME) и вместе со статистикой шины попадает на /metrics.
+    """
+
+    period = 0.05
+    max_detect_distance = 30
+    num_sectors = 6
+    shared_readings = None  # общий кэш показаний машин (см. SensorCache)
+
+    def __init__(
+        self,
+        events_queue: Queue,
+        telemetry=None,
+        simulator_url=SIMULATOR_URL,
+        cache_size=SENSOR_CACHE_SIZE,
+        record_path=None,
+    ):
+        super().__init__(events_queue, simulator_url)
+        self._telemetry = telemetry
+        self._cache_size = cache_size
+        self._cache = None
+        self._remote = True  # симулятор отдаёт /telemetry
+        self._record_path = record_path
+        self._recorder = None
+        self._stats_sent = None  # когда статистика кэша отправлена последний раз
+
+    def setup(self):
+        self._session = requests.Session()
+        if self._record_path is not None:
+            self._recorder = MissionRecorder(self._record_path)
+
+    def _use_config(self, config):
+        self._config = config
+        self._cache = SensorCache(
+            config,
+            self.max_detect_distance,
+            num_sectors=self.num_sectors,
+            size=self._cache_size,
+            readings=self.shared_readings,
+        )
+
+    def teardown(self):
+        if self._recorder is not None:
+            self._recorder.close()
+        if self._cache is not None:
+            stats = self._cache.stats()
+            print(
+                f"[{self.__class__.__name__}] кэш датчиков: попаданий "
+                f"{stats['hits']}, промахов {stats['misses']}, "
+                f"без пересчёта на месте {stats['skips']}"
+            )
+
+    def tick(self):
+        try:
+            telemetry = self._remote_reading() if self._remote else None
+            if telemetry is not None:
+                self._publish(telemetry, telemetry["distances"])
+                return
+            if self._cache is None:
+                # карта шахты загружается частями, сжатой
+                self._use_config(get_config(self.simulator_url, self._session))
+            # текущие координаты (в двоичном формате, если симулятор умеет)
+            coordinates = get_position(self.simulator_url, self._session)
+        except requests.exceptions.RequestException as e:
+            print(f"[{self.__class__.__name__}]Ошибка запроса: {e}")
+            return
+        self._publish(coordinates)
+
+    def _remote_reading(self):
+        # None - симулятор не отдаёт /telemetry, дальше датчики считаются на месте
+        try:
+            return get_telemetry(
+                ("tick", "x", "y", "distances"),
+                self.num_sectors,
+                self.max_detect_distance,
+                self.simulator_url,
+                self._session,
+            )
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+        self._remote = False
+        return None
+
+    def _report_cache(self):
+        now = monotonic()
+        if (
+            self._stats_sent is not None
+            and now - self._stats_sent < METRICS_REPORT_INTERVAL
+        ):
+            return
+        self._stats_sent = now
+        stats = self._cache.stats()
+        self.send(
+            ROUTER_NAME,
+            "metrics",
+            {f"sensor_cache_{name}": value for name, value in stats.items()},
+        )
+
+    def _publish(self, coordinates, obstacle_distances=None):
+        if obstacle_distances is None:
+            obstacle_distances = self._cache.distances(
+                coordinates["x"], coordinates["y"]
+            )
+            self._report_cache()
+        obstacle_distances = list(obstacle_distances)
+        if self._recorder is not None:
+            self._recorder.sample(
+                monotonic(),
+                coordinates.get("tick", 0),
+                coordinates["x"],
+                coordinates["y"],
+                obstacle_distances,
+            )
+        obstacle_distances.append(coordinates["x"])
+        obstacle_distances.append(coordinates["y"])
+        if self._telemetry is not None:
+            self._telemetry.sensors.write(obstacle_distances)
+        else:
+            self.send("ControlSystem", "get_directions", obstacle_distances)
+
+
+class Servos(BlockingEntity):
+    """Передаёт команды скорости и направления приводам (симулятору)
+
+    Запросы идут через одно постоянное соединение. Если пока шёл запрос
+    в очереди накопилось несколько команд, отправляется только последняя.
+    """
+
+    def setup(self):
+        self._session = requests.Session()
+
+    def _latest_command(self, event):
+        deferred = []
+        while True:
+            try:
+                pending = self._own_queue.get_nowait()
+            except Empty:
+                break
+            if isinstance(pending, Event) and pending.operation == "set_velocity":
+                pending.consumed = monotonic()
+                event = pending
+            else:
+                deferred.append(pending)
+        # остальные сообщения (например, остановка) возвращаются в очередь
+        for pending in deferred:
+            self._own_queue.put(pending)
+        return event
+
+    @staticmethod
+    def _command_data(event):
+        data = dict(event.parameters)
+        data["trace"] = dict(data.get("trace", {}), command=event.trace())
+        data["trace"]["sent"] = monotonic()
+        return data
+
+    def on_set_velocity(self, event):
+        data = self._command_data(self._latest_command(event))
+        try:
+            # новые скорость и направление движения
+            set_velocity(data, self.simulator_url, self._session)
+        except requests.exceptions.RequestException as e:
+            print(f"[{self.__class__.__name__}]Ошибка запроса: {e}")
+
+
+class Drill(BlockingEntity):
+    """Бурит тоннель в контрольных точках"""
+
+    def on_drilling(self, event):
+        print(f"[{self.__class__.__name__}] бурим тоннель")
@@ -0,0 +1,24 @@
+from dataclasses import dataclass, field
+from time import monotonic
+
+
+# формат управляющих команд
+@dataclass
+class ControlEvent:
+    operation: str
+
+
+@dataclass
+class Event:
+    source: str  # отправитель
+    destination: str  # получатель
+    operation: str  # чего хочет (запрашиваемое действие)
+    parameters: str  # с какими параметрами
+    # отметки монотонных часов для измерения задержек, с:
+    # создание, передача диспетчером получателю и начало обработки
+    created: float = field(default_factory=monotonic)
+    dispatched: float = 0.0
+    consumed: float = 0.0
+
+    def trace(self):
+        return [self.created, self.dispatched, self.consumed]
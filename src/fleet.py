@@ -0,0 +1,266 @@
+import math
+
+import numpy as np
+
+from src.engine import DEFAULT_DT
+from src.geometry import get_obstacle_index
+
+# Радиус АРПБТ для столкновений машин между собой, px
+VEHICLE_RADIUS = 6
+
+# Начальный размер массивов состояния (растут удвоением)
+DEFAULT_FLEET_CAPACITY = 64
+
+# Соседние ячейки хэш-сетки, которые проверяются для каждой машины:
+# своя ячейка и половина соседних, чтобы каждая пара встречалась один раз
+_NEIGHBOUR_CELLS = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+class FleetSnapshot:
+    """Неизменяемая копия состояния парка после шага или команды
+
+    Симулятор публикует снимок, и запросы читают машины из него без
+    блокировки физики.
+    """
+
+    def __init__(self, fleet):
+        n = len(fleet)
+        self.tick = fleet.tick
+        self._slots = dict(fleet._slots)
+        self._ids = fleet._ids[:n].tolist()
+        self._x = fleet.x[:n].tolist()
+        self._y = fleet.y[:n].tolist()
+        self._speed = fleet.speed[:n].tolist()
+        self._direction = fleet.direction[:n].tolist()
+        self._collisions = fleet.collisions[:n].tolist()
+
+    def __contains__(self, vehicle_id):
+        return vehicle_id in self._slots
+
+    @property
+    def ids(self):
+        return self._ids
+
+    def position(self, vehicle_id):
+        """(x, y) машины"""
+        slot = self._slots[vehicle_id]
+        return self._x[slot], self._y[slot]
+
+    def vehicle(self, vehicle_id):
+        """Состояние одной машины словарём, как FleetEngine.vehicle"""
+        slot = self._slots[vehicle_id]
+        return {
+            "id": vehicle_id,
+            "x": self._x[slot],
+            "y": self._y[slot],
+            "speed": self._speed[slot],
+            "direction": self._direction[slot],
+            "collisions": self._collisions[slot],
+        }
+
+
+class FleetEngine:
+    """Симуляция нескольких АРПБТ на одной карте с общим фиксированным шагом
+
+    Состояние всех машин хранится в массивах NumPy, и один шаг физики
+    считается сразу для всех. Первые len(self) элементов массивов заняты
+    машинами, номер машины отображается на индекс через словарь.
+    """
+
+    def __init__(
+        self,
+        config,
+        dt=DEFAULT_DT,
+        vehicle_radius=VEHICLE_RADIUS,
+        capacity=DEFAULT_FLEET_CAPACITY,
+    ):
+        self.config = config
+        self.dt = dt
+        self.vehicle_radius = vehicle_radius
+        self.field_size = (config["field_width"], config["field_height"])
+        self.index = get_obstacle_index(config["obstacles"], self.field_size)
+
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.direction = np.zeros(capacity)
+        self.collisions = np.zeros(capacity, dtype=np.int64)
+        self._ids = np.zeros(capacity, dtype=np.int64)  # индекс -> номер машины
+        self._slots = {}  # номер машины -> индекс в массивах
+        self._next_id = 1
+
+        self.tick = 0  # номер шага симуляции
+
+    @property
+    def time(self):
+        """Симулированное время, с"""
+        return self.tick * self.dt
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, vehicle_id):
+        return vehicle_id in self._slots
+
+    @property
+    def ids(self):
+        return self._ids[: len(self)].tolist()
+
+    def _grow(self):
+        for name in ("x", "y", "speed", "direction", "collisions", "_ids"):
+            array = getattr(self, name)
+            grown = np.zeros(2 * len(array), dtype=array.dtype)
+            grown[: len(array)] = array
+            setattr(self, name, grown)
+
+    def add_vehicle(self, x=None, y=None):
+        """Новая машина (по умолчанию в стартовой точке); возвращает её номер"""
+        n = len(self)
+        if n == len(self.x):
+            self._grow()
+        start_x, start_y = self.config["start_position"]
+        vehicle_id = self._next_id
+        self._next_id += 1
+        self._slots[vehicle_id] = n
+        self._ids[n] = vehicle_id
+        self.x[n] = start_x if x is None else x
+        self.y[n] = start_y if y is None else y
+        self.speed[n] = 0.0
+        self.direction[n] = 0.0
+        self.collisions[n] = 0
+        return vehicle_id
+
+    def remove_vehicle(self, vehicle_id):
+        # на место удалённой машины переносится последняя, массивы остаются плотными
+        slot = self._slots.pop(vehicle_id)
+        last = len(self)
+        if slot != last:
+            for array in (self.x, self.y, self.speed, self.direction, self.collisions):
+                array[slot] = array[last]
+            moved_id = int(self._ids[last])
+            self._ids[slot] = moved_id
+            self._slots[moved_id] = slot
+
+    def reset(self, vehicle_id):
+        """Возврат машины в стартовую точку"""
+        slot = self._slots[vehicle_id]
+        self.x[slot], self.y[slot] = self.config["start_position"]
+        self.speed[slot] = 0.0
+        self.direction[slot] = 0.0
+
+    def set_velocity(self, vehicle_id, speed, direction):
+        slot = self._slots[vehicle_id]
+        self.speed[slot] = float(speed)
+        self.direction[slot] = float(direction)
+
+    def vehicle(self, vehicle_id):
+        """Состояние одной машины словарём"""
+        slot = self._slots[vehicle_id]
+        return {
+            "id": vehicle_id,
+            "x": float(self.x[slot]),
+            "y": float(self.y[slot]),
+            "speed": float(self.speed[slot]),
+            "direction": float(self.direction[slot]),
+            "collisions": int(self.collisions[slot]),
+        }
+
+    def snapshot(self):
+        """Копия состояния всех машин (FleetSnapshot)"""
+        return FleetSnapshot(self)
+
+    def _vehicle_contacts(self, old_x, old_y, new_x, new_y):
+        """Маски машин, которые за шаг сблизились с другой машиной до касания
+
+        Пары-кандидаты ищутся через хэш-сетку с ячейкой в диаметр машины:
+        машины сортируются по номеру ячейки, и для каждой соседней ячейки
+        диапазон машин находится двоичным поиском.
+        """
+        n = len(new_x)
+        hit = np.zeros(n, dtype=bool)
+        if n < 2:
+            return hit
+
+        diameter = 2 * self.vehicle_radius
+        cols = int(math.ceil(self.field_size[0] / diameter)) + 2
+        col = (new_x // diameter).astype(np.int64) + 1
+        row = (new_y // diameter).astype(np.int64) + 1
+        keys = row * cols + col
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        for dr, dc in _NEIGHBOUR_CELLS:
+            target = keys + dr * cols + dc
+            lo = np.searchsorted(sorted_keys, target, "left")
+            hi = np.searchsorted(sorted_keys, target, "right")
+            counts = hi - lo
+            if not counts.any():
+                continue
+            first = np.repeat(np.arange(n), counts)
+            shift = np.arange(counts.sum()) - np.repeat(
+                np.cumsum(counts) - counts, counts
+            )
+            second = order[np.repeat(lo, counts) + shift]
+            if (dr, dc) == (0, 0):
+                keep = first < second  # внутри ячейки каждая пара один раз
+                first, second = first[keep], second[keep]
+
+            new_d2 = (new_x[first] - new_x[second]) ** 2 + (
+                new_y[first] - new_y[second]
+            ) ** 2
+            old_d2 = (old_x[first] - old_x[second]) ** 2 + (
+                old_y[first] - old_y[second]
+            ) ** 2
+            # касание, в которое машины вошли на этом шаге; разъезжаться
+            # из уже перекрывающегося положения (например, на старте) можно
+            contact = (new_d2 < diameter**2) & (new_d2 < old_d2)
+            hit[first[contact]] = True
+            hit[second[contact]] = True
+        return hit
+
+    def step(self):
+        """Один шаг физики длительностью dt для всех машин"""
+        n = len(self)
+        if n:
+            x, y = self.x[:n], self.y[:n]
+            speed, direction = self.speed[:n], self.direction[:n]
+            moving = speed > 0
+
+            # Преобразование в математические координаты
+            math_angle = np.radians(90 - direction)
+            distance = np.where(moving, speed * self.dt, 0.0)
+            field_width, field_height = self.field_size
+            new_x = np.clip(x + distance * np.cos(math_angle), 0, field_width)
+            new_y = np.clip(y - distance * np.sin(math_angle), 0, field_height)
+
+            # столкновение с препятствием: остановка в точке контакта
+            contact = self.index.sweep_many(np.c_[x, y], np.c_[new_x, new_y])
+            blocked = moving & np.isfinite(contact)
+            fraction = np.where(blocked, contact, 1.0)
+            new_x = x + fraction * (new_x - x)
+            new_y = y + fraction * (new_y - y)
+
+            # столкновение машин: обе остаются на месте и останавливаются
+            crashed = moving & self._vehicle_contacts(x, y, new_x, new_y)
+            new_x[crashed] = x[crashed]
+            new_y[crashed] = y[crashed]
+
+            stopped = blocked | crashed
+            speed[stopped] = 0.0
+            self.collisions[:n] += stopped
+            x[:] = new_x
+            y[:] = new_y
+
+        self.tick += 1
+
+    def run(self, n):
+        """n шагов физики подряд"""
+        for _ in range(n):
+            self.step()
+
+    def advance_to(self, sim_time):
+        """Догнать заданный момент времени целыми шагами; возвращает число шагов"""
+        steps = int((sim_time - self.time) / self.dt)
+        if steps > 0:
+            self.run(steps)
+        return max(steps, 0)
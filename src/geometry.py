@@ -0,0 +1,497 @@
+import hashlib
+import json
+import math
+
+import numpy as np
+
+# Размер ячейки равномерной сетки по умолчанию, px
+DEFAULT_CELL_SIZE = 32
+
+# Допуск для касания при движении: смещение меньше этого не считается
+# проникновением в препятствие, px
+SWEEP_EPSILON = 1e-6
+
+# Зазор до препятствия, на котором останавливается машина при касании, px:
+# точка остановки остаётся снаружи фигуры, а не на её границе
+CONTACT_GAP = 0.01
+
+# Кэш индекса: строится один раз для одного и того же списка препятствий
+_index_cache = {"obstacles": None, "field_size": None, "index": None}
+
+
+def sector_directions(num_sectors):
+    """Единичные векторы лучей для каждого сектора (0 градусов - вверх)"""
+    rad = np.radians(np.arange(num_sectors) * (360 / num_sectors))
+    return np.sin(rad), -np.cos(rad)
+
+
+class ObstacleIndex:
+    """Пространственный индекс препятствий карты на равномерной сетке
+
+    Прямоугольник в CONFIG задаётся левым верхним углом и размерами
+    (так же, как он рисуется на карте), окружность - центром и радиусом.
+    """
+
+    def __init__(self, obstacles, field_size, cell_size=DEFAULT_CELL_SIZE):
+        self.field_width, self.field_height = field_size
+        self.cell_size = cell_size
+
+        circles = []
+        rectangles = []
+        for obst_type, (x, y), sizes in obstacles:
+            if obst_type == "circle":
+                circles.append((x, y, sizes[0]))
+            elif obst_type == "rectangle":
+                w, h = sizes
+                rectangles.append((x, y, x + w, y + h))
+
+        # circles: cx, cy, radius; rectangles: left, top, right, bottom
+        self.circles = np.array(circles, dtype=np.float64).reshape(-1, 3)
+        self.rectangles = np.array(rectangles, dtype=np.float64).reshape(-1, 4)
+
+        # ограничивающие прямоугольники: left, top, right, bottom
+        c = self.circles
+        self._circle_bounds = np.stack(
+            (
+                c[:, 0] - c[:, 2],
+                c[:, 1] - c[:, 2],
+                c[:, 0] + c[:, 2],
+                c[:, 1] + c[:, 2],
+            ),
+            axis=1,
+        )
+
+        # таблицы ячеек в формате CSR, по одной на каждый запас (margin)
+        self._tables = {}
+        self._point_cells = self._build_point_cells()
+
+    def _grid_shape(self, cell_size):
+        cols = max(1, math.ceil(self.field_width / cell_size))
+        rows = max(1, math.ceil(self.field_height / cell_size))
+        return cols, rows
+
+    def _cell_range(self, low, high, cell_size, count):
+        # диапазон ячеек по одной оси, прижатый к границам сетки
+        first = min(max(int(low // cell_size), 0), count - 1)
+        last = min(max(int(high // cell_size), 0), count - 1)
+        return first, last
+
+    def _cells_of_bounds(self, bounds, margin, cell_size):
+        # для каждого прямоугольника - список ячеек, которые он задевает
+        cols, rows = self._grid_shape(cell_size)
+        for left, top, right, bottom in bounds.tolist():
+            c0, c1 = self._cell_range(left - margin, right + margin, cell_size, cols)
+            r0, r1 = self._cell_range(top - margin, bottom + margin, cell_size, rows)
+            yield [
+                row * cols + col
+                for row in range(r0, r1 + 1)
+                for col in range(c0, c1 + 1)
+            ]
+
+    def _build_point_cells(self):
+        # списки фигур по ячейкам для точечных запросов без NumPy
+        cols, rows = self._grid_shape(self.cell_size)
+        cells = [[] for _ in range(cols * rows)]
+        shapes = [("circle", *c) for c in self.circles.tolist()]
+        shapes += [("rectangle", *r) for r in self.rectangles.tolist()]
+        bounds = np.concatenate((self._circle_bounds, self.rectangles))
+        for shape, shape_cells in zip(
+            shapes, self._cells_of_bounds(bounds, 0, self.cell_size)
+        ):
+            for cell in shape_cells:
+                cells[cell].append(shape)
+        return cells
+
+    def _csr(self, bounds, margin, cell_size):
+        cols, rows = self._grid_shape(cell_size)
+        cells = [[] for _ in range(cols * rows)]
+        for obst_id, shape_cells in enumerate(
+            self._cells_of_bounds(bounds, margin, cell_size)
+        ):
+            for cell in shape_cells:
+                cells[cell].append(obst_id)
+        offsets = np.zeros(len(cells) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(ids) for ids in cells])
+        ids = np.fromiter(
+            (obst_id for cell in cells for obst_id in cell),
+            dtype=np.int64,
+            count=offsets[-1],
+        )
+        return offsets, ids
+
+    def _table(self, margin):
+        """Таблица ячейка -> препятствия, расширенные на margin
+
+        Для больших запасов ячейка укрупняется до margin, чтобы одно
+        препятствие попадало лишь в несколько соседних ячеек.
+        """
+        table = self._tables.get(margin)
+        if table is None:
+            cell_size = max(self.cell_size, margin)
+            table = {
+                "cell_size": cell_size,
+                "cols": self._grid_shape(cell_size)[0],
+                "rows": self._grid_shape(cell_size)[1],
+                "circles": self._csr(self._circle_bounds, margin, cell_size),
+                "rectangles": self._csr(self.rectangles, margin, cell_size),
+            }
+            self._tables[margin] = table
+        return table
+
+    def contains(self, x, y):
+        """Находится ли точка внутри (или на границе) препятствия"""
+        cols, rows = self._grid_shape(self.cell_size)
+        col = min(max(int(x // self.cell_size), 0), cols - 1)
+        row = min(max(int(y // self.cell_size), 0), rows - 1)
+        for shape in self._point_cells[row * cols + col]:
+            if shape[0] == "circle":
+                _, cx, cy, radius = shape
+                if (x - cx) ** 2 + (y - cy) ** 2 <= radius**2:
+                    return True
+            else:
+                _, left, top, right, bottom = shape
+                if left <= x <= right and top <= y <= bottom:
+                    return True
+        return False
+
+    def shapes_near_segment(self, x0, y0, x1, y1):
+        """Фигуры из ячеек, которые задевает ограничивающий прямоугольник отрезка"""
+        cols, rows = self._grid_shape(self.cell_size)
+        c0, c1 = self._cell_range(min(x0, x1), max(x0, x1), self.cell_size, cols)
+        r0, r1 = self._cell_range(min(y0, y1), max(y0, y1), self.cell_size, rows)
+        if c0 == c1 and r0 == r1:
+            return self._point_cells[r0 * cols + c0]
+
+        shapes = {}
+        for row in range(r0, r1 + 1):
+            for col in range(c0, c1 + 1):
+                for shape in self._point_cells[row * cols + col]:
+                    shapes[id(shape)] = shape
+        return shapes.values()
+
+    def sweep(self, x0, y0, x1, y1):
+        """Первое касание препятствия при движении из (x0, y0) в (x1, y1)
+
+        Возвращает долю пути 0..1 до точки контакта (с зазором CONTACT_GAP)
+        или None, если путь свободен. Проверяются только препятствия рядом
+        с отрезком.
+        """
+        dx = x1 - x0
+        dy = y1 - y0
+        length = math.hypot(dx, dy)
+        if length == 0:
+            return None
+
+        first = None
+        for shape in self.shapes_near_segment(x0, y0, x1, y1):
+            if shape[0] == "circle":
+                t = segment_circle_contact(x0, y0, dx, dy, length, *shape[1:])
+            else:
+                t = segment_rectangle_contact(x0, y0, dx, dy, length, *shape[1:])
+            if t is not None and (first is None or t < first):
+                first = t
+                if first == 0:
+                    break
+        if first is None:
+            return None
+        return max(0.0, first - CONTACT_GAP / length)
+
+    def sweep_many(self, starts, ends):
+        """Пакетный вариант sweep для N отрезков (массивы формы (N, 2))
+
+        Возвращает массив долей пути до контакта, inf - путь свободен.
+        """
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        deltas = ends - starts
+        lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+        result = np.full(len(starts), np.inf)
+        if not len(starts) or not lengths.max() > 0:
+            return result
+
+        # запас округляется до степени двойки, чтобы таблицы ячеек
+        # не перестраивались при каждом новом максимуме длины
+        margin = 2.0 ** math.ceil(math.log2(lengths.max()))
+        pairs = self.candidates(starts, margin)
+        for kind, contacts, shapes in (
+            ("circles", segment_circle_contacts, self.circles),
+            ("rectangles", segment_rectangle_contacts, self.rectangles),
+        ):
+            ids, shape_ids = pairs[kind]
+            if len(shape_ids):
+                t = contacts(starts[ids], deltas[ids], lengths[ids], shapes[shape_ids])
+                np.minimum.at(result, ids, t)
+        result[lengths == 0] = np.inf
+        found = np.isfinite(result)
+        result[found] = np.maximum(result[found] - CONTACT_GAP / lengths[found], 0.0)
+        return result
+
+    def candidates(self, positions, margin):
+        """Пары (номер позиции, номер препятствия) для препятствий рядом с позициями
+
+        Возвращает словарь с парами отдельно для окружностей и прямоугольников.
+        Попадают все препятствия ближе margin к позиции (и, возможно, чуть дальше).
+        """
+        table = self._table(margin)
+        cell_size = table["cell_size"]
+        cols, rows = table["cols"], table["rows"]
+        col = np.clip((positions[:, 0] // cell_size).astype(np.int64), 0, cols - 1)
+        row = np.clip((positions[:, 1] // cell_size).astype(np.int64), 0, rows - 1)
+        cell = row * cols + col
+
+        pairs = {}
+        for kind in ("circles", "rectangles"):
+            offsets, ids = table[kind]
+            starts = offsets[cell]
+            counts = offsets[cell + 1] - starts
+            position_ids = np.repeat(np.arange(len(positions)), counts)
+            # сдвиг внутри каждого отрезка CSR
+            shift = np.arange(counts.sum()) - np.repeat(
+                np.cumsum(counts) - counts, counts
+            )
+            pairs[kind] = (position_ids, ids[np.repeat(starts, counts) + shift])
+        return pairs
+
+    def cast_rays(self, positions, max_distance, num_sectors=6):
+        """Пакетный расчёт расстояний до препятствий по секторам
+
+        positions - массив позиций формы (N, 2), результат - массив (N, num_sectors).
+        Проверяются только препятствия из ячеек рядом с каждой позицией.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        dx_dir, dy_dir = sector_directions(num_sectors)
+
+        result = field_distances(
+            positions, dx_dir, dy_dir, (self.field_width, self.field_height)
+        )
+        pairs = self.candidates(positions, max_distance)
+
+        position_ids, circle_ids = pairs["circles"]
+        if len(circle_ids):
+            t = ray_circle_distances(
+                positions[position_ids], dx_dir, dy_dir, self.circles[circle_ids]
+            )
+            np.minimum.at(result, position_ids, t)
+
+        position_ids, rectangle_ids = pairs["rectangles"]
+        if len(rectangle_ids):
+            t = ray_rectangle_distances(
+                positions[position_ids], dx_dir, dy_dir, self.rectangles[rectangle_ids]
+            )
+            np.minimum.at(result, position_ids, t)
+
+        return np.minimum(result, max_distance)
+
+    def clearance(self, positions, max_distance):
+        """Расстояние от позиций до ближайшего препятствия, не больше max_distance
+
+        positions - массив формы (N, 2); внутри препятствия расстояние 0.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        result = np.full(len(positions), float(max_distance))
+        pairs = self.candidates(positions, max_distance)
+
+        position_ids, circle_ids = pairs["circles"]
+        if len(circle_ids):
+            circles = self.circles[circle_ids]
+            points = positions[position_ids]
+            d = np.hypot(points[:, 0] - circles[:, 0], points[:, 1] - circles[:, 1])
+            np.minimum.at(result, position_ids, d - circles[:, 2])
+
+        position_ids, rectangle_ids = pairs["rectangles"]
+        if len(rectangle_ids):
+            left, top, right, bottom = self.rectangles[rectangle_ids].T
+            points = positions[position_ids]
+            qx = np.maximum(np.maximum(left - points[:, 0], points[:, 0] - right), 0)
+            qy = np.maximum(np.maximum(top - points[:, 1], points[:, 1] - bottom), 0)
+            np.minimum.at(result, position_ids, np.hypot(qx, qy))
+
+        return np.maximum(result, 0)
+
+
+def segment_circle_contact(x0, y0, dx, dy, length, cx, cy, radius):
+    """Доля пути до входа отрезка в окружность или None
+
+    Если отрезок начинается внутри окружности (или на её границе) и уходит
+    вглубь, контакт происходит сразу (0); движение наружу не блокируется.
+    """
+    fx = x0 - cx
+    fy = y0 - cy
+    a = dx * dx + dy * dy
+    b = 2 * (fx * dx + fy * dy)
+    c = fx * fx + fy * fy - radius * radius
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return None
+    sqrt_discr = math.sqrt(discriminant)
+
+    if c <= 0:
+        t_exit = (-b + sqrt_discr) / (2 * a)
+        return 0.0 if t_exit * length > SWEEP_EPSILON else None
+
+    t_enter = (-b - sqrt_discr) / (2 * a)
+    if 0 <= t_enter <= 1:
+        return t_enter
+    return None
+
+
+def segment_rectangle_contact(x0, y0, dx, dy, length, left, top, right, bottom):
+    """Доля пути до входа отрезка в прямоугольник или None (аналогично окружности)"""
+    t_near = -math.inf
+    t_far = math.inf
+    for p, d, low, high in ((x0, dx, left, right), (y0, dy, top, bottom)):
+        if d == 0:
+            if p < low or p > high:
+                return None
+            continue
+        t1 = (low - p) / d
+        t2 = (high - p) / d
+        if t1 > t2:
+            t1, t2 = t2, t1
+        t_near = max(t_near, t1)
+        t_far = min(t_far, t2)
+
+    if t_near > t_far or t_far < 0 or t_near > 1:
+        return None
+    if t_near > 0:
+        return t_near
+    # начало отрезка внутри прямоугольника или на его границе
+    return 0.0 if t_far * length > SWEEP_EPSILON else None
+
+
+def segment_circle_contacts(starts, deltas, lengths, circles):
+    """Векторный segment_circle_contact для пар (отрезок, окружность), inf - нет"""
+    fx = starts[:, 0] - circles[:, 0]
+    fy = starts[:, 1] - circles[:, 1]
+    dx, dy = deltas[:, 0], deltas[:, 1]
+    a = dx * dx + dy * dy
+    b = 2 * (fx * dx + fy * dy)
+    c = fx * fx + fy * fy - circles[:, 2] ** 2
+    discriminant = b * b - 4 * a * c
+    sqrt_discr = np.sqrt(np.maximum(discriminant, 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_enter = (-b - sqrt_discr) / (2 * a)
+        t_exit = (-b + sqrt_discr) / (2 * a)
+
+    inside = (c <= 0) & (t_exit * lengths > SWEEP_EPSILON)
+    enters = (c > 0) & (t_enter >= 0) & (t_enter <= 1)
+    t = np.where(inside, 0.0, np.where(enters, t_enter, np.inf))
+    return np.where(discriminant >= 0, t, np.inf)
+
+
+def segment_rectangle_contacts(starts, deltas, lengths, rectangles):
+    """Векторный segment_rectangle_contact для пар (отрезок, прямоугольник)"""
+    tx_min, tx_max = _slab(
+        starts[:, 0], deltas[:, 0], rectangles[:, 0], rectangles[:, 2]
+    )
+    ty_min, ty_max = _slab(
+        starts[:, 1], deltas[:, 1], rectangles[:, 1], rectangles[:, 3]
+    )
+    t_near = np.maximum(tx_min, ty_min)
+    t_far = np.minimum(tx_max, ty_max)
+
+    hit = (t_near <= t_far) & (t_far >= 0) & (t_near <= 1)
+    # начало отрезка внутри прямоугольника или на его границе
+    with np.errstate(invalid="ignore"):
+        inside = (t_near <= 0) & (t_far * lengths > SWEEP_EPSILON)
+    t = np.where(t_near > 0, t_near, np.where(inside, 0.0, np.inf))
+    return np.where(hit, t, np.inf)
+
+
+def field_distances(positions, dx_dir, dy_dir, field_size):
+    """Расстояние вдоль лучей до границ поля, форма (N, S)"""
+    field_width, field_height = field_size
+    px = positions[:, 0, None]
+    py = positions[:, 1, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tx = np.where(
+            dx_dir > 0,
+            (field_width - px) / dx_dir,
+            np.where(dx_dir < 0, -px / dx_dir, np.inf),
+        )
+        ty = np.where(
+            dy_dir > 0,
+            (field_height - py) / dy_dir,
+            np.where(dy_dir < 0, -py / dy_dir, np.inf),
+        )
+    return np.maximum(0, np.minimum(tx, ty))
+
+
+def ray_circle_distances(origins, dx_dir, dy_dir, circles):
+    """Расстояние вдоль лучей до окружностей для пар (начало луча, окружность)
+
+    origins и circles формы (P, 2) и (P, 3), результат - (P, S), inf если нет пересечения
+    """
+    ox = origins[:, 0, None] - circles[:, 0, None]
+    oy = origins[:, 1, None] - circles[:, 1, None]
+    radius = circles[:, 2, None]
+
+    a = dx_dir**2 + dy_dir**2
+    b = 2 * (dx_dir * ox + dy_dir * oy)
+    c = ox**2 + oy**2 - radius**2
+    discriminant = b**2 - 4 * a * c
+
+    sqrt_discr = np.sqrt(np.maximum(discriminant, 0))
+    t1 = (-b - sqrt_discr) / (2 * a)
+    t2 = (-b + sqrt_discr) / (2 * a)
+    # ближайший положительный корень (t1 <= t2); t1 <= 0 < t2 - начало луча
+    # внутри окружности или на границе, и луч идёт вглубь: расстояние 0
+    t = np.where(t1 > 0, t1, np.where(t2 > 0, 0.0, np.inf))
+    return np.where(discriminant >= 0, t, np.inf)
+
+
+def _slab(p, d, low, high):
+    # Интервал пересечения луча с полосой low <= p + t * d <= high
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t1 = (low - p) / d
+        t2 = (high - p) / d
+    t_min = np.minimum(t1, t2)
+    t_max = np.maximum(t1, t2)
+    # луч параллелен полосе: либо всегда внутри, либо никогда
+    parallel = d == 0
+    inside = (p >= low) & (p <= high)
+    t_min = np.where(parallel, np.where(inside, -np.inf, np.inf), t_min)
+    t_max = np.where(parallel, np.where(inside, np.inf, -np.inf), t_max)
+    return t_min, t_max
+
+
+def ray_rectangle_distances(origins, dx_dir, dy_dir, rectangles):
+    """Расстояние вдоль лучей до прямоугольников для пар (начало луча, прямоугольник)
+
+    origins и rectangles формы (P, 2) и (P, 4), результат - (P, S), inf если нет пересечения
+    """
+    left, top, right, bottom = (rectangles[:, i, None] for i in range(4))
+    tx_min, tx_max = _slab(origins[:, 0, None], dx_dir, left, right)
+    ty_min, ty_max = _slab(origins[:, 1, None], dy_dir, top, bottom)
+    t_near = np.maximum(tx_min, ty_min)
+    t_far = np.minimum(tx_max, ty_max)
+
+    # t_near <= 0 < t_far - начало луча внутри прямоугольника или на границе,
+    # и луч идёт вглубь или вдоль неё: расстояние 0
+    t = np.where(t_near > 0, t_near, 0.0)
+    hit = (t_near <= t_far) & (t_far > 0)
+    return np.where(hit, t, np.inf)
+
+
+def get_obstacle_index(obstacles, field_size):
+    """Индекс препятствий с кэшированием по самому списку obstacles"""
+    field_size = tuple(field_size)
+    if (
+        _index_cache["obstacles"] is not obstacles
+        or _index_cache["field_size"] != field_size
+    ):
+        _index_cache["index"] = ObstacleIndex(obstacles, field_size)
+        _index_cache["obstacles"] = obstacles
+        _index_cache["field_size"] = field_size
+    return _index_cache["index"]
+
+
+def map_hash(config):
+    """Хэш карты шахты: размеры поля и список препятствий"""
+    data = {
+        "field_width": config["field_width"],
+        "field_height": config["field_height"],
+        "obstacles": config["obstacles"],
+    }
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
@@ -0,0 +1,62 @@
+import math
+import struct
+import zlib
+
+import numpy as np
+
+from src.distance_field import rasterize
+from src.geometry import get_obstacle_index
+
+# Наибольший размер картинки карты, пикселей; большие карты уменьшаются
+# в 2, 4, 8... раз, пока не поместятся
+MAP_IMAGE_MAX_PIXELS = 4_000_000
+
+# Палитра: прозрачный фон, заливка и контур препятствий (как на странице)
+_PALETTE = bytes((255, 255, 255, 128, 128, 128, 0, 0, 0))
+_ALPHA = bytes((0, 255, 255))
+_FREE, _FILL, _EDGE = 0, 1, 2
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _chunk(kind, data):
+    crc = zlib.crc32(kind + data)
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+
+def encode_png(indices, palette, alpha=b""):
+    """PNG с палитрой из массива индексов цветов формы (высота, ширина)"""
+    height, width = indices.shape
+    # перед каждой строкой - байт фильтра (0 - без фильтра)
+    rows = np.zeros((height, width + 1), dtype=np.uint8)
+    rows[:, 1:] = indices
+    header = struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)
+    png = _PNG_SIGNATURE + _chunk(b"IHDR", header) + _chunk(b"PLTE", palette)
+    if alpha:
+        png += _chunk(b"tRNS", alpha)
+    png += _chunk(b"IDAT", zlib.compress(rows.tobytes(), 6))
+    return png + _chunk(b"IEND", b"")
+
+
+def map_downsample(config, max_pixels=MAP_IMAGE_MAX_PIXELS):
+    """Во сколько раз (степень двойки) уменьшить карту для картинки"""
+    pixels = config["field_width"] * config["field_height"]
+    if pixels <= max_pixels:
+        return 1
+    return 2 ** math.ceil(math.log2(math.sqrt(pixels / max_pixels)))
+
+
+def render_map_png(config, downsample=1):
+    """Картинка препятствий карты: один пиксель на downsample px поля
+
+    Препятствия закрашиваются по полю расстояний в центрах пикселей,
+    у границы препятствия - контур толщиной в пиксель.
+    """
+    index = get_obstacle_index(
+        config["obstacles"], (config["field_width"], config["field_height"])
+    )
+    sdf = rasterize(index, resolution=downsample, max_distance=downsample)
+    indices = np.full(sdf.shape, _FREE, dtype=np.uint8)
+    indices[sdf <= downsample / 2] = _EDGE
+    indices[sdf < -downsample / 2] = _FILL
+    return encode_png(indices, _PALETTE, _ALPHA)
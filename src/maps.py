@@ -0,0 +1,168 @@
+"""Карты шахты: загрузка из файлов и генерация для нагрузочных проверок
+
+    python -m src.maps maps/mine10k.json --obstacles 10000 --seed 1
+
+Карта - словарь в формате simulation.CONFIG: field_width, field_height,
+obstacles ([тип, (x, y), размеры]), start_position, end_position. Файлы
+хранятся в JSON, имя с окончанием .gz - JSON, сжатый gzip.
+"""
+
+import argparse
+import gzip
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+# Запуск как скрипта (python src/maps.py) тоже поддерживается
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.planner import plan_route
+
+MAP_KEYS = (
+    "field_width",
+    "field_height",
+    "obstacles",
+    "start_position",
+    "end_position",
+)
+
+SEED = 0
+
+# Шахта с камерно-столбовой выработкой: целики (прямоугольники) по сетке
+# с шагом PILLAR_PITCH, между ними штреки шириной не меньше MIN_DRIFT_WIDTH,
+# в штреках - завалы породы (окружности)
+PILLAR_PITCH = 64
+MIN_DRIFT_WIDTH = 16
+BOULDER_SHARE = 0.2  # доля завалов среди всех препятствий
+BOULDER_RADIUS = (2, 5)
+START_CLEARANCE = 12  # вокруг старта и финиша завалов нет, px
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def load_map(path):
+    """Карта из JSON-файла (.json или .json.gz)"""
+    with _open(path, "r") as f:
+        config = json.load(f)
+    missing = [key for key in MAP_KEYS if key not in config]
+    if missing:
+        raise ValueError(f"{path}: в карте нет полей {', '.join(missing)}")
+    return config
+
+
+def save_map(config, path):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with _open(path, "w") as f:
+        json.dump(config, f, separators=(",", ":"))
+
+
+def random_map(num_obstacles, seed=SEED, field_size=(800, 600)):
+    """Случайные окружности и прямоугольники на поле заданного размера"""
+    rng = np.random.default_rng(seed)
+    width, height = field_size
+    obstacles = []
+    for _ in range(num_obstacles):
+        x, y = rng.uniform(0, width), rng.uniform(0, height)
+        if rng.random() < 0.5:
+            obstacles.append(["circle", (x, y), (rng.uniform(2, 10),)])
+        else:
+            obstacles.append(
+                ["rectangle", (x, y), (rng.uniform(2, 20), rng.uniform(2, 20))]
+            )
+    return {
+        "field_width": width,
+        "field_height": height,
+        "obstacles": obstacles,
+        "start_position": (20, 20),
+        "end_position": (width - 20, height - 20),
+    }
+
+
+def mine_map(num_obstacles, seed=SEED, pitch=PILLAR_PITCH):
+    """Шахта из целиков и завалов с num_obstacles препятствиями
+
+    Размер поля растёт вместе с числом препятствий (плотность постоянна,
+    пропорции 4:3). Старт и финиш - на пересечениях штреков в
+    противоположных углах; при одном seed карта всегда одинакова.
+    """
+    rng = np.random.default_rng(seed)
+    num_boulders = int(num_obstacles * BOULDER_SHARE)
+    num_pillars = num_obstacles - num_boulders
+    cols = max(2, math.ceil(math.sqrt(num_pillars * 4 / 3)))
+    rows = max(2, math.ceil(num_pillars / cols))
+    width, height = cols * pitch, rows * pitch
+
+    # целик занимает часть ячейки сетки, отступ от края ячейки - не меньше
+    # половины штрека, поэтому соседние целики не смыкаются
+    margin = MIN_DRIFT_WIDTH / 2
+    cells = np.arange(num_pillars)
+    sizes = rng.uniform(pitch * 0.35, pitch - 2 * margin, size=(num_pillars, 2))
+    offsets = margin + rng.random((num_pillars, 2)) * (pitch - 2 * margin - sizes)
+    corners = np.stack((cells % cols, cells // cols), axis=1) * pitch + offsets
+
+    start = np.array((pitch, pitch), dtype=np.float64)
+    end = np.array(((cols - 1) * pitch, (rows - 1) * pitch), dtype=np.float64)
+    boulders = np.empty((0, 3))
+    while len(boulders) < num_boulders:
+        candidates = np.column_stack(
+            (
+                rng.uniform((0, 0), (width, height), size=(num_boulders, 2)),
+                rng.uniform(*BOULDER_RADIUS, size=num_boulders),
+            )
+        )
+        clearance = START_CLEARANCE + candidates[:, 2]
+        keep = (np.hypot(*(candidates[:, :2] - start).T) > clearance) & (
+            np.hypot(*(candidates[:, :2] - end).T) > clearance
+        )
+        boulders = np.concatenate((boulders, candidates[keep]))
+    boulders = boulders[:num_boulders]
+
+    obstacles = [
+        ["rectangle", [x, y], [w, h]]
+        for (x, y), (w, h) in zip(
+            np.round(corners, 1).tolist(), np.round(sizes, 1).tolist()
+        )
+    ]
+    obstacles += [["circle", [x, y], [r]] for x, y, r in np.round(boulders, 1).tolist()]
+    return {
+        "field_width": width,
+        "field_height": height,
+        "obstacles": obstacles,
+        "start_position": start.tolist(),
+        "end_position": end.tolist(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out", help="файл карты (.json или .json.gz)")
+    parser.add_argument("--obstacles", type=int, default=1000, help="число препятствий")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument(
+        "--random",
+        action="store_true",
+        help="случайные препятствия на поле 800x600 вместо шахты",
+    )
+    args = parser.parse_args(argv)
+    generate = random_map if args.random else mine_map
+    config = generate(args.obstacles, args.seed)
+    # карта без маршрута от старта к финишу для проверок бесполезна
+    if plan_route(config) is None:
+        parser.exit(1, f"на карте нет маршрута от старта к финишу (seed {args.seed})\n")
+    save_map(config, args.out)
+    print(
+        f"{args.out}: {len(config['obstacles'])} препятствий, "
+        f"поле {config['field_width']}x{config['field_height']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import re
+import threading
+from bisect import bisect_left
+
+# Границы корзин гистограммы задержек, с: 10 мкс ... 10 с по шкале 1-2-5
+LATENCY_BUCKETS = tuple(
+    base * scale for scale in (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0) for base in (1, 2, 5)
+) + (10.0,)
+
+# Границы корзин для величин в шагах симуляции (возраст данных)
+TICK_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Допустимые имена метрик и меток в текстовом формате Prometheus
+_METRIC_NAME = re.compile(r"[a-zA-Z_:][a-zA-Z0-9_:]*\Z")
+_LABEL_NAME = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*\Z")
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами, заранее выделенными под счётчики"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя корзина - +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self):
+        return {
+            "buckets": list(self.buckets),
+            "counts": list(self.counts),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Гистограмма из to_dict; ValueError, если снимок испорчен"""
+        if not isinstance(data, dict):
+            raise ValueError("histogram must be an object")
+        buckets = _numbers(data.get("buckets"), "buckets")
+        counts = _numbers(data.get("counts"), "counts")
+        if len(counts) != len(buckets) + 1 or buckets != sorted(buckets):
+            raise ValueError("histogram buckets and counts do not match")
+        histogram = cls(tuple(buckets))
+        histogram.counts = counts
+        histogram.sum = _number(data.get("sum"), "sum")
+        histogram.count = _number(data.get("count"), "count")
+        return histogram
+
+
+class MetricsRegistry:
+    """Счётчики, текущие значения и гистограммы с метками
+
+    Метрика определяется именем и кортежем пар (метка, значение).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, labels=(), value=0):
+        with self._lock:
+            self.gauges[(name, labels)] = value
+
+    def observe(self, name, labels=(), value=0.0, buckets=LATENCY_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def to_dict(self):
+        """Снимок для передачи между процессами (JSON)"""
+        with self._lock:
+            return {
+                "counters": [[n, list(l), v] for (n, l), v in self.counters.items()],
+                "gauges": [[n, list(l), v] for (n, l), v in self.gauges.items()],
+                "histograms": [
+                    [n, list(l), h.to_dict()] for (n, l), h in self.histograms.items()
+                ],
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Реестр из to_dict; ValueError, если снимок испорчен
+
+        Снимок приходит по сети (POST /metrics), поэтому имена, метки и
+        значения проверяются до того, как попадут в текст для Prometheus.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("metrics snapshot must be an object")
+        registry = cls()
+        for name, labels, value in _entries(data, "counters"):
+            registry.counters[(name, labels)] = _number(value, name)
+        for name, labels, value in _entries(data, "gauges"):
+            registry.gauges[(name, labels)] = _number(value, name)
+        for name, labels, value in _entries(data, "histograms"):
+            registry.histograms[(name, labels)] = Histogram.from_dict(value)
+        return registry
+
+    def render(self):
+        """Текстовый формат Prometheus"""
+        lines = []
+        with self._lock:
+            typed = set()
+
+            def declare(name, kind):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} {kind}")
+
+            for (name, labels), value in sorted(self.counters.items()):
+                declare(name, "counter")
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                declare(name, "gauge")
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                declare(name, "histogram")
+                cumulative = 0
+                bounds = [str(b) for b in histogram.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    bucket_labels = labels + (("le", bound),)
+                    lines.append(
+                        f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def observe_control_trace(registry, trace, actuated, current_tick):
+    """Задержки контура управления по трассе команды set_velocity
+
+    trace - словарь, который ControlSystem и Servos передают вместе с командой:
+    sample и command - отметки (создание, передача, обработка) события
+    с измерением и события с командой, sent - момент отправки запроса
+    приводам, tick - шаг симуляции, на котором сделано измерение.
+    actuated - момент применения команды в симуляторе.
+    """
+    hops = []
+    sample = trace.get("sample")
+    command = trace.get("command")
+    if sample:
+        hops.append(("sample_dispatch", sample[1] - sample[0]))
+        hops.append(("sample_delivery", sample[2] - sample[1]))
+        if command:
+            hops.append(("decision", command[0] - sample[2]))
+    if command:
+        hops.append(("command_dispatch", command[1] - command[0]))
+        hops.append(("command_delivery", command[2] - command[1]))
+        if trace.get("sent") is not None:
+            hops.append(("servos", trace["sent"] - command[2]))
+    if trace.get("sent") is not None:
+        hops.append(("actuation", actuated - trace["sent"]))
+
+    for hop, latency in hops:
+        registry.observe("control_hop_latency_seconds", (("hop", hop),), latency)
+    if sample:
+        registry.observe("control_loop_latency_seconds", (), actuated - sample[0])
+    if trace.get("tick") is not None:
+        registry.observe(
+            "control_sample_age_ticks", (), current_tick - trace["tick"], TICK_BUCKETS
+        )
+
+
+def _number(value, what):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{what}: expected a number")
+    return value
+
+
+def _numbers(values, what):
+    if not isinstance(values, list):
+        raise ValueError(f"{what}: expected a list")
+    return [_number(value, what) for value in values]
+
+
+def _entries(data, section):
+    # записи [имя, [[метка, значение], ...], значение] раздела снимка
+    entries = data.get(section, [])
+    if not isinstance(entries, list):
+        raise ValueError(f"{section}: expected a list")
+    for entry in entries:
+        if not isinstance(entry, list) or len(entry) != 3:
+            raise ValueError(f"{section}: expected [name, labels, value]")
+        name, labels, value = entry
+        if not isinstance(name, str) or not _METRIC_NAME.match(name):
+            raise ValueError(f"{section}: bad metric name {name!r}")
+        yield name, _labels(labels), value
+
+
+def _labels(pairs):
+    if not isinstance(pairs, list):
+        raise ValueError("labels: expected a list of pairs")
+    labels = tuple(tuple(pair) if isinstance(pair, list) else pair for pair in pairs)
+    for pair in labels:
+        if (
+            not isinstance(pair, tuple)
+            or len(pair) != 2
+            or not isinstance(pair[0], str)
+            or not _LABEL_NAME.match(pair[0])
+            or not isinstance(pair[1], str)
+        ):
+            raise ValueError(f"labels: bad pair {pair!r}")
+    return labels
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels)
+    return "{" + inner + "}"
@@ -0,0 +1,251 @@
+import heapq
+import math
+
+import numpy as np
+
+from src.distance_field import rasterize
+from src.geometry import get_obstacle_index, map_hash
+
+# Размер ячейки сетки планировщика, px
+PLANNER_CELL_SIZE = 8
+
+# Минимальный отступ маршрута от препятствий, px
+PLANNER_CLEARANCE = 8
+
+# Отступы, которые plan_route без явного clearance пробует по очереди, пока
+# маршрут не найдётся. С наименьшим в штреке maps.mine_map шириной
+# MIN_DRIFT_WIDTH = 16 остаются свободные ячейки: отступ плюс половина
+# диагонали ячейки (5.7 px) меньше половины ширины штрека
+PLANNER_CLEARANCES = (PLANNER_CLEARANCE, 4, 2)
+
+# Отступ, на котором маршрут проходит там, где позволяет ширина прохода, px:
+# не меньше safe_distance в update_speed_and_direction, иначе регулятор
+# принимает препятствие рядом с маршрутом за преграду и уводит машину в него
+PLANNER_SAFE_DISTANCE = 20
+
+# Во сколько раз дороже шаг по ячейке вплотную к препятствию, чем на отступе
+# PLANNER_SAFE_DISTANCE: A* обходит препятствия как можно дальше
+PLANNER_PROXIMITY_COST = 4.0
+
+# Соседи ячейки: смещение по строке, по столбцу и длина шага в ячейках
+_NEIGHBOURS = (
+    (-1, 0, 1.0),
+    (1, 0, 1.0),
+    (0, -1, 1.0),
+    (0, 1, 1.0),
+    (-1, -1, math.sqrt(2)),
+    (-1, 1, math.sqrt(2)),
+    (1, -1, math.sqrt(2)),
+    (1, 1, math.sqrt(2)),
+)
+
+# Сетки, построенные для карт: (хэш карты, ячейка, отступ) -> PlanningGrid
+_grid_cache = {}
+
+# Хэш последней карты, чтобы не считать его заново для того же CONFIG
+_hash_cache = {"config": None, "hash": None}
+
+
+class PlanningGrid:
+    """Сетка свободных ячеек с препятствиями, раздутыми на величину отступа
+
+    Ячейка свободна, если любая её точка дальше clearance от препятствий
+    (расстояние от центра не меньше clearance плюс половина диагонали).
+    Шаг по ячейке ближе PLANNER_SAFE_DISTANCE к препятствию дороже, поэтому
+    в широких проходах маршрут держится на отступе safe_distance регулятора.
+    Строится один раз на карту, дальше поиск пути не зависит от числа
+    препятствий.
+    """
+
+    def __init__(
+        self, config, cell_size=PLANNER_CELL_SIZE, clearance=PLANNER_CLEARANCE
+    ):
+        field_size = (config["field_width"], config["field_height"])
+        index = get_obstacle_index(config["obstacles"], field_size)
+        half_diagonal = cell_size * math.sqrt(2) / 2
+        margin = clearance + half_diagonal
+        safe = max(PLANNER_SAFE_DISTANCE + half_diagonal, margin)
+        sdf = rasterize(index, cell_size, safe + cell_size)
+        self.cell_size = cell_size
+        self.clearance = clearance
+        self.free = sdf >= margin
+        # запас ячейки до препятствия, обрезанный на безопасном отступе
+        self.level = np.minimum(sdf, safe)
+        # доля недостающего до безопасного отступа: 0 - на отступе, 1 - на margin
+        self._deficit = (safe - self.level) / max(safe - margin, 1e-9)
+        self.rows, self.cols = self.free.shape
+        self._adjacency = self._build_adjacency()
+
+    def cell_of(self, x, y):
+        col = min(max(int(x / self.cell_size), 0), self.cols - 1)
+        row = min(max(int(y / self.cell_size), 0), self.rows - 1)
+        return row, col
+
+    def center(self, row, col):
+        return (col + 0.5) * self.cell_size, (row + 0.5) * self.cell_size
+
+    def nearest_free(self, row, col):
+        """Ближайшая свободная ячейка (точка старта или цели может быть
+        в пределах отступа от препятствия)"""
+        if self.free[row, col]:
+            return row, col
+        rows, cols = np.nonzero(self.free)
+        if not rows.size:
+            return None
+        i = np.argmin((rows - row) ** 2 + (cols - col) ** 2)
+        return int(rows[i]), int(cols[i])
+
+    def line_of_sight(self, x0, y0, x1, y1, level=None):
+        """Проходит ли отрезок только по свободным ячейкам
+
+        С level - только по ячейкам, запас которых (self.level) не меньше level.
+        """
+        steps = int(math.hypot(x1 - x0, y1 - y0) / (self.cell_size / 2)) + 2
+        t = np.linspace(0.0, 1.0, steps)
+        cols = np.clip(
+            ((x0 + (x1 - x0) * t) / self.cell_size).astype(int), 0, self.cols - 1
+        )
+        rows = np.clip(
+            ((y0 + (y1 - y0) * t) / self.cell_size).astype(int), 0, self.rows - 1
+        )
+        if level is None:
+            return bool(self.free[rows, cols].all())
+        return bool((self.level[rows, cols] >= level).all())
+
+    def _build_adjacency(self):
+        # соседи каждой свободной ячейки с длиной шага; строится один раз
+        # на карту, чтобы в цикле поиска не проверять границы и углы
+        free = np.pad(self.free, 1)
+        rows, cols = self.rows, self.cols
+        adjacency = [() for _ in range(rows * cols)]
+        # цена входа в ячейку растёт при приближении к препятствию
+        penalty = (1.0 + PLANNER_PROXIMITY_COST * self._deficit.ravel()).tolist()
+        neighbours = []
+        for dr, dc, step in _NEIGHBOURS:
+            ok = free[1 + dr : 1 + dr + rows, 1 + dc : 1 + dc + cols] & self.free
+            if dr and dc:
+                # по диагонали нельзя срезать угол занятой ячейки
+                ok &= free[1 + dr : 1 + dr + rows, 1 : 1 + cols]
+                ok &= free[1 : 1 + rows, 1 + dc : 1 + dc + cols]
+            neighbours.append((ok.ravel(), dr * cols + dc, step))
+        for node in np.flatnonzero(self.free).tolist():
+            adjacency[node] = tuple(
+                (node + offset, step * penalty[node + offset])
+                for ok, offset, step in neighbours
+                if ok[node]
+            )
+        return adjacency
+
+    def astar(self, start, goal):
+        """Кратчайший путь по 8 соседям: список ячеек от start до goal или None"""
+        cols, adjacency = self.cols, self._adjacency
+        start_id = start[0] * cols + start[1]
+        goal_id = goal[0] * cols + goal[1]
+        goal_row, goal_col = goal
+        diagonal = math.sqrt(2) - 2  # диагональный шаг вместо двух прямых
+
+        cost = {start_id: 0.0}
+        parent = {start_id: None}
+        heap = [(0.0, 0.0, start_id)]
+        while heap:
+            _, g, node = heapq.heappop(heap)
+            if node == goal_id:
+                break
+            if g > cost[node]:
+                continue  # устаревшая запись кучи
+            for neighbour, step in adjacency[node]:
+                new_cost = g + step
+                if new_cost < cost.get(neighbour, math.inf):
+                    cost[neighbour] = new_cost
+                    parent[neighbour] = node
+                    # октильное расстояние до цели
+                    dr = abs(neighbour // cols - goal_row)
+                    dc = abs(neighbour % cols - goal_col)
+                    h = dr + dc + diagonal * (dr if dr < dc else dc)
+                    heapq.heappush(heap, (new_cost + h, new_cost, neighbour))
+        else:
+            return None
+
+        path = []
+        node = goal_id
+        while node is not None:
+            path.append(divmod(node, cols))
+            node = parent[node]
+        return path[::-1]
+
+    def plan(self, x0, y0, x1, y1):
+        """Ломаная из точек от (x0, y0) до (x1, y1) без начальной точки или None
+
+        Путь A* по ячейкам спрямляется: из каждой точки ломаной идём
+        к самой дальней ячейке пути, которую видно по прямой и не ближе
+        к препятствиям, чем сам путь A* на этом участке.
+        """
+        start = self.nearest_free(*self.cell_of(x0, y0))
+        goal = self.nearest_free(*self.cell_of(x1, y1))
+        if start is None or goal is None:
+            return None
+        cells = self.astar(start, goal)
+        if cells is None:
+            return None
+
+        points = [self.center(*cell) for cell in cells]
+        points[0], points[-1] = (x0, y0), (x1, y1)
+        levels = [float(self.level[cell]) for cell in cells]
+        route = []
+        anchor = 0
+        level = levels[0]  # наименьший запас пути A* от anchor до i
+        for i in range(1, len(points)):
+            level = min(level, levels[i])
+            if i > anchor + 1 and not self.line_of_sight(
+                *points[anchor], *points[i], level
+            ):
+                anchor = i - 1
+                route.append(points[anchor])
+                level = min(levels[anchor], levels[i])
+        route.append(points[-1])
+        return route
+
+
+def get_planning_grid(config, cell_size=PLANNER_CELL_SIZE, clearance=PLANNER_CLEARANCE):
+    """Сетка планировщика с кэшированием по хэшу карты"""
+    if _hash_cache["config"] is not config:
+        _hash_cache["hash"] = map_hash(config)
+        _hash_cache["config"] = config
+    key = (_hash_cache["hash"], cell_size, clearance)
+    if key not in _grid_cache:
+        _grid_cache[key] = PlanningGrid(config, cell_size, clearance)
+    return _grid_cache[key]
+
+
+def plan_route(config, checkpoints=(), cell_size=PLANNER_CELL_SIZE, clearance=None):
+    """Маршрут от start_position через контрольные точки к end_position
+
+    Возвращает список точек в формате /load_points: промежуточные точки
+    с типом waypoint, контрольные - checkpoint, последней идёт end_position.
+    Если какой-то участок недостижим, возвращает None.
+
+    Без clearance отступ выбирается по самому узкому проходу на пути:
+    берётся наибольший из PLANNER_CLEARANCES, с которым маршрут есть.
+    """
+    if clearance is None:
+        for clearance in PLANNER_CLEARANCES:
+            route = plan_route(config, checkpoints, cell_size, clearance)
+            if route is not None:
+                return route
+        return None
+
+    grid = get_planning_grid(config, cell_size, clearance)
+    targets = [("checkpoint", point["x"], point["y"]) for point in checkpoints]
+    targets.append(("waypoint", *config["end_position"]))
+
+    route = []
+    x, y = config["start_position"]
+    for point_type, tx, ty in targets:
+        leg = grid.plan(x, y, tx, ty)
+        if leg is None:
+            return None
+        for px, py in leg[:-1]:
+            route.append({"type": "waypoint", "x": round(px), "y": round(py)})
+        route.append({"type": point_type, "x": tx, "y": ty})
+        x, y = tx, ty
+    return route
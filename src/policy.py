@@ -0,0 +1,104 @@
+from types import MappingProxyType
+
+# Наибольшая скорость, которую пропускает политика по умолчанию
+MAX_SPEED = 30
+
+# Допустимое направление движения, градусы (регулятор с киберпрепятствием
+# сдвигает курс на -60, модуль безопасности компенсирует это на +60)
+DIRECTION_LIMITS = (-360, 360)
+
+# Номер правила, под которым считаются сообщения, не описанные в политике
+UNKNOWN_RULE = -1
+
+
+def default_policy(max_speed=MAX_SPEED):
+    """Разрешённые сообщения между сущностями АРПБТ (модули 1-3)
+
+    Правило - (отправитель, получатель, операция, ограничения), где
+    ограничения - словарь {параметр: (минимум, максимум)}.
+    """
+    velocity = {"speed": (0, max_speed), "direction": DIRECTION_LIMITS}
+    return (
+        ("Communication", "ControlSystem", "new_task", {}),
+        ("Communication", "SecurityModule", "new_task", {}),
+        ("Navigation", "ControlSystem", "get_coordinates", {}),
+        ("Navigation", "SecurityModule", "get_coordinates", {}),
+        ("Sensors", "ControlSystem", "get_directions", {}),
+        ("ControlSystem", "Servos", "set_velocity", velocity),
+        ("ControlSystem", "SecurityModule", "set_velocity", velocity),
+        ("SecurityModule", "Servos", "set_velocity", velocity),
+        ("ControlSystem", "Drill", "drilling", {}),
+        ("Sensors", "QueueManage", "metrics", {}),
+    )
+
+
+class Policy:
+    """Скомпилированная политика безопасности шины сообщений
+
+    Правила один раз превращаются в неизменяемую таблицу
+    (отправитель, получатель, операция) -> номер правила, а ограничения
+    параметров - в кортежи (параметр, минимум, максимум). Проверка сообщения -
+    один поиск в таблице и по одному сравнению на ограничение. Счётчики
+    пропущенных и отклонённых сообщений выделены заранее по числу правил
+    (последний элемент - сообщения вне политики).
+    """
+
+    def __init__(self, rules):
+        self.rules = tuple(
+            (source, destination, operation)
+            for source, destination, operation, _ in rules
+        )
+        if len(set(self.rules)) != len(self.rules):
+            raise ValueError("Правила политики повторяются")
+        self._index = MappingProxyType(
+            {triple: rule for rule, triple in enumerate(self.rules)}
+        )
+        self._limits = tuple(
+            tuple((name, low, high) for name, (low, high) in limits.items())
+            for *_, limits in rules
+        )
+        self.allowed = [0] * (len(self.rules) + 1)
+        self.denied = [0] * (len(self.rules) + 1)
+        self._reported = ([0] * len(self.allowed), [0] * len(self.denied))
+
+    def check(self, event):
+        """Номер правила, если сообщение разрешено, иначе None"""
+        rule = self._index.get((event.source, event.destination, event.operation))
+        if rule is None:
+            self.denied[UNKNOWN_RULE] += 1
+            return None
+        limits = self._limits[rule]
+        if limits:
+            parameters = event.parameters
+            try:
+                for name, low, high in limits:
+                    if not low <= parameters[name] <= high:
+                        self.denied[rule] += 1
+                        return None
+            except (KeyError, TypeError):
+                # параметра нет или он не число
+                self.denied[rule] += 1
+                return None
+        self.allowed[rule] += 1
+        return rule
+
+    def _labels(self, rule):
+        if rule == len(self.rules):
+            return (("rule", "unknown"),)
+        source, destination, operation = self.rules[rule]
+        return (
+            ("source", source),
+            ("destination", destination),
+            ("operation", operation),
+        )
+
+    def export(self, registry):
+        """Прирост счётчиков с прошлого вызова в MetricsRegistry"""
+        for name, counts, reported in (
+            ("policy_allowed_total", self.allowed, self._reported[0]),
+            ("policy_denied_total", self.denied, self._reported[1]),
+        ):
+            for rule, count in enumerate(counts):
+                if count != reported[rule]:
+                    registry.inc(name, self._labels(rule), count - reported[rule])
+                    reported[rule] = count
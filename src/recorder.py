@@ -0,0 +1,386 @@
+import inspect
+import json
+import os
+import struct
+
+import numpy as np
+
+from src import control_systems_calc
+from src.control_systems_calc import update_speed_and_direction
+
+# Заголовок файла журнала: сигнатура, версия формата, размер записи; с версии 2
+# за ним длина и сами параметры миссии в JSON (дополнены пробелами до 8 байт)
+LOG_MAGIC = b"ARPBTLOG"
+LOG_VERSION = 2
+_HEADER = struct.Struct("<8sII")
+_PARAMS_SIZE = struct.Struct("<I")
+
+# Параметры update_speed_and_direction, которые сохраняются в заголовке
+CONTROLLER_PARAMS = ("stop_radius", "safe_distance", "num_sectors", "cyber_obstacle")
+
+# Сколько расстояний по секторам помещается в одну запись; остальные
+# идут в следующих за ней записях KIND_DISTANCES (см. record_distances)
+MAX_SECTORS = 8
+
+# Сколько записей копится в памяти перед записью в файл
+DEFAULT_BUFFER_RECORDS = 256
+
+# Типы записей
+KIND_DECISION = 1  # входы и выходы update_speed_and_direction
+KIND_COMMAND = 2  # команда приводам после проверок безопасности
+KIND_SAMPLE = 3  # измерение координат и расстояний
+KIND_EVENT = 4  # сообщение шины между сущностями
+KIND_DISTANCES = 5  # продолжение расстояний предыдущей записи
+
+# Коды имён сущностей, операций и статусов регулятора (0 - неизвестное имя)
+ENTITY_NAMES = (
+    "",
+    "Communication",
+    "ControlSystem",
+    "Navigation",
+    "Sensors",
+    "Servos",
+    "Drill",
+    "SecurityModule",
+)
+OPERATION_NAMES = (
+    "",
+    "new_task",
+    "get_coordinates",
+    "get_directions",
+    "set_velocity",
+    "drilling",
+)
+STATUS_NAMES = ("", "moved", "success")
+
+_ENTITY_CODES = {name: code for code, name in enumerate(ENTITY_NAMES)}
+_OPERATION_CODES = {name: code for code, name in enumerate(OPERATION_NAMES)}
+_STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+# Фиксированная запись: для решения регулятора x, y, target_*, speed,
+# direction и distances - его входы, out_* и status - выходы; для команды
+# out_* - то, что ушло приводам; для события time/x/y - отметки времени
+# created/dispatched/consumed. Значения хранятся как float64 без потерь.
+# num_sectors - сколько расстояний в поле distances этой записи.
+RECORD_DTYPE = np.dtype(
+    [
+        ("time", "<f8"),
+        ("tick", "<i8"),
+        ("kind", "u1"),
+        ("source", "u1"),
+        ("destination", "u1"),
+        ("operation", "u1"),
+        ("status", "u1"),
+        ("num_sectors", "u1"),
+        ("x", "<f8"),
+        ("y", "<f8"),
+        ("target_x", "<f8"),
+        ("target_y", "<f8"),
+        ("speed", "<f8"),
+        ("direction", "<f8"),
+        ("max_speed", "<f8"),
+        ("out_speed", "<f8"),
+        ("out_direction", "<f8"),
+        ("distances", "<f8", (MAX_SECTORS,)),
+    ]
+)
+_RECORD = struct.Struct(f"<dq6B9d{MAX_SECTORS}d")
+assert _RECORD.size == RECORD_DTYPE.itemsize
+
+_NO_CODES = (0,) * 4
+_NO_VALUES = (0.0,) * 9
+_NO_DISTANCES = (0.0,) * MAX_SECTORS
+
+
+def controller_params(controller=None):
+    """Все параметры регулятора: значения по умолчанию и controller поверх них
+
+    cyber_obstacle=None раскрывается в текущее значение CYBER_OBSTACLE, чтобы
+    повтор не зависел от того, каким оно будет при повторе.
+    """
+    defaults = inspect.signature(update_speed_and_direction).parameters
+    params = {name: defaults[name].default for name in CONTROLLER_PARAMS}
+    params.update(controller or {})
+    if params["cyber_obstacle"] is None:
+        params["cyber_obstacle"] = control_systems_calc.CYBER_OBSTACLE
+    return params
+
+
+def _header(params):
+    blob = json.dumps(params, sort_keys=True).encode("utf-8")
+    blob += b" " * (-len(blob) % 8)
+    return (
+        _HEADER.pack(LOG_MAGIC, LOG_VERSION, _RECORD.size)
+        + _PARAMS_SIZE.pack(len(blob))
+        + blob
+    )
+
+
+def _create_log(path, header):
+    # файл журнала появляется сразу с заголовком: процессы, открывшие его
+    # одновременно, не запишут заголовок второй раз
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(header)
+    try:
+        os.link(temporary, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(temporary)
+
+
+class MissionRecorder:
+    """Журнал миссии из записей фиксированного размера
+
+    Записи упаковываются в буфер в памяти и дописываются в конец файла
+    пачками по buffer_records, поэтому запись почти ничего не стоит
+    в цикле управления. Формат записи - RECORD_DTYPE, файл читается
+    через load_log без разбора.
+
+    Расстояния сверх MAX_SECTORS уходят в записи KIND_DISTANCES сразу за
+    основной. Группа записей всегда попадает в файл за один сброс буфера,
+    поэтому в один журнал могут писать несколько процессов.
+
+    В заголовок нового журнала пишутся параметры регулятора (controller,
+    см. controller_params) и max_speed - по ним replay повторяет решения.
+    Если журнал уже создан другим процессом, его заголовок не меняется.
+    """
+
+    def __init__(
+        self,
+        path,
+        buffer_records=DEFAULT_BUFFER_RECORDS,
+        controller=None,
+        max_speed=None,
+    ):
+        self.path = path
+        self.params = {
+            "controller": controller_params(controller),
+            "max_speed": max_speed,
+        }
+        header = _header(self.params)
+        if not os.path.exists(path):
+            _create_log(path, header)
+        new_file = os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if new_file:
+            self._file.write(header)
+        self._buffer = bytearray(_RECORD.size * buffer_records)
+        self._capacity = buffer_records
+        self._count = 0
+
+    def _pack(self, time, tick, kind, codes, values, distances):
+        _RECORD.pack_into(
+            self._buffer,
+            self._count * _RECORD.size,
+            time,
+            tick,
+            kind,
+            *codes,
+            *values,
+            *distances,
+            *_NO_DISTANCES[len(distances) :],
+        )
+        self._count += 1
+
+    def _append(
+        self, time, tick, kind, codes=_NO_CODES, values=_NO_VALUES, distances=()
+    ):
+        # codes - (source, destination, operation, status); values - девять
+        # чисел от x до out_direction
+        distances = tuple(distances)
+        records = max(1, -(-len(distances) // MAX_SECTORS))
+        if self._count + records > self._capacity:
+            # группа записей не разрывается между сбросами буфера
+            self.flush()
+            if records > self._capacity:
+                self._buffer = bytearray(_RECORD.size * records)
+                self._capacity = records
+        head = distances[:MAX_SECTORS]
+        self._pack(time, tick, kind, codes + (len(head),), values, head)
+        for start in range(MAX_SECTORS, len(distances), MAX_SECTORS):
+            part = distances[start : start + MAX_SECTORS]
+            codes = _NO_CODES + (len(part),)
+            self._pack(time, tick, KIND_DISTANCES, codes, _NO_VALUES, part)
+        if self._count == self._capacity:
+            self.flush()
+
+    def decision(
+        self,
+        time,
+        tick,
+        position,
+        target,
+        speed,
+        direction,
+        distances,
+        max_speed,
+        result,
+    ):
+        """Вызов update_speed_and_direction: аргументы и результат"""
+        out_speed, out_direction, status = result
+        codes = (0, 0, 0, _STATUS_CODES.get(status, 0))
+        values = (
+            *position,
+            *target,
+            speed,
+            direction,
+            max_speed,
+            out_speed,
+            out_direction,
+        )
+        self._append(time, tick, KIND_DECISION, codes, values, distances)
+
+    def command(self, time, tick, speed, direction):
+        """Команда, отправленная приводам"""
+        values = _NO_VALUES[:7] + (speed, direction)
+        self._append(time, tick, KIND_COMMAND, values=values)
+
+    def sample(self, time, tick, x, y, distances=()):
+        """Измерение координат и (если есть) расстояний по секторам"""
+        values = (x, y) + _NO_VALUES[2:]
+        self._append(time, tick, KIND_SAMPLE, values=values, distances=distances)
+
+    def event(self, event, tick=0):
+        """Сообщение шины (без параметров) с отметками времени"""
+        codes = (
+            _ENTITY_CODES.get(event.source, 0),
+            _ENTITY_CODES.get(event.destination, 0),
+            _OPERATION_CODES.get(event.operation, 0),
+            0,
+        )
+        values = (event.dispatched, event.consumed) + _NO_VALUES[2:]
+        self._append(event.created, tick, KIND_EVENT, codes, values)
+
+    def flush(self):
+        if self._count:
+            self._file.write(memoryview(self._buffer)[: self._count * _RECORD.size])
+            self._count = 0
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_header(path):
+    # (смещение первой записи, параметры миссии); в журнале версии 1
+    # параметров нет
+    with open(path, "rb") as f:
+        magic, version, record_size = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != LOG_MAGIC or version not in (1, 2) or record_size != _RECORD.size:
+            raise ValueError(f"{path}: неподдерживаемый формат журнала")
+        if version == 1:
+            return _HEADER.size, {}
+        (size,) = _PARAMS_SIZE.unpack(f.read(_PARAMS_SIZE.size))
+        params = json.loads(f.read(size))
+    return _HEADER.size + _PARAMS_SIZE.size + size, params
+
+
+def log_params(path):
+    """Параметры миссии из заголовка журнала: {"controller", "max_speed"}"""
+    return _read_header(path)[1]
+
+
+def load_log(path):
+    """Журнал как массив записей RECORD_DTYPE, отображённый в память
+
+    Отбор нужных записей делается средствами NumPy без чтения всего
+    файла, например log[log["kind"] == KIND_DECISION]["out_direction"].
+    """
+    offset, _ = _read_header(path)
+    # незаконченная последняя запись (например, после аварии) отбрасывается
+    count = (os.path.getsize(path) - offset) // _RECORD.size
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=offset, shape=(count,))
+
+
+def record_distances(log, record_id):
+    """Все расстояния по секторам записи record_id журнала load_log"""
+    distances = log["distances"][record_id][: log["num_sectors"][record_id]].tolist()
+    record_id += 1
+    while record_id < len(log) and log["kind"][record_id] == KIND_DISTANCES:
+        record = log[record_id]
+        distances += record["distances"][: record["num_sectors"]].tolist()
+        record_id += 1
+    return distances
+
+
+def replay(path, controller=None, security=None, chunk_size=65536):
+    """Повтор решений регулятора из журнала
+
+    Сохранённые входы по порядку подаются в update_speed_and_direction
+    с параметрами регулятора из заголовка журнала (controller заменяет
+    часть из них) и сравниваются с записанными выходами. max_speed берётся
+    из каждого решения: в заголовке он тот, с которым миссия началась.
+    Если задана проверка security(speed, direction) -> (speed, direction),
+    её результат сравнивается с командой приводам, записанной следом
+    за решением. Без controller на той же версии регулятора повтор
+    должен совпасть бит в бит.
+    """
+    log = load_log(path)
+    controller = dict(log_params(path).get("controller", {}), **(controller or {}))
+    report = {"decisions": 0, "mismatches": 0, "first_mismatch": None}
+    if security is not None:
+        report.update(commands=0, command_mismatches=0, first_command_mismatch=None)
+
+    kinds = np.asarray(log["kind"])
+    decision_ids = np.flatnonzero(kinds == KIND_DECISION)
+    command_ids = np.flatnonzero(kinds == KIND_COMMAND)
+    # команда, относящаяся к решению: первая после него и раньше следующего
+    following = np.searchsorted(command_ids, decision_ids)
+    next_decision = np.append(decision_ids[1:], len(log))
+
+    def mismatch(name, record_id):
+        report[f"{name}mismatches"] += 1
+        if report[f"first_{name}mismatch"] is None:
+            report[f"first_{name}mismatch"] = record_id
+
+    for start in range(0, len(decision_ids), chunk_size):
+        ids = decision_ids[start : start + chunk_size]
+        # столбцы переводятся в числа Python сразу для всей пачки
+        columns = {name: log[name][ids].tolist() for name in RECORD_DTYPE.names}
+        for i, record_id in enumerate(ids.tolist()):
+            distances = columns["distances"][i][: columns["num_sectors"][i]]
+            if record_id + 1 < len(log) and kinds[record_id + 1] == KIND_DISTANCES:
+                distances = record_distances(log, record_id)
+            speed, direction, status = update_speed_and_direction(
+                (columns["x"][i], columns["y"][i]),
+                (columns["target_x"][i], columns["target_y"][i]),
+                columns["speed"][i],
+                columns["direction"][i],
+                distances,
+                columns["max_speed"][i],
+                **controller,
+            )
+            report["decisions"] += 1
+            if (
+                speed != columns["out_speed"][i]
+                or direction != columns["out_direction"][i]
+                or status != STATUS_NAMES[columns["status"][i]]
+            ):
+                mismatch("", record_id)
+
+            j = following[start + i]
+            if security is None or j == len(command_ids):
+                continue
+            command_id = int(command_ids[j])
+            if command_id > next_decision[start + i]:
+                continue
+            report["commands"] += 1
+            command = log[command_id]
+            if security(speed, direction) != (
+                float(command["out_speed"]),
+                float(command["out_direction"]),
+            ):
+                mismatch("command_", command_id)
+
+    return report
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+
+from src.geometry import map_hash
+from src.sensors_calc import calculate_obstacle_distances
+
+# Сколько показаний хранит кэш датчиков одной машины
+SENSOR_CACHE_SIZE = 4096
+
+# Шаг квантования позиции, px: /position и так округляет координаты
+# до целых пикселей, поэтому с шагом 1 показания точные
+SENSOR_QUANTUM = 1.0
+
+# Хэш последней карты, чтобы не считать его заново для того же CONFIG
+_hash_cache = {"config": None, "hash": None}
+
+
+def _config_hash(config):
+    if _hash_cache["config"] is not config:
+        _hash_cache["hash"] = map_hash(config)
+        _hash_cache["config"] = config
+    return _hash_cache["hash"]
+
+
+class SensorCache:
+    """Показания датчиков с кэшем по квантованной позиции
+
+    Ключ кэша - (хэш карты, quantum, позиция в шагах quantum, число
+    секторов, дальность); расстояния считаются для центра шага, поэтому одинаковы
+    для всех позиций с тем же ключом. Кэш ограничен size записями, при
+    переполнении вытесняется давно не запрошенная (LRU).
+
+    Карта между вызовами не меняется, поэтому если машина осталась в том
+    же шаге, что и при прошлом вызове, повторяется прошлое показание без
+    поиска в кэше (skips); hits и misses - попадания и промахи кэша.
+
+    readings - общий OrderedDict для кэшей нескольких машин одного
+    процесса (машины на одном маршруте получают показания друг друга).
+    """
+
+    def __init__(
+        self,
+        config,
+        max_detect_distance,
+        num_sectors=6,
+        size=SENSOR_CACHE_SIZE,
+        quantum=SENSOR_QUANTUM,
+        readings=None,
+    ):
+        self.config = config
+        self.max_detect_distance = max_detect_distance
+        self.num_sectors = num_sectors
+        self.size = size
+        self.quantum = quantum
+        self._field_size = (config["field_width"], config["field_height"])
+        self._map_hash = _config_hash(config)
+        self._readings = OrderedDict() if readings is None else readings
+        self._last = None  # (ключ, показание) прошлого вызова
+        self.hits = 0
+        self.misses = 0
+        self.skips = 0
+
+    def distances(self, x, y):
+        """Расстояния до препятствий по секторам (новый список на каждый вызов)"""
+        qx, qy = round(x / self.quantum), round(y / self.quantum)
+        key = (
+            self._map_hash,
+            self.quantum,
+            qx,
+            qy,
+            self.num_sectors,
+            self.max_detect_distance,
+        )
+        if self._last is not None and self._last[0] == key:
+            self.skips += 1
+            return list(self._last[1])
+
+        reading = self._readings.get(key)
+        if reading is not None:
+            self.hits += 1
+            self._readings.move_to_end(key)
+        else:
+            self.misses += 1
+            reading = tuple(
+                calculate_obstacle_distances(
+                    qx * self.quantum,
+                    qy * self.quantum,
+                    self.config["obstacles"],
+                    self._field_size,
+                    self.max_detect_distance,
+                    self.num_sectors,
+                )
+            )
+            self._readings[key] = reading
+            if len(self._readings) > self.size:
+                self._readings.popitem(last=False)
+        self._last = (key, reading)
+        return list(reading)
+
+    def stats(self):
+        """Счётчики кэша; hit_rate - доля вызовов без расчёта"""
+        calls = self.hits + self.misses + self.skips
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skips": self.skips,
+            "entries": len(self._readings),
+            "hit_rate": (calls - self.misses) / calls if calls else 0.0,
+        }
@@ -0,0 +1,91 @@
+import struct
+from multiprocessing import shared_memory
+
+# Заголовок записи: счётчик версий seqlock
+_SEQ = struct.Struct("Q")
+
+
+class SeqlockRecord:
+    """Запись из нескольких чисел в разделяемой памяти (один писатель)
+
+    Писатель делает счётчик нечётным, записывает значения и снова делает
+    его чётным. Читатель повторяет чтение, пока не получит одинаковый
+    чётный счётчик до и после копирования значений, поэтому всегда видит
+    целый последний образец без блокировок и очередей.
+    """
+
+    def __init__(self, size, name=None):
+        self.size = size
+        self._values = struct.Struct(f"{size}d")
+        create = name is None
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=create, size=_SEQ.size + self._values.size
+        )
+        if create:
+            _SEQ.pack_into(self._shm.buf, 0, 0)
+        self._seq = _SEQ.unpack_from(self._shm.buf, 0)[0]
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __reduce__(self):
+        # в другом процессе подключаемся к тому же сегменту по имени
+        return (self.__class__, (self.size, self.name))
+
+    def write(self, values):
+        buf = self._shm.buf
+        self._seq += 1
+        _SEQ.pack_into(buf, 0, self._seq)
+        self._values.pack_into(buf, _SEQ.size, *values)
+        self._seq += 1
+        _SEQ.pack_into(buf, 0, self._seq)
+
+    def read(self):
+        """Последний записанный образец: (номер версии, значения)
+
+        Номер версии 0 означает, что в запись ещё ничего не писали.
+        """
+        buf = self._shm.buf
+        while True:
+            before = _SEQ.unpack_from(buf, 0)[0]
+            if before % 2:
+                continue
+            values = self._values.unpack_from(buf, _SEQ.size)
+            if _SEQ.unpack_from(buf, 0)[0] == before:
+                return before // 2, values
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+
+class TelemetryChannel:
+    """Канал высокочастотной телеметрии между сущностями
+
+    position - координаты (x, y) от Navigation,
+    sensors - расстояния по секторам и координаты измерения от Sensors.
+    """
+
+    def __init__(self, num_sectors=6, names=None):
+        position_name, sensors_name = names or (None, None)
+        self.num_sectors = num_sectors
+        self.position = SeqlockRecord(2, position_name)
+        self.sensors = SeqlockRecord(num_sectors + 2, sensors_name)
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.num_sectors, (self.position.name, self.sensors.name)),
+        )
+
+    def close(self):
+        self.position.close()
+        self.sensors.close()
+
+    def unlink(self):
+        """Удаление сегментов; вызывается создателем канала после остановки"""
+        self.position.unlink()
+        self.sensors.unlink()
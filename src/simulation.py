@@ -1,9 +1,67 @@
-from flask import Flask, jsonify, request, render_template_string
+from flask import (
+    Flask,
+    Response,
+    jsonify,
+    request,
+    render_template_string,
+    stream_with_context,
+)
+import gzip
+import hashlib
+import json
 import math
+import os
+import struct
+import sys
+import threading
 import time
 
+# Симулятор запускается как скрипт (python src/simulation.py),
+# поэтому добавляем корень проекта в путь поиска модулей
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import wire
+from src.distance_field import load_distance_field
+from src.engine import SimulationEngine
+from src.fleet import FleetEngine
+from src.geometry import get_obstacle_index
+from src.map_image import map_downsample, render_map_png
+from src.maps import load_map
+from src.metrics import MetricsRegistry, observe_control_trace
+from src.planner import plan_route
+from src.telemetry import TelemetryHub, format_sse
+from src.trail import to_json_points
+
 app = Flask(__name__)
 
+# Проверять столкновения по заранее построенному растру карты (O(1) на запрос)
+# вместо точной проверки по препятствиям; растр кэшируется на диске
+USE_DISTANCE_FIELD = False
+
+# Ограничение длины хранимой траектории (None - без ограничения) и допуск
+# её упрощения в пикселях (0 - сохранять все точки)
+TRAIL_MAX_POINTS = 50000
+TRAIL_TOLERANCE = 0.5
+
+# Физику шагает отдельный поток с частотой 1/dt; без него (например,
+# в замерах) симуляцию продвигают вызовами update_position()
+PHYSICS_THREAD = True
+
+# Сколько шагов физики update_position() догоняет за один вызов; если
+# симуляция отстала сильнее (сервер простаивал, поток не получал
+# процессор), пропущенное время не навёрстывается
+MAX_CATCHUP_STEPS = 10
+
+# Файл карты (см. src/maps.py); без него используется встроенная карта CONFIG
+MAP_FILE = os.environ.get("SIMULATOR_MAP")
+
+# Наибольшее число препятствий в одном ответе /obstacles
+OBSTACLE_CHUNK_LIMIT = 10000
+
+# С какого числа препятствий страница рисует карту по картинке /map.png,
+# не загружая сами препятствия
+MAP_IMAGE_THRESHOLD = 5000
+
 # Конфигурация шахты и препятствий
 CONFIG = {
     "field_width": 800,
@@ -29,111 +87,415 @@ CONFIG = {
     "start_position": (20, 20),
     "end_position": (691, 68),
 }
+if MAP_FILE:
+    CONFIG = load_map(MAP_FILE)
 
-# Глобальное состояние
+# Глобальное состояние (положение АРПБТ хранит движок симуляции)
 state = {
-    "x": CONFIG["start_position"][0],
-    "y": CONFIG["start_position"][1],
-    "speed": 0.0,
-    "direction": 0.0,
     "points": [],
-    "trail": [],
-    "last_update": time.time(),
+    # момент time.monotonic(), соответствующий нулю часов движка
+    "started": time.monotonic(),
+    "points_seq": 0,  # номер версии списка точек, растёт при каждом изменении
 }
 
+# Пространственный индекс препятствий, общий для симулятора и датчиков
+OBSTACLE_INDEX = get_obstacle_index(
+    CONFIG["obstacles"], (CONFIG["field_width"], CONFIG["field_height"])
+)
+DISTANCE_FIELD = load_distance_field(CONFIG) if USE_DISTANCE_FIELD else None
+
 
 def is_collision(x, y):
     """Проверка столкновения с препятствиями"""
-    for obs in CONFIG["obstacles"]:
-        obs_type, pos, params = obs
-        cx, cy = pos
+    if DISTANCE_FIELD is not None:
+        return DISTANCE_FIELD.contains(x, y)
+    return OBSTACLE_INDEX.contains(x, y)
+
+
+# Движок симуляции; сервер лишь продвигает его вслед за настенными часами
+engine = SimulationEngine(
+    CONFIG,
+    collider=OBSTACLE_INDEX if DISTANCE_FIELD is None else DISTANCE_FIELD,
+    trail_max_points=TRAIL_MAX_POINTS,
+    trail_tolerance=TRAIL_TOLERANCE,
+)
 
-        if obs_type == "circle":
-            radius = params[0]
-            if (x - cx) ** 2 + (y - cy) ** 2 <= radius**2:
-                return True
 
-        elif obs_type == "rectangle":
-            w, h = params
-            if cx <= x <= cx + w and cy <= y <= cy + h:
-                return True
+# Шаги физики могут запрашивать несколько потоков сервера одновременно
+physics_lock = threading.Lock()
 
-    return False
+# Рассылка телеметрии подписчикам /stream после каждого шага
+telemetry_hub = TelemetryHub()
+
+# Задержки контура управления, измеренные симулятором; статистика шины
+# сообщений приходит от диспетчера сущностей через POST /metrics
+metrics = MetricsRegistry()
+
+
+def telemetry_snapshot():
+    """Снимок состояния после шага; после публикации не изменяется"""
+    return {
+        "tick": engine.tick,
+        "time": engine.time,
+        "x": round(engine.x, 0),
+        "y": round(engine.y, 0),
+        "speed": engine.speed,
+        "direction": engine.direction,
+    }
 
 
 def update_position():
-    """Обновление позиции с учетом направлений света"""
-    now = time.time()
-    delta = now - state["last_update"]
+    """Продвижение симуляции до текущего момента реального времени"""
+    with physics_lock:
+        now = time.monotonic()
+        behind = int((now - state["started"] - engine.time) / engine.dt)
+        if behind > MAX_CATCHUP_STEPS:
+            # часы симуляции сдвигаются, а не прогоняются сотни шагов подряд
+            state["started"] += (behind - MAX_CATCHUP_STEPS) * engine.dt
+        sim_time = now - state["started"]
+        if fleet.advance_to(sim_time):
+            publish_fleet()
+        if engine.advance_to(sim_time):
+            telemetry_hub.publish(telemetry_snapshot())
+
+
+telemetry_hub.publish(telemetry_snapshot())
+
+
+def latest_snapshot():
+    return telemetry_hub.latest()[1]
+
+
+def _physics_ticker():
+    # шаги идут с фиксированной частотой 1/dt независимо от запросов;
+    # обработчики только читают последний опубликованный снимок
+    while True:
+        update_position()
+        next_tick = state["started"] + (engine.tick + 1) * engine.dt
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def start_physics():
+    """Запуск потока физики (один раз на процесс)"""
+    # сервер мог долго простаивать до первого запроса: догоняем часы сразу
+    # (не больше MAX_CATCHUP_STEPS шагов), чтобы этот запрос не получил
+    # снимок момента импорта
+    update_position()
+    with physics_lock:
+        if state.get("ticker") is None:
+            state["ticker"] = threading.Thread(
+                target=_physics_ticker, name="physics", daemon=True
+            )
+            state["ticker"].start()
+
+
+@app.before_request
+def ensure_physics():
+    # под WSGI-сервером блок __main__ не выполняется, поэтому поток
+    # запускается первым запросом
+    if PHYSICS_THREAD and state.get("ticker") is None:
+        start_physics()
+
+
+# Готовые ответы с картой: ключ -> (ETag, тело, тело в gzip или None);
+# карта не меняется, поэтому тело строится и сжимается один раз
+_config_cache = {}
+
+
+def cached_response(key, build, mimetype, compress=True):
+    """Ответ с кэшированным телом (build() -> bytes), ETag/If-None-Match и gzip
+
+    С key=None тело не кэшируется (например, произвольный диапазон
+    препятствий), ETag и сжатие работают так же.
+    """
+    entry = _config_cache.get(key)
+    if entry is None:
+        body = build()
+        etag = hashlib.sha1(body).hexdigest()[:20]
+        entry = (etag, body, gzip.compress(body, 6) if compress else None)
+        if key is not None:
+            _config_cache[key] = entry
+    etag, body, compressed = entry
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif compressed is not None and request.accept_encodings["gzip"]:
+        response = Response(compressed, mimetype=mimetype)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    # клиент хранит карту у себя и каждый раз сверяет ETag
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def cached_json(key, build):
+    return cached_response(
+        key,
+        lambda: json.dumps(build(), separators=(",", ":")).encode("utf-8"),
+        "application/json",
+    )
+
+
+def wants_binary():
+    # двоичный ответ - только если клиент явно предпочёл его JSON
+    accepted = request.accept_mimetypes.best_match(
+        ("application/json", wire.CONTENT_TYPE)
+    )
+    return accepted == wire.CONTENT_TYPE
+
+
+def binary_response(body, status=200):
+    return Response(body, status=status, mimetype=wire.CONTENT_TYPE)
+
+
+def _is_number(value):
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
 
-    if state["speed"] > 0:
-        state["trail"].append((state["x"], state["y"]))
 
-        # Преобразование в математические координаты
-        math_angle = math.radians(90 - state["direction"])
-        distance = state["speed"] * delta
+def _is_stamps(value):
+    # отметки (создание, передача, обработка) события в трассе команды
+    return isinstance(value, list) and len(value) == 3 and all(map(_is_number, value))
 
-        step_size = 2
-        steps = max(1, int(distance // step_size))
-        dx_step = distance * math.cos(math_angle) / steps
-        dy_step = -distance * math.sin(math_angle) / steps
 
-        for _ in range(steps):
-            new_x = state["x"] + dx_step
-            new_y = state["y"] + dy_step
+def valid_command(command):
+    """Команда {"speed", "direction", "trace"} с конечными числами в полях
 
-            new_x = max(0, min(new_x, CONFIG["field_width"]))
-            new_y = max(0, min(new_y, CONFIG["field_height"]))
+    Также проверяется трасса: observe_control_trace считает по ней задержки.
+    """
+    if not isinstance(command, dict):
+        return False
+    if not _is_number(command.get("speed", 0)):
+        return False
+    if not _is_number(command.get("direction", 0)):
+        return False
+    trace = command.get("trace", {})
+    return (
+        isinstance(trace, dict)
+        and all(
+            _is_stamps(trace[key]) for key in ("sample", "command") if trace.get(key)
+        )
+        and all(
+            trace.get(key) is None or _is_number(trace[key]) for key in ("sent", "tick")
+        )
+    )
+
+
+def velocity_command():
+    """Команда /set_velocity из JSON или двоичного тела; None, если тело испорчено"""
+    if request.mimetype == wire.CONTENT_TYPE:
+        try:
+            data = wire.unpack_velocity(request.get_data())
+        except struct.error:
+            return None
+    else:
+        data = request.get_json(silent=True)
+    return data if valid_command(data) else None
+
+
+def bad_command():
+    return jsonify({"error": "Malformed command"}), 400
 
-            if is_collision(new_x, new_y):
-                state["speed"] = 0.0
-                break
 
-            state["x"] = new_x
-            state["y"] = new_y
+def command_accepted():
+    # на двоичную команду отвечаем без тела
+    if request.mimetype == wire.CONTENT_TYPE:
+        return Response(status=204)
+    return jsonify({"status": "success"})
+
 
-    state["last_update"] = now
+def config_header():
+    header = {key: value for key, value in CONFIG.items() if key != "obstacles"}
+    header["obstacle_count"] = len(CONFIG["obstacles"])
+    return header
 
 
 @app.route("/config")
 def get_config():
-    return jsonify(CONFIG)
+    """Карта шахты; с obstacles=0 - без препятствий (их отдаёт /obstacles)
+
+    Полная карта кэшируется, только если препятствия помещаются в одну
+    часть /obstacles: большую карту клиенты загружают частями, и её
+    препятствия хранятся в кэше один раз - в частях.
+    """
+    if request.args.get("obstacles") == "0":
+        return cached_json("header", config_header)
+    small = len(CONFIG["obstacles"]) <= OBSTACLE_CHUNK_LIMIT
+    return cached_json("config" if small else None, lambda: CONFIG)
+
+
+@app.route("/obstacles")
+def get_obstacles():
+    """Часть списка препятствий: count штук начиная с start
+
+    Кэшируются только части по OBSTACLE_CHUNK_LIMIT с выровненным началом
+    (так их запрашивают клиенты), поэтому каждое препятствие большой карты
+    есть в кэше один раз (ещё раз - в сжатом gzip теле).
+    """
+    start = max(request.args.get("start", 0, type=int), 0)
+    count = request.args.get("count", OBSTACLE_CHUNK_LIMIT, type=int)
+    count = min(max(count, 1), OBSTACLE_CHUNK_LIMIT)
+    obstacles = CONFIG["obstacles"]
+    aligned = count == OBSTACLE_CHUNK_LIMIT and start % count == 0
+    return cached_json(
+        ("obstacles", start) if aligned else None,
+        lambda: {
+            "start": start,
+            "total": len(obstacles),
+            "obstacles": obstacles[start : start + count],
+        },
+    )
+
+
+@app.route("/map.png")
+def get_map_image():
+    """Картинка препятствий карты; downsample - уменьшение (степень двойки)
+
+    Большие карты уменьшаются как минимум до MAP_IMAGE_MAX_PIXELS пикселей.
+    """
+    downsample = max(
+        request.args.get("downsample", 1, type=int), map_downsample(CONFIG)
+    )
+    # только степени двойки, чтобы кэш картинок оставался маленьким
+    downsample = 2 ** min(max(downsample.bit_length() - 1, 0), 6)
+    return cached_response(
+        ("map.png", downsample),
+        lambda: render_map_png(CONFIG, downsample),
+        "image/png",
+        compress=False,
+    )
 
 
 @app.route("/status")
 def get_status():
-    update_position()
-    # time.sleep(0.4)
+    snapshot = latest_snapshot()
+
+    # с курсором since отдаются только новые точки траектории
+    since = request.args.get("since", type=int)
+    with physics_lock:
+        trail, trail_seq, trail_reset = engine.trail.since(
+            0 if since is None else since
+        )
     return jsonify(
         {
-            "x": round(state["x"], 0),
-            "y": round(state["y"], 0),
-            "speed": state["speed"],
-            "direction": state["direction"],
+            "x": snapshot["x"],
+            "y": snapshot["y"],
+            "speed": snapshot["speed"],
+            "direction": snapshot["direction"],
             "points": state["points"],
-            "trail": state["trail"],
+            "trail": to_json_points(trail),
+            "trail_seq": trail_seq,
+            "trail_reset": trail_reset or since is None,
         }
     )
 
 
 @app.route("/position")
 def get_position():
-    update_position()
-    return jsonify(
-        {
-            "x": round(state["x"], 0),
-            "y": round(state["y"], 0),
-        }
-    )
+    snapshot = latest_snapshot()
+    if wants_binary():
+        return binary_response(
+            wire.pack_position(snapshot["x"], snapshot["y"], snapshot["tick"])
+        )
+    return jsonify({"x": snapshot["x"], "y": snapshot["y"], "tick": snapshot["tick"]})
+
+
+# Поля /telemetry по умолчанию и все доступные поля
+TELEMETRY_FIELDS = ("tick", "time", "x", "y", "distances")
+TELEMETRY_ALL_FIELDS = ("tick", "time", "x", "y", "speed", "direction", "distances")
+
+# Дальности датчиков /telemetry, px: запрошенная округляется вверх до
+# ближайшей из них, большая - до наибольшей (индекс препятствий строит
+# таблицу кандидатов на каждую дальность и хранит её)
+SENSOR_RANGES = (10, 20, 30, 50, 100, 200)
+
+
+def sensor_range(value):
+    """Дальность из набора SENSOR_RANGES; None, если value не положительное число"""
+    if not math.isfinite(value) or value <= 0:
+        return None
+    return next((r for r in SENSOR_RANGES if r >= value), SENSOR_RANGES[-1])
+
+
+@app.route("/telemetry")
+def get_telemetry():
+    """Согласованный снимок: позиция, номер шага, время и расстояния датчиков
+
+    fields - список нужных полей через запятую, sectors - число секторов,
+    range - дальность датчиков (округляется по SENSOR_RANGES). Расстояния считаются для той же позиции,
+    что и возвращаемые координаты. В двоичном ответе (wire.TELEMETRY)
+    есть все поля, кроме distances, а расстояния - только если они запрошены.
+    """
+    fields = request.args.get("fields")
+    fields = TELEMETRY_FIELDS if fields is None else fields.split(",")
+    unknown = [field for field in fields if field not in TELEMETRY_ALL_FIELDS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    detect_range = sensor_range(request.args.get("range", 30.0, type=float))
+    if detect_range is None:
+        return jsonify({"error": "Invalid range"}), 400
+
+    snapshot = dict(latest_snapshot())
+
+    if "distances" in fields:
+        sectors = min(max(request.args.get("sectors", 6, type=int), 1), 360)
+        distances = OBSTACLE_INDEX.cast_rays(
+            ((snapshot["x"], snapshot["y"]),), detect_range, sectors
+        )
+        snapshot["distances"] = distances[0].tolist()
+
+    if wants_binary():
+        return binary_response(
+            wire.pack_telemetry(snapshot, snapshot.get("distances", ()))
+        )
+    return jsonify({field: snapshot[field] for field in fields})
 
 
 @app.route("/set_velocity", methods=["POST"])
 def set_velocity():
-    data = request.json
-    state["speed"] = float(data.get("speed", 0))
-    state["direction"] = float(data.get("direction", 0))
-    state["last_update"] = time.time()
-    return jsonify({"status": "success"})
+    data = velocity_command()
+    if data is None:
+        return bad_command()
+    # новая скорость действует со следующего шага потока физики
+    with physics_lock:
+        engine.set_velocity(data.get("speed", 0), data.get("direction", 0))
+        actuated, tick = time.monotonic(), engine.tick
+        telemetry_hub.publish(telemetry_snapshot())
+    if "trace" in data:
+        observe_control_trace(metrics, data["trace"], actuated, tick)
+    return command_accepted()
+
+
+@app.route("/metrics", methods=["GET", "POST"])
+def get_metrics():
+    """Метрики в текстовом формате Prometheus
+
+    POST принимает снимок статистики шины сообщений от диспетчера сущностей
+    (MetricsRegistry.to_dict); испорченный снимок - ответ 400.
+    """
+    if request.method == "POST":
+        try:
+            bus_metrics = MetricsRegistry.from_dict(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid metrics: {e}"}), 400
+        state["bus_metrics"] = bus_metrics
+        return jsonify({"status": "success"})
+
+    metrics.set("simulation_tick", (), engine.tick)
+    metrics.set("stream_subscribers", (), telemetry_hub.subscribers)
+    text = metrics.render()
+    if state.get("bus_metrics") is not None:
+        text += state["bus_metrics"].render()
+    return Response(text, mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/add_point/<point_type>", methods=["POST"])
@@ -142,30 +504,32 @@ def add_point(point_type):
         return jsonify({"error": "Invalid point type"}), 400
 
     data = request.json
-    state["points"].append(
-        {
-            "type": point_type,
-            "x": float(data["x"]),
-            "y": float(data["y"]),
-            "timestamp": time.time(),
-        }
-    )
+    point = {
+        "type": point_type,
+        "x": float(data["x"]),
+        "y": float(data["y"]),
+        "timestamp": time.time(),
+    }
+    # список точек не меняется на месте: читатели берут его без блокировки
+    with physics_lock:
+        state["points"] = state["points"] + [point]
+        state["points_seq"] += 1
     return jsonify({"status": "success"})
 
 
 @app.route("/clear_points", methods=["POST"])
 def clear_points():
-    state["points"].clear()
+    with physics_lock:
+        state["points"] = []
+        state["points_seq"] += 1
     return jsonify({"status": "success"})
 
 
 @app.route("/reset_position", methods=["POST"])
 def reset_position():
-    state["x"] = CONFIG["start_position"][0]
-    state["y"] = CONFIG["start_position"][1]
-    state["speed"] = 0.0
-    state["direction"] = 0.0
-    state["trail"] = []
+    with physics_lock:
+        engine.reset()
+        telemetry_hub.publish(telemetry_snapshot())
     return jsonify({"status": "success"})
 
 
@@ -175,10 +539,10 @@ def load_points():
     if not isinstance(data, list):
         return jsonify({"error": "Invalid format"}), 400
 
-    state["points"] = []
+    points = []
     for item in data:
         if "type" in item and "x" in item and "y" in item:
-            state["points"].append(
+            points.append(
                 {
                     "type": item["type"],
                     "x": float(item["x"]),
@@ -186,9 +550,264 @@ def load_points():
                     "timestamp": time.time(),
                 }
             )
+    with physics_lock:
+        state["points"] = points
+        state["points_seq"] += 1
     return jsonify({"status": "success"})
 
 
+# Парк АРПБТ на той же карте: у каждой машины свои маршруты /vehicles/<номер>/...
+fleet = FleetEngine(CONFIG, dt=engine.dt)
+
+# Снимок парка (FleetSnapshot) публикуется после каждого шага, добавления,
+# удаления и возврата машины; запросы на чтение берут его без блокировки.
+# Команды снимок не обновляют: новые скорость и направление видны после
+# ближайшего шага (через dt)
+state["fleet"] = fleet.snapshot()
+
+
+def publish_fleet():
+    """Новый снимок парка; вызывается под physics_lock"""
+    state["fleet"] = fleet.snapshot()
+
+
+def unknown_vehicle():
+    return jsonify({"error": "Unknown vehicle"}), 404
+
+
+@app.route("/vehicles", methods=["GET", "POST"])
+def vehicles():
+    """Список машин парка; POST добавляет машину (в точку x, y или на старт)"""
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        with physics_lock:
+            vehicle_id = fleet.add_vehicle(data.get("x"), data.get("y"))
+            publish_fleet()
+        return jsonify({"id": vehicle_id})
+    snapshot = state["fleet"]
+    return jsonify([snapshot.vehicle(vehicle_id) for vehicle_id in snapshot.ids])
+
+
+@app.route("/vehicles/<int:vehicle_id>", methods=["GET", "DELETE"])
+def vehicle(vehicle_id):
+    if request.method == "DELETE":
+        with physics_lock:
+            if vehicle_id not in fleet:
+                return unknown_vehicle()
+            fleet.remove_vehicle(vehicle_id)
+            publish_fleet()
+        return jsonify({"status": "success"})
+    snapshot = state["fleet"]
+    if vehicle_id not in snapshot:
+        return unknown_vehicle()
+    return jsonify(snapshot.vehicle(vehicle_id))
+
+
+@app.route("/vehicles/<int:vehicle_id>/config")
+def vehicle_config(vehicle_id):
+    # карта общая; адрес нужен, чтобы сущности машины работали с базовым адресом
+    if vehicle_id not in state["fleet"]:
+        return unknown_vehicle()
+    return get_config()
+
+
+@app.route("/vehicles/<int:vehicle_id>/obstacles")
+def vehicle_obstacles(vehicle_id):
+    if vehicle_id not in state["fleet"]:
+        return unknown_vehicle()
+    return get_obstacles()
+
+
+@app.route("/vehicles/<int:vehicle_id>/position")
+def vehicle_position(vehicle_id):
+    snapshot = state["fleet"]
+    if vehicle_id not in snapshot:
+        return unknown_vehicle()
+    x, y = snapshot.position(vehicle_id)
+    x, y, tick = round(x, 0), round(y, 0), snapshot.tick
+    if wants_binary():
+        return binary_response(wire.pack_position(x, y, tick))
+    return jsonify({"x": x, "y": y, "tick": tick})
+
+
+@app.route("/vehicles/<int:vehicle_id>/set_velocity", methods=["POST"])
+def vehicle_set_velocity(vehicle_id):
+    data = velocity_command()
+    if data is None:
+        return bad_command()
+    with physics_lock:
+        if vehicle_id not in fleet:
+            return unknown_vehicle()
+        fleet.set_velocity(vehicle_id, data.get("speed", 0), data.get("direction", 0))
+        actuated, tick = time.monotonic(), fleet.tick
+    if "trace" in data:
+        observe_control_trace(metrics, data["trace"], actuated, tick)
+    return command_accepted()
+
+
+def _is_vehicle_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def batch_command(data):
+    """(команды [(номер машины, команда)], номера машин) из JSON-пакета;
+    None, если пакет испорчен"""
+    if not isinstance(data, dict):
+        return None
+    commands = data.get("commands", [])
+    vehicle_ids = data.get("positions", [])
+    if not isinstance(commands, list) or not isinstance(vehicle_ids, list):
+        return None
+    if not all(
+        valid_command(command) and _is_vehicle_id(command.get("id"))
+        for command in commands
+    ):
+        return None
+    if not all(_is_vehicle_id(vehicle_id) for vehicle_id in vehicle_ids):
+        return None
+    return [(command["id"], command) for command in commands], vehicle_ids
+
+
+@app.route("/vehicles/batch", methods=["POST"])
+def vehicles_batch():
+    """Команды нескольким машинам и их позиции за один запрос
+
+    JSON: {"commands": [{"id", "speed", "direction", "trace"}], "positions": [id]},
+    ответ - {"positions": [{"id", "x", "y", "tick"}]}. Двоичный формат -
+    wire.pack_batch и wire.pack_positions. Команды применяются до чтения
+    позиций; неизвестные машины пропускаются.
+    """
+    if request.mimetype == wire.CONTENT_TYPE:
+        try:
+            commands, vehicle_ids = wire.unpack_batch(request.get_data())
+        except struct.error:
+            return bad_command()
+        if not all(valid_command(command) for _, command in commands):
+            return bad_command()
+    else:
+        parsed = batch_command(request.get_json(silent=True))
+        if parsed is None:
+            return bad_command()
+        commands, vehicle_ids = parsed
+
+    traces = []
+    if commands:
+        with physics_lock:
+            for vehicle_id, command in commands:
+                if vehicle_id in fleet:
+                    fleet.set_velocity(
+                        vehicle_id, command.get("speed", 0), command.get("direction", 0)
+                    )
+                    if "trace" in command:
+                        traces.append(command["trace"])
+            actuated, actuated_tick = time.monotonic(), fleet.tick
+    # команды не меняют позиций, поэтому позиции берутся из снимка
+    snapshot = state["fleet"]
+    tick = snapshot.tick
+    positions = []
+    for vehicle_id in vehicle_ids:
+        if vehicle_id in snapshot:
+            x, y = snapshot.position(vehicle_id)
+            positions.append((vehicle_id, round(x, 0), round(y, 0), tick))
+    for trace in traces:
+        observe_control_trace(metrics, trace, actuated, actuated_tick)
+
+    if wants_binary():
+        return binary_response(wire.pack_positions(positions))
+    return jsonify(
+        {
+            "positions": [
+                {"id": vehicle_id, "x": x, "y": y, "tick": tick}
+                for vehicle_id, x, y, tick in positions
+            ]
+        }
+    )
+
+
+@app.route("/vehicles/<int:vehicle_id>/reset_position", methods=["POST"])
+def vehicle_reset_position(vehicle_id):
+    with physics_lock:
+        if vehicle_id not in fleet:
+            return unknown_vehicle()
+        fleet.reset(vehicle_id)
+        publish_fleet()
+    return jsonify({"status": "success"})
+
+
+@app.route("/plan_route", methods=["POST"])
+def get_plan_route():
+    """Маршрут от старта через контрольные точки к финишу в формате /load_points
+
+    Тело запроса - необязательный список контрольных точек {"x": ..., "y": ...}.
+    """
+    checkpoints = request.get_json(silent=True)
+    if checkpoints is None:
+        if request.get_data():
+            return jsonify({"error": "Invalid format"}), 400
+        checkpoints = []
+    if not isinstance(checkpoints, list) or not all(
+        isinstance(point, dict)
+        and _is_number(point.get("x"))
+        and _is_number(point.get("y"))
+        for point in checkpoints
+    ):
+        return jsonify({"error": "Invalid format"}), 400
+    route = plan_route(CONFIG, checkpoints)
+    if route is None:
+        return jsonify({"error": "Route not found"}), 422
+    return jsonify(route)
+
+
+@app.route("/stream")
+def stream():
+    """Поток телеметрии (Server-Sent Events), рассылаемый по шагам симулятора
+
+    rate - максимальная частота сообщений для этого клиента, Гц;
+    trail=1 - добавлять в сообщения новые точки траектории и список точек.
+    """
+    rate = min(max(request.args.get("rate", 20, type=float), 0.1), 1 / engine.dt)
+    with_trail = request.args.get("trail", 0, type=int) == 1
+    interval = 1 / rate
+
+    def generate():
+        with telemetry_hub.subscription():
+            version = None
+            sent_version = None
+            trail_seq = -1  # первое сообщение всегда содержит всю траекторию
+            points_seq = None
+            next_send = time.monotonic()
+            while True:
+                version, snapshot = telemetry_hub.wait(version, timeout=interval)
+                if snapshot is None or version == sent_version:
+                    continue
+                sent_version = version
+                message = dict(snapshot)
+                if with_trail:
+                    with physics_lock:
+                        trail, trail_seq, trail_reset = engine.trail.since(trail_seq)
+                    message["trail"] = to_json_points(trail)
+                    message["trail_seq"] = trail_seq
+                    message["trail_reset"] = trail_reset
+                    if points_seq != state["points_seq"]:
+                        points_seq = state["points_seq"]
+                        message["points"] = state["points"]
+                yield format_sse(message, event_id=snapshot["tick"])
+
+                # ограничение частоты для этого клиента
+                next_send += interval
+                delay = next_send - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_send = time.monotonic()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/")
 def index():
     return render_template_string(
@@ -243,6 +862,16 @@ def index():
             let canvas, ctx;
             let currentMode = 'waypoint';
             let fieldConfig = null;
+            let mapLayer;  // статичный слой: препятствия, старт и финиш
+            let trailLayer, trailCtx;  // слой с уже нарисованной траекторией
+            let trailLast = null;  // последняя нарисованная точка траектории
+            let latestStatus = null;  // последний полученный снимок телеметрии
+            let points = [];
+            let frameScheduled = false;
+            // перерисовывается только изменившаяся область холста
+            let dirty = null;  // [x0, y0, x1, y1] или null
+            let fullRedraw = true;
+            let drawnCar = null;  // положение и область машины на холсте
 
             window.onload = function() {
                 canvas = document.getElementById('field');
@@ -260,88 +889,195 @@ def index():
                     });
                 });
 
-                fetch('/config')
-                    .then(r => r.json())
+                loadConfig()
                     .then(cfg => {
                         fieldConfig = cfg;
                         canvas.width = cfg.field_width;
                         canvas.height = cfg.field_height;
-                        requestAnimationFrame(update);
+                        trailLayer = document.createElement('canvas');
+                        trailLayer.width = cfg.field_width;
+                        trailLayer.height = cfg.field_height;
+                        trailCtx = trailLayer.getContext('2d');
+                        return drawMapLayer(cfg);
                     })
+                    .then(connectTelemetry)
                     .catch(err => console.error('Ошибка загрузки:', err));
             };
 
-            async function update() {
-                if (!fieldConfig) return;
-                
-                try {
-                    const res = await fetch('/status');
-                    const status = await res.json();
-                    
-                    ctx.clearRect(0, 0, canvas.width, canvas.height);
-                    drawObstacles();
-                    drawSpecialMarkers();
-                    drawTrail(status.trail);
-                    drawCar(status.x, status.y, status.direction);
-                    drawPoints(status.points);
-                    updateStatusDisplay(status);
-                    
-                } catch(err) {
-                    console.error('Ошибка обновления:', err);
+            async function loadConfig() {
+                const cfg = await (await fetch('/config?obstacles=0')).json();
+                cfg.obstacles = [];
+                // большую карту рисуем по готовой картинке с сервера;
+                // ?map=image или ?map=vector в адресе страницы выбирают явно
+                const mode = new URLSearchParams(location.search).get('map');
+                cfg.useImage = mode === 'image' ||
+                    (mode !== 'vector' && cfg.obstacle_count > {{ image_threshold }});
+                if (cfg.useImage) return cfg;
+
+                // препятствия большой карты приходят частями по {{ chunk }}
+                while (cfg.obstacles.length < cfg.obstacle_count) {
+                    const r = await fetch(
+                        `/obstacles?start=${cfg.obstacles.length}&count={{ chunk }}`);
+                    const chunk = (await r.json()).obstacles;
+                    if (chunk.length === 0) break;
+                    cfg.obstacles.push(...chunk);
                 }
-                requestAnimationFrame(update);
+                return cfg;
             }
 
-            function drawSpecialMarkers() {
+            async function drawMapLayer(cfg) {
+                // карта не меняется: рисуем её один раз на отдельный слой
+                mapLayer = document.createElement('canvas');
+                mapLayer.width = cfg.field_width;
+                mapLayer.height = cfg.field_height;
+                const mapCtx = mapLayer.getContext('2d');
+                if (cfg.useImage) {
+                    const image = new Image();
+                    image.src = '/map.png';
+                    await image.decode();
+                    mapCtx.drawImage(image, 0, 0, mapLayer.width, mapLayer.height);
+                } else {
+                    drawObstacles(mapCtx, cfg.obstacles);
+                }
+                drawSpecialMarkers(mapCtx, cfg);
+            }
+
+            function connectTelemetry() {
+                // сервер сам присылает снимки по шагам симуляции,
+                // при обрыве EventSource переподключается автоматически
+                const source = new EventSource('/stream?rate=30&trail=1');
+                source.onmessage = event => {
+                    const status = JSON.parse(event.data);
+                    appendTrail(status);
+                    if (status.points) {
+                        points = status.points;
+                        fullRedraw = true;
+                    }
+                    latestStatus = status;
+                    if (!frameScheduled) {
+                        frameScheduled = true;
+                        requestAnimationFrame(render);
+                    }
+                };
+                source.onerror = err => console.error('Ошибка обновления:', err);
+            }
+
+            function unite(a, b) {
+                if (!a) return b;
+                if (!b) return a;
+                return [Math.min(a[0], b[0]), Math.min(a[1], b[1]),
+                        Math.max(a[2], b[2]), Math.max(a[3], b[3])];
+            }
+
+            function render() {
+                frameScheduled = false;
+                const status = latestStatus;
+
+                // машина со стрелкой направления - в пределах 22 px от центра
+                const car = {
+                    x: status.x, y: status.y, direction: status.direction,
+                    box: [status.x - 22, status.y - 22, status.x + 22, status.y + 22],
+                };
+                const carMoved = !drawnCar || drawnCar.x !== car.x ||
+                    drawnCar.y !== car.y || drawnCar.direction !== car.direction;
+
+                let region = dirty;
+                if (fullRedraw) {
+                    region = [0, 0, canvas.width, canvas.height];
+                } else if (carMoved) {
+                    region = unite(unite(region, drawnCar && drawnCar.box), car.box);
+                }
+                if (region) redrawRegion(region, status);
+                dirty = null;
+                fullRedraw = false;
+                drawnCar = car;
+                updateStatusDisplay(status);
+            }
+
+            function redrawRegion(region, status) {
+                const x = Math.max(0, Math.floor(region[0]));
+                const y = Math.max(0, Math.floor(region[1]));
+                const w = Math.min(canvas.width, Math.ceil(region[2])) - x;
+                const h = Math.min(canvas.height, Math.ceil(region[3])) - y;
+                if (w <= 0 || h <= 0) return;
+
+                ctx.save();
+                ctx.beginPath();
+                ctx.rect(x, y, w, h);
+                ctx.clip();
+                ctx.clearRect(x, y, w, h);
+                ctx.drawImage(mapLayer, x, y, w, h, x, y, w, h);
+                ctx.drawImage(trailLayer, x, y, w, h, x, y, w, h);
+                drawCar(status.x, status.y, status.direction);
+                drawPoints(points);
+                ctx.restore();
+            }
+
+            function drawSpecialMarkers(c, cfg) {
                 // Стартовая зона
-                ctx.fillStyle = '#d3d3d3';
-                ctx.fillRect(
-                    fieldConfig.start_position[0] - 5,
-                    fieldConfig.start_position[1] - 5,
+                c.fillStyle = '#d3d3d3';
+                c.fillRect(
+                    cfg.start_position[0] - 5,
+                    cfg.start_position[1] - 5,
                     10, 10
                 );
 
                 // Конечная точка
-                ctx.fillStyle = '#87CEEB';
-                ctx.fillRect(
-                    fieldConfig.end_position[0] - 5,
-                    fieldConfig.end_position[1] - 5,
+                c.fillStyle = '#87CEEB';
+                c.fillRect(
+                    cfg.end_position[0] - 5,
+                    cfg.end_position[1] - 5,
                     10, 10
                 );
             }
 
-            function drawObstacles() {
-                fieldConfig.obstacles.forEach(obs => {
-                    ctx.fillStyle = '#808080';
-                    ctx.strokeStyle = '#000';
+            function drawObstacles(c, obstacles) {
+                c.fillStyle = '#808080';
+                c.strokeStyle = '#000';
+                obstacles.forEach(obs => {
                     const [type, pos, params] = obs;
                     const [x, y] = pos;
                     
                     if (type === 'circle') {
-                        ctx.beginPath();
-                        ctx.arc(x, y, params[0], 0, Math.PI*2);
-                        ctx.fill();
-                        ctx.stroke();
+                        c.beginPath();
+                        c.arc(x, y, params[0], 0, Math.PI*2);
+                        c.fill();
+                        c.stroke();
                     }
                     else if (type === 'rectangle') {
-                        ctx.fillRect(x, y, params[0], params[1]);
-                        ctx.strokeRect(x, y, params[0], params[1]);
+                        c.fillRect(x, y, params[0], params[1]);
+                        c.strokeRect(x, y, params[0], params[1]);
                     }
                 });
             }
 
-            function drawTrail(trail) {
-                if(trail.length < 2) return;
-                
-                ctx.strokeStyle = 'rgba(255, 0, 0, 0.3)';
-                ctx.lineWidth = 2;
-                ctx.beginPath();
-                ctx.moveTo(trail[0][0], trail[0][1]);
-                
-                for(let i = 1; i < trail.length; i++) {
-                    ctx.lineTo(trail[i][0], trail[i][1]);
+            function appendTrail(status) {
+                // новые точки дорисовываются на отдельный слой,
+                // а не перерисовываются с начала на каждом кадре
+                if(status.trail_reset) {
+                    trailCtx.clearRect(0, 0, trailLayer.width, trailLayer.height);
+                    trailLast = null;
+                    fullRedraw = true;
+                }
+
+                if(status.trail.length > 0) {
+                    trailCtx.strokeStyle = 'rgba(255, 0, 0, 0.3)';
+                    trailCtx.lineWidth = 2;
+                    trailCtx.beginPath();
+                    const first = trailLast || status.trail[0];
+                    trailCtx.moveTo(first[0], first[1]);
+                    let box = [first[0], first[1], first[0], first[1]];
+                    
+                    for(let i = 0; i < status.trail.length; i++) {
+                        const [x, y] = status.trail[i];
+                        trailCtx.lineTo(x, y);
+                        box = unite(box, [x, y, x, y]);
+                    }
+                    trailCtx.stroke();
+                    trailLast = status.trail[status.trail.length - 1];
+                    // с запасом на толщину линии
+                    dirty = unite(dirty, [box[0] - 2, box[1] - 2, box[2] + 2, box[3] + 2]);
                 }
-                ctx.stroke();
             }
 
             function drawCar(x, y, dir) {
@@ -463,9 +1199,13 @@ def index():
         </script>
     </body>
     </html>
-    """
+    """,
+        chunk=OBSTACLE_CHUNK_LIMIT,
+        image_threshold=MAP_IMAGE_THRESHOLD,
     )
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    start_physics()
+    # без debug: перезагрузчик запустил бы второй процесс со своей физикой
+    app.run(threaded=True)
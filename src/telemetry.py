@@ -0,0 +1,56 @@
+import json
+import threading
+from contextlib import contextmanager
+
+
+class TelemetryHub:
+    """Рассылка снимков телеметрии симулятора всем подписчикам
+
+    Симулятор публикует снимок после каждого шага физики, подписчики
+    блокируются в wait() до появления нового снимка, не опрашивая сервер.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._version = 0
+        self._snapshot = None
+        self.subscribers = 0
+
+    def publish(self, snapshot):
+        with self._cond:
+            self._version += 1
+            self._snapshot = snapshot
+            self._cond.notify_all()
+
+    def latest(self):
+        """Последний снимок и его версия"""
+        with self._cond:
+            return self._version, self._snapshot
+
+    def wait(self, version, timeout=None):
+        """Ожидание снимка новее version; возвращает (версия, снимок)
+
+        По истечении timeout возвращается текущий снимок, даже если он не менялся.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._version != version, timeout)
+            return self._version, self._snapshot
+
+    @contextmanager
+    def subscription(self):
+        """Учёт подписчика на время жизни потока"""
+        with self._cond:
+            self.subscribers += 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+
+def format_sse(payload, event_id=None):
+    """Сообщение в формате Server-Sent Events"""
+    message = f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
+    if event_id is not None:
+        message = f"id: {event_id}\n{message}"
+    return message
@@ -0,0 +1,127 @@
+import json
+
+import requests
+
+from src import wire
+
+# Адрес симулятора по умолчанию
+SIMULATOR_URL = "http://127.0.0.1:5000"
+
+# Сколько препятствий запрашивается за раз (совпадает с лимитом симулятора)
+OBSTACLE_CHUNK = 10000
+
+# Двоичный формат (src/wire.py) для /position, /telemetry и /set_velocity
+USE_BINARY = True
+
+# Адреса, которые не принимают двоичные команды (старый симулятор)
+_json_only = set()
+
+# Ответ сервера, который не принимает двоичную команду (Unsupported Media Type);
+# 400 - испорченная команда, её JSON-повтор ничего не исправит
+_UNSUPPORTED = (415,)
+
+_BINARY_ACCEPT = {"Accept": wire.CONTENT_TYPE}
+_BINARY_BODY = {"Content-Type": wire.CONTENT_TYPE}
+
+
+def iter_stream(rate=20, trail=False, url=SIMULATOR_URL, session=None, timeout=None):
+    """Поток снимков телеметрии из /stream (Server-Sent Events)
+
+    Генератор отдаёт словари с позицией, скоростью и направлением
+    с частотой не выше rate раз в секунду. timeout - сколько ждать
+    очередного сообщения, с (None - без ограничения).
+    """
+    http = session or requests
+    params = {"rate": rate, "trail": int(trail)}
+    with http.get(
+        f"{url}/stream", params=params, stream=True, timeout=timeout
+    ) as response:
+        response.raise_for_status()
+        data = []
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("data:"):
+                data.append(line[5:].lstrip())
+            elif not line and data:
+                # пустая строка завершает сообщение
+                yield json.loads("\n".join(data))
+                data = []
+
+
+def get_telemetry(
+    fields=None, sectors=6, detect_range=30, url=SIMULATOR_URL, session=None
+):
+    """Один согласованный снимок телеметрии из /telemetry
+
+    Позиция и расстояния до препятствий относятся к одному и тому же шагу
+    симуляции, поэтому отдельные запросы /position и /config не нужны.
+    """
+    http = session or requests
+    params = {"sectors": sectors, "range": detect_range}
+    if fields is not None:
+        params["fields"] = ",".join(fields)
+    headers = _BINARY_ACCEPT if USE_BINARY else None
+    response = http.get(f"{url}/telemetry", params=params, headers=headers)
+    response.raise_for_status()
+    if response.headers.get("Content-Type") != wire.CONTENT_TYPE:
+        return response.json()
+    telemetry = wire.unpack_telemetry(response.content)
+    fields = ("tick", "time", "x", "y", "distances") if fields is None else fields
+    return {field: telemetry[field] for field in fields}
+
+
+def get_position(url=SIMULATOR_URL, session=None):
+    """Позиция АРПБТ из /position: {"x", "y", "tick"}
+
+    Ответ запрашивается в двоичном формате; старый симулятор отвечает JSON.
+    """
+    http = session or requests
+    headers = _BINARY_ACCEPT if USE_BINARY else None
+    response = http.get(f"{url}/position", headers=headers)
+    response.raise_for_status()
+    if response.headers.get("Content-Type") == wire.CONTENT_TYPE:
+        return wire.unpack_position(response.content)
+    return response.json()
+
+
+def set_velocity(data, url=SIMULATOR_URL, session=None):
+    """Команда приводам {"speed", "direction", "trace"} в /set_velocity
+
+    Команда отправляется в двоичном формате; если симулятор его не понял,
+    она повторяется в JSON, и дальше этот адрес получает только JSON.
+    """
+    http = session or requests
+    if USE_BINARY and url not in _json_only:
+        response = http.post(
+            f"{url}/set_velocity", data=wire.pack_velocity(data), headers=_BINARY_BODY
+        )
+        if response.status_code not in _UNSUPPORTED:
+            response.raise_for_status()
+            return
+        _json_only.add(url)
+    response = http.post(f"{url}/set_velocity", json=data)
+    response.raise_for_status()
+
+
+def get_config(url=SIMULATOR_URL, session=None, chunk_size=OBSTACLE_CHUNK):
+    """Карта шахты из /config; препятствия загружаются частями из /obstacles
+
+    Ответы приходят сжатыми gzip, а большой список препятствий не собирается
+    сервером в один ответ.
+    """
+    http = session or requests
+    response = http.get(f"{url}/config", params={"obstacles": 0})
+    response.raise_for_status()
+    config = response.json()
+    total = config.pop("obstacle_count")
+    config["obstacles"] = []
+    while len(config["obstacles"]) < total:
+        response = http.get(
+            f"{url}/obstacles",
+            params={"start": len(config["obstacles"]), "count": chunk_size},
+        )
+        response.raise_for_status()
+        chunk = response.json()["obstacles"]
+        if not chunk:
+            break
+        config["obstacles"].extend(chunk)
+    return config
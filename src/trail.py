@@ -0,0 +1,136 @@
+import numpy as np
+
+# Начальный размер буфера траектории, точек
+DEFAULT_CAPACITY = 4096
+
+# Сколько выброшенных упрощением точек можно накопить до принудительной фиксации
+_MAX_DROPPED = 64
+
+
+class TrailBuffer:
+    """Траектория АРПБТ в заранее выделенном массиве float32
+
+    Каждая зафиксированная точка получает порядковый номер (seq), что позволяет
+    клиентам забирать только новые точки. При заданном max_points буфер
+    работает как кольцевой и хранит только последние точки. При tolerance > 0
+    точки, лежащие почти на одной прямой с соседними, не сохраняются
+    (упрощение в духе Дугласа-Пекера, выполняемое на лету). Последняя точка
+    при этом фиксируется только со следующей, поэтому при остановке
+    вызывается flush.
+    """
+
+    def __init__(self, max_points=None, tolerance=0.0, capacity=DEFAULT_CAPACITY):
+        if max_points is not None:
+            capacity = max_points
+        self.max_points = max_points
+        self.tolerance = tolerance
+        self._points = np.empty((capacity, 2), dtype=np.float32)
+        self._start_seq = 0  # номер самой старой хранимой точки
+        self._seq = 0  # номер следующей фиксируемой точки
+        self._pending = None  # последняя точка, ещё не прошедшая упрощение
+        self._dropped = []  # точки, выброшенные с момента последней фиксации
+        self._anchor = None  # последняя зафиксированная точка
+
+    def __len__(self):
+        return self._seq - self._start_seq
+
+    @property
+    def seq(self):
+        """Номер, с которого начнутся следующие точки (курсор для since)"""
+        return self._seq
+
+    def append(self, x, y):
+        if self.tolerance <= 0:
+            self._commit(x, y)
+            return
+
+        if self._pending is None or len(self) == 0:
+            if self._pending is not None:
+                self._commit(*self._pending)
+            self._pending = (x, y)
+            return
+
+        # можно ли выбросить отложенную точку, заменив её новой
+        ax, ay = self._anchor
+        candidates = self._dropped + [self._pending]
+        if len(candidates) <= _MAX_DROPPED and all(
+            _segment_distance(px, py, ax, ay, x, y) <= self.tolerance
+            for px, py in candidates
+        ):
+            self._dropped = candidates
+        else:
+            self._commit(*self._pending)
+            self._dropped = []
+        self._pending = (x, y)
+
+    def flush(self, x=None, y=None):
+        """Фиксация отложенной точки, а перед этим - точки (x, y), если задана
+
+        Повторный вызов с той же точкой ничего не добавляет.
+        """
+        if x is not None and (x, y) != self._pending and (x, y) != self._anchor:
+            self.append(x, y)
+        if self._pending is not None:
+            self._commit(*self._pending)
+            self._pending = None
+            self._dropped = []
+
+    def _commit(self, x, y):
+        capacity = len(self._points)
+        if self.max_points is None and len(self) == capacity:
+            # буфер без ограничения растёт удвоением
+            grown = np.empty((capacity * 2, 2), dtype=np.float32)
+            seqs = np.arange(self._start_seq, self._seq)
+            grown[seqs % len(grown)] = self._points[seqs % capacity]
+            self._points = grown
+            capacity = len(grown)
+        self._points[self._seq % capacity] = (x, y)
+        self._anchor = (x, y)
+        self._seq += 1
+        if len(self) > capacity:
+            self._start_seq = self._seq - capacity
+
+    def _ordered(self, first, last):
+        # точки с номерами first..last-1 в порядке добавления
+        return self._points[np.arange(first, last) % len(self._points)]
+
+    def since(self, seq):
+        """Точки начиная с номера seq: (массив точек, новый курсор, сброс)
+
+        Если точки с таким номером уже не хранятся (траектория очищена или
+        вытеснена из кольцевого буфера), возвращаются все хранимые точки
+        и признак сброса - клиенту нужно начать траекторию заново.
+        """
+        reset = seq < self._start_seq or seq > self._seq
+        first = self._start_seq if reset else seq
+        return self._ordered(first, self._seq), self._seq, reset
+
+    def clear(self):
+        # пропускаем один номер, чтобы любой старый курсор указывал на сброс
+        self._seq += 1
+        self._start_seq = self._seq
+        self._pending = None
+        self._dropped = []
+        self._anchor = None
+
+    def tolist(self, decimals=1):
+        """Все хранимые точки списком [[x, y], ...] для JSON"""
+        return to_json_points(self._ordered(self._start_seq, self._seq), decimals)
+
+
+def to_json_points(points, decimals=1):
+    """Преобразование массива точек float32 в список для JSON без лишних знаков"""
+    return points.astype(np.float64).round(decimals).tolist()
+
+
+def _segment_distance(px, py, ax, ay, bx, by):
+    # расстояние от точки P до отрезка AB
+    abx = bx - ax
+    aby = by - ay
+    length2 = abx * abx + aby * aby
+    if length2 == 0:
+        return ((px - ax) ** 2 + (py - ay) ** 2) ** 0.5
+    t = max(0.0, min(1.0, ((px - ax) * abx + (py - ay) * aby) / length2))
+    dx = px - (ax + t * abx)
+    dy = py - (ay + t * aby)
+    return (dx * dx + dy * dy) ** 0.5
@@ -0,0 +1,172 @@
+"""Двоичный формат частых сообщений симулятора: фиксированные структуры struct
+
+Клиент просит двоичный ответ заголовком Accept: application/x-arpbt и
+отправляет двоичную команду с Content-Type: application/x-arpbt. Без этих
+заголовков симулятор, как и раньше, работает с JSON. Числа - little-endian.
+"""
+
+import struct
+
+CONTENT_TYPE = "application/x-arpbt"
+
+# Позиция: x, y, номер шага
+POSITION = struct.Struct("<ddq")
+
+# Телеметрия: номер шага, время, x, y, скорость, направление, число
+# секторов; за ней - расстояния по секторам (double на каждый)
+TELEMETRY = struct.Struct("<qdddddH")
+
+# Команда приводам: скорость, направление, флаги полей трассы и сама трасса
+# (см. metrics.observe_control_trace): sample и command - по три отметки,
+# sent, tick. Поля, которых нет в трассе, нулевые, а их флаг не выставлен.
+VELOCITY = struct.Struct("<ddB3d3ddq")
+TRACE_SAMPLE, TRACE_COMMAND, TRACE_SENT, TRACE_TICK = 1, 2, 4, 8
+
+# Пакет /vehicles/batch: число команд и число запрошенных позиций, затем
+# команды (номер машины + VELOCITY) и номера машин (VEHICLE). Ответ - число
+# позиций и позиции (номер машины + POSITION).
+BATCH = struct.Struct("<HH")
+VEHICLE = struct.Struct("<q")
+COUNT = struct.Struct("<H")
+
+_NO_STAMPS = (0.0, 0.0, 0.0)
+
+
+def pack_position(x, y, tick):
+    return POSITION.pack(x, y, tick)
+
+
+def unpack_position(data):
+    x, y, tick = POSITION.unpack(data)
+    return {"x": x, "y": y, "tick": tick}
+
+
+def pack_telemetry(snapshot, distances=()):
+    """Снимок телеметрии (все поля) и расстояния датчиков, если они считались"""
+    header = TELEMETRY.pack(
+        snapshot["tick"],
+        snapshot["time"],
+        snapshot["x"],
+        snapshot["y"],
+        snapshot["speed"],
+        snapshot["direction"],
+        len(distances),
+    )
+    return header + struct.pack(f"<{len(distances)}d", *distances)
+
+
+def unpack_telemetry(data):
+    tick, sim_time, x, y, speed, direction, count = TELEMETRY.unpack_from(data)
+    distances = struct.unpack_from(f"<{count}d", data, TELEMETRY.size)
+    return {
+        "tick": tick,
+        "time": sim_time,
+        "x": x,
+        "y": y,
+        "speed": speed,
+        "direction": direction,
+        "distances": list(distances),
+    }
+
+
+def pack_velocity(data):
+    """Команда {"speed", "direction", "trace"} в двоичном виде"""
+    trace = data.get("trace") or {}
+    sample = trace.get("sample")
+    command = trace.get("command")
+    sent = trace.get("sent")
+    tick = trace.get("tick")
+    flags = 0
+    for value, flag in (
+        (sample, TRACE_SAMPLE),
+        (command, TRACE_COMMAND),
+        (sent, TRACE_SENT),
+        (tick, TRACE_TICK),
+    ):
+        if value is not None:
+            flags |= flag
+    return VELOCITY.pack(
+        data.get("speed", 0),
+        data.get("direction", 0),
+        flags,
+        *(sample or _NO_STAMPS),
+        *(command or _NO_STAMPS),
+        sent or 0.0,
+        tick or 0,
+    )
+
+
+def _unpack_velocity(data, offset=0):
+    values = VELOCITY.unpack_from(data, offset)
+    speed, direction, flags = values[:3]
+    command = {"speed": speed, "direction": direction}
+    if flags:
+        trace = {}
+        if flags & TRACE_SAMPLE:
+            trace["sample"] = list(values[3:6])
+        if flags & TRACE_COMMAND:
+            trace["command"] = list(values[6:9])
+        if flags & TRACE_SENT:
+            trace["sent"] = values[9]
+        if flags & TRACE_TICK:
+            trace["tick"] = values[10]
+        command["trace"] = trace
+    return command
+
+
+def unpack_velocity(data):
+    if len(data) != VELOCITY.size:
+        raise struct.error(f"команда должна занимать {VELOCITY.size} байт")
+    return _unpack_velocity(data)
+
+
+def pack_batch(commands=(), vehicle_ids=()):
+    """Запрос /vehicles/batch: команды [(номер машины, команда)] и номера машин"""
+    parts = [BATCH.pack(len(commands), len(vehicle_ids))]
+    for vehicle_id, command in commands:
+        parts.append(VEHICLE.pack(vehicle_id))
+        parts.append(pack_velocity(command))
+    parts.extend(VEHICLE.pack(vehicle_id) for vehicle_id in vehicle_ids)
+    return b"".join(parts)
+
+
+def unpack_batch(data):
+    """(команды [(номер машины, команда)], номера машин) из запроса"""
+    num_commands, num_ids = BATCH.unpack_from(data)
+    expected = (
+        BATCH.size
+        + num_commands * (VEHICLE.size + VELOCITY.size)
+        + num_ids * VEHICLE.size
+    )
+    if len(data) != expected:
+        raise struct.error(f"пакет должен занимать {expected} байт")
+    offset = BATCH.size
+    commands = []
+    for _ in range(num_commands):
+        (vehicle_id,) = VEHICLE.unpack_from(data, offset)
+        commands.append((vehicle_id, _unpack_velocity(data, offset + VEHICLE.size)))
+        offset += VEHICLE.size + VELOCITY.size
+    vehicle_ids = [vehicle_id for (vehicle_id,) in VEHICLE.iter_unpack(data[offset:])]
+    return commands, vehicle_ids
+
+
+def pack_positions(positions):
+    """Ответ /vehicles/batch: позиции [(номер машины, x, y, номер шага)]"""
+    return COUNT.pack(len(positions)) + b"".join(
+        VEHICLE.pack(vehicle_id) + POSITION.pack(x, y, tick)
+        for vehicle_id, x, y, tick in positions
+    )
+
+
+def unpack_positions(data):
+    """Позиции из ответа /vehicles/batch: {номер машины: позиция}"""
+    (count,) = COUNT.unpack_from(data)
+    record = VEHICLE.size + POSITION.size
+    positions = {}
+    for i in range(count):
+        offset = COUNT.size + i * record
+        (vehicle_id,) = VEHICLE.unpack_from(data, offset)
+        positions[vehicle_id] = unpack_position(
+            data[offset + VEHICLE.size : offset + record]
+        )
+    return positions
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Тесты импортируют модули как src.x, так же как скрипты в src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
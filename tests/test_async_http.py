@@ -0,0 +1,136 @@
+import asyncio
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.async_http import AsyncHttpClient, HttpError
+
+PAYLOAD = {"x": 1.5, "y": 2.0, "tick": 7}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _chunked(self, pieces, headers=()):
+        self.send_response(200)
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        for piece in pieces:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        body = json.dumps(PAYLOAD).encode()
+        if self.path == "/chunked":
+            self._chunked([body[:5], body[5:]])
+        elif self.path == "/gzip":
+            data = gzip.compress(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif self.path == "/gzip-chunked":
+            data = gzip.compress(body)
+            self._chunked([data[:10], data[10:]], [("Content-Encoding", "gzip")])
+        elif self.path.startswith("/stream"):
+            # строка разрезана между частями ответа
+            self._chunked([b'data: {"a"', b": 1}\n\n", b"data: 2\n", b"\n"])
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "9")
+            self.end_headers()
+            self.wfile.write(b"not found")
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        body = self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope="module")
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.mark.parametrize("path", ["/chunked", "/gzip", "/gzip-chunked"])
+def test_response_body(url, path):
+    async def main():
+        http = AsyncHttpClient()
+        try:
+            return await http.get_json(url + path)
+        finally:
+            await http.close()
+
+    assert run(main()) == PAYLOAD
+
+
+def test_post_json(url):
+    async def main():
+        http = AsyncHttpClient()
+        try:
+            return await http.post_json(url + "/echo", PAYLOAD)
+        finally:
+            await http.close()
+
+    assert run(main()) == PAYLOAD
+
+
+def test_error_status(url):
+    async def main():
+        http = AsyncHttpClient()
+        try:
+            await http.request("GET", url + "/missing")
+        finally:
+            await http.close()
+
+    with pytest.raises(HttpError) as error:
+        run(main())
+    assert error.value.status == 404
+    assert error.value.body == b"not found"
+
+
+def test_iter_lines(url):
+    async def main():
+        http = AsyncHttpClient()
+        try:
+            return [line async for line in http.iter_lines(url + "/stream")]
+        finally:
+            await http.close()
+
+    assert run(main()) == ['data: {"a": 1}', "", "data: 2", ""]
+
+
+def test_connections_reused(url):
+    async def main():
+        http = AsyncHttpClient()
+        for _ in range(5):
+            await http.get_json(url + "/chunked")
+        await http.close()
+        return http
+
+    http = run(main())
+    assert http.requests == 5
+    assert http.connections_opened == 1
@@ -0,0 +1,89 @@
+import pytest
+
+from src.engine import SimulationEngine, run_mission
+from src.geometry import CONTACT_GAP, get_obstacle_index
+from src.sensors_calc import calculate_obstacle_distances
+from src.simulation import CONFIG
+
+FIELD_SIZE = (CONFIG["field_width"], CONFIG["field_height"])
+
+# Прямоугольник ("rectangle", (320, 400), (200, 30)) из CONFIG
+WALL = [["rectangle", (320, 400), (200, 30)]]
+
+# Маршрут, на котором машина застревала в углу (320, 400) этого прямоугольника
+STUCK_ROUTE = [
+    {"type": "waypoint", "x": x, "y": y}
+    for x, y in (
+        (316, 36),
+        (388, 124),
+        (372, 316),
+        (300, 396),
+        (300, 444),
+        (540, 444),
+        (540, 380),
+        (476, 308),
+        (476, 236),
+        (516, 196),
+        (652, 92),
+        (691, 68),
+    )
+]
+
+
+def test_sweep_stops_short_of_contact():
+    index = get_obstacle_index(WALL, FIELD_SIZE)
+    contact = index.sweep(300, 410, 340, 410)
+    assert contact is not None
+    x = 300 + contact * 40
+    assert x == pytest.approx(320 - CONTACT_GAP)
+    assert not index.contains(x, 410)
+
+
+def test_sweep_many_matches_sweep():
+    index = get_obstacle_index(WALL, FIELD_SIZE)
+    starts = [(300, 410), (300, 390), (5, 5)]
+    ends = [(340, 410), (340, 390), (5, 5)]
+    contacts = index.sweep_many(starts, ends)
+    assert contacts[0] == index.sweep(300, 410, 340, 410)
+    assert contacts[1] == float("inf")
+    assert contacts[2] == float("inf")
+
+
+def test_sensors_see_obstacle_at_contact():
+    # точка касания из прогона миссии, датчики видят её округлённой
+    for x, y in ((320, 400), (round(319.99), round(400.34)), (320, 401)):
+        distances = calculate_obstacle_distances(x, y, WALL, FIELD_SIZE, 30)
+        # луч вправо-вниз (120 градусов) идёт вдоль/внутрь прямоугольника
+        assert distances[2] == 0.0
+
+
+def test_sensors_inside_obstacle_see_zero():
+    distances = calculate_obstacle_distances(400, 415, WALL, FIELD_SIZE, 30)
+    assert distances == [0.0] * 6
+    circle = [["circle", (100, 100), (20,)]]
+    distances = calculate_obstacle_distances(100, 110, circle, FIELD_SIZE, 30)
+    assert distances == [0.0] * 6
+
+
+def test_sensors_on_boundary_looking_away():
+    # у нижней границы прямоугольника луч вниз свободен, луч вверх упирается
+    distances = calculate_obstacle_distances(400, 430, WALL, FIELD_SIZE, 30)
+    assert distances[0] == 0.0
+    assert distances[3] == 30.0
+
+
+def test_engine_stops_outside_obstacle():
+    config = dict(CONFIG, obstacles=WALL)
+    engine = SimulationEngine(config)
+    engine.x, engine.y = 310, 410
+    engine.set_velocity(30, 90)
+    engine.run(20)
+    assert engine.collisions >= 1
+    assert engine.speed == 0
+    assert not get_obstacle_index(WALL, FIELD_SIZE).contains(engine.x, engine.y)
+
+
+def test_mission_does_not_stick_at_contact():
+    # раньше машина оставалась на границе прямоугольника до конца миссии
+    result = run_mission(CONFIG, STUCK_ROUTE)
+    assert result["collisions"] < 10
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from src.distance_field import load_distance_field
+from src.geometry import CONTACT_GAP, get_obstacle_index
+
+CONFIG = {
+    "field_width": 600,
+    "field_height": 300,
+    "start_position": (10, 10),
+    "end_position": (590, 290),
+    "obstacles": [
+        ["rectangle", (100, 100), (400, 20)],
+        ["circle", (300, 220), (30,)],
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def field(tmp_path_factory):
+    return load_distance_field(CONFIG, cache_dir=tmp_path_factory.mktemp("field"))
+
+
+def test_sweep_reaches_contact(field):
+    # движение вниз на верхнюю сторону прямоугольника (y = 100)
+    contact = field.sweep(200, 80, 200, 110)
+    assert contact is not None
+    assert 80 + contact * 30 == pytest.approx(100 - CONTACT_GAP, abs=1e-3)
+
+
+def test_sweep_free_path(field):
+    assert field.sweep(20, 20, 80, 20) is None
+
+
+def test_sweep_along_wall_exhausting_steps(field):
+    # 0.6 px над стеной шаги по полю короче 1 px: их не хватает на весь путь
+    assert field.sweep(110, 99.4, 490, 99.4) is None
+
+
+def test_sweep_away_from_obstacle(field):
+    assert field.sweep(200, 100, 200, 60) is None
+
+
+def test_sweep_matches_exact_index(field):
+    index = get_obstacle_index(CONFIG["obstacles"], (600, 300))
+    rng = np.random.default_rng(0)
+    compared = 0
+    while compared < 200:
+        x0, y0 = rng.uniform(0, 600), rng.uniform(0, 300)
+        if index.clearance([(x0, y0)], 2)[0] < 2:
+            continue
+        angle = rng.uniform(0, 2 * np.pi)
+        length = rng.uniform(1, 40)
+        x1, y1 = x0 + length * np.cos(angle), y0 + length * np.sin(angle)
+        exact = index.sweep(x0, y0, x1, y1)
+        if exact is None:
+            continue
+        raster = field.sweep(x0, y0, x1, y1)
+        assert raster is not None
+        assert abs(raster - exact) * length < 0.1
+        compared += 1
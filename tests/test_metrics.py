@@ -0,0 +1,49 @@
+import pytest
+
+from src.metrics import MetricsRegistry
+
+
+def sample_registry():
+    registry = MetricsRegistry()
+    registry.inc("bus_messages_total", (("source", "Sensors"),), 3)
+    registry.set("bus_queue_depth", (("queue", "Navigation"),), 2)
+    registry.observe("control_loop_latency_seconds", (), 0.004)
+    return registry
+
+
+def test_round_trip():
+    registry = sample_registry()
+    copy = MetricsRegistry.from_dict(registry.to_dict())
+    assert copy.render() == registry.render()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        None,
+        [],
+        {"counters": "x"},
+        {"counters": [["bus_total", [], "1"]]},
+        {"counters": [["bus_total", [], True]]},
+        {"counters": [["bus total", [], 1]]},
+        {"counters": [["bus_total", [["source"]], 1]]},
+        {"counters": [["bus_total", [["bad-label", "x"]], 1]]},
+        {"counters": [["bus_total", [["source", 1]], 1]]},
+        {"gauges": [["depth", []]]},
+        {"histograms": [["latency", [], {"buckets": [1], "counts": [1]}]]},
+        {
+            "histograms": [
+                ["latency", [], {"buckets": [2, 1], "counts": [0, 0, 0], "sum": 0}]
+            ]
+        },
+    ],
+)
+def test_from_dict_rejects_malformed(data):
+    with pytest.raises(ValueError):
+        MetricsRegistry.from_dict(data)
+
+
+def test_label_values_escaped():
+    registry = MetricsRegistry()
+    registry.set("depth", (("queue", 'a"b\nc'),), 1)
+    assert registry.render() == '# TYPE depth gauge\ndepth{queue="a\\"b\\nc"} 1\n'
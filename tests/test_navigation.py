@@ -0,0 +1,69 @@
+import queue
+import threading
+
+import pytest
+import requests
+
+from src import entities
+
+
+class FakeSimulator:
+    """Подмена iter_stream и get_position: отвечает status на /stream"""
+
+    def __init__(self, status):
+        self.status = status
+        self.polls = []  # потоки, из которых опрашивался /position
+
+    def iter_stream(self, rate, url, timeout):
+        response = requests.Response()
+        response.status_code = self.status
+        raise requests.exceptions.HTTPError(response=response)
+
+    def get_position(self, url, session):
+        self.polls.append(threading.current_thread())
+        return {"x": 1.0, "y": 2.0, "tick": len(self.polls)}
+
+
+@pytest.fixture
+def navigation(monkeypatch):
+    def start(status):
+        simulator = FakeSimulator(status)
+        monkeypatch.setattr(entities, "iter_stream", simulator.iter_stream)
+        monkeypatch.setattr(entities, "get_position", simulator.get_position)
+        events = queue.Queue()
+        entity = entities.Navigation(events)
+        entity.period = 0.01
+        entity._create_ipc()
+        entity.setup()
+        started.append(entity)
+        return entity, simulator, events
+
+    started = []
+    yield start
+    for entity in started:
+        entity._stop_flag.set()
+        entity._stream_thread.join(1)
+        entity.teardown()
+
+
+def test_no_stream_falls_back_to_tick(navigation):
+    entity, simulator, events = navigation(404)
+    entity._stream_thread.join(1)
+    assert not entity._stream_thread.is_alive()
+    entity.tick()
+    assert simulator.polls == [threading.current_thread()]
+    assert events.get_nowait().operation == "get_coordinates"
+
+
+def test_stream_error_keeps_single_writer(navigation):
+    entity, simulator, events = navigation(500)
+    entity._stop_flag.wait(0.1)
+    entity.tick()
+    entity.tick()
+    # поток жив и опрашивает сам, tick() в канал координат не пишет
+    assert entity._stream_thread.is_alive()
+    entity._stop_flag.set()
+    entity._stream_thread.join(1)
+    assert simulator.polls
+    assert all(thread is entity._stream_thread for thread in simulator.polls)
+    assert events.qsize() == len(simulator.polls)
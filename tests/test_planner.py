@@ -0,0 +1,36 @@
+from src.engine import run_mission
+from src.geometry import get_obstacle_index
+from src.planner import PLANNER_SAFE_DISTANCE, plan_route
+from src.simulation import CONFIG
+
+
+def test_route_is_followable():
+    route = plan_route(CONFIG)
+    assert route is not None
+    result = run_mission(CONFIG, route, controller={"cyber_obstacle": False})
+    assert result["success"]
+    assert result["collisions"] == 0
+
+
+def test_route_keeps_safe_distance_where_possible():
+    # между прямоугольниками (320, 400, 200, 30) и (320, 490, 200, 30) проход
+    # шириной 60 px: маршрут идёт посередине, а не вдоль одного из них
+    route = plan_route(CONFIG)
+    points = [CONFIG["start_position"]] + [(p["x"], p["y"]) for p in route]
+    samples = [
+        (x0 + (x1 - x0) * t / 20, y0 + (y1 - y0) * t / 20)
+        for (x0, y0), (x1, y1) in zip(points, points[1:])
+        for t in range(21)
+    ]
+    between = [(x, y) for x, y in samples if 330 <= x <= 510 and 430 < y < 490]
+    assert between
+    field_size = (CONFIG["field_width"], CONFIG["field_height"])
+    index = get_obstacle_index(CONFIG["obstacles"], field_size)
+    assert index.clearance(between, 64).min() >= PLANNER_SAFE_DISTANCE
+
+
+def test_checkpoints_in_route():
+    route = plan_route(CONFIG, [{"x": 100, "y": 200}])
+    checkpoints = [p for p in route if p["type"] == "checkpoint"]
+    assert checkpoints == [{"type": "checkpoint", "x": 100, "y": 200}]
+    assert (route[-1]["x"], route[-1]["y"]) == tuple(CONFIG["end_position"])
@@ -0,0 +1,72 @@
+import pytest
+
+from src.events import Event
+from src.metrics import MetricsRegistry
+from src.policy import MAX_SPEED, Policy, default_policy
+
+
+def velocity(speed, direction=90, source="ControlSystem"):
+    return Event(
+        source, "Servos", "set_velocity", {"speed": speed, "direction": direction}
+    )
+
+
+@pytest.fixture
+def policy():
+    return Policy(default_policy())
+
+
+def test_allows_listed_message(policy):
+    event = Event("Navigation", "ControlSystem", "get_coordinates", {"x": 1, "y": 2})
+    rule = policy.check(event)
+    assert policy.rules[rule] == ("Navigation", "ControlSystem", "get_coordinates")
+
+
+def test_allows_parameters_within_limits(policy):
+    assert policy.check(velocity(MAX_SPEED, -60)) is not None
+    assert policy.check(velocity(0, 360)) is not None
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        velocity(MAX_SPEED + 1),
+        velocity(-1),
+        velocity(10, 400),
+        velocity("fast"),
+        Event("ControlSystem", "Servos", "set_velocity", {"speed": 10}),
+        Event("ControlSystem", "Servos", "set_velocity", None),
+    ],
+)
+def test_denies_parameters_out_of_limits(policy, event):
+    assert policy.check(event) is None
+
+
+def test_denies_unknown_message(policy):
+    assert policy.check(velocity(10, source="Sensors")) is None
+    assert policy.check(Event("Drill", "Servos", "drilling", {})) is None
+
+
+def test_counters_exported_once(policy):
+    policy.check(velocity(10))
+    policy.check(velocity(10))
+    policy.check(velocity(100))
+    policy.check(Event("Drill", "Servos", "drilling", {}))
+    registry = MetricsRegistry()
+    policy.export(registry)
+    policy.export(registry)
+    labels = (
+        ("source", "ControlSystem"),
+        ("destination", "Servos"),
+        ("operation", "set_velocity"),
+    )
+    assert registry.counters[("policy_allowed_total", labels)] == 2
+    assert registry.counters[("policy_denied_total", labels)] == 1
+    unknown = ("policy_denied_total", (("rule", "unknown"),))
+    assert registry.counters[unknown] == 1
+
+
+def test_repeated_rules_rejected():
+    rule = ("Drill", "Servos", "drilling", {})
+    with pytest.raises(ValueError):
+        Policy([rule, rule])
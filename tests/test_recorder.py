@@ -0,0 +1,95 @@
+import numpy as np
+
+from src import control_systems_calc
+from src.engine import run_mission
+from src.planner import plan_route
+from src.recorder import (
+    _HEADER,
+    _RECORD,
+    LOG_MAGIC,
+    KIND_DECISION,
+    KIND_SAMPLE,
+    MissionRecorder,
+    load_log,
+    log_params,
+    record_distances,
+    replay,
+)
+from src.simulation import CONFIG
+
+CONTROLLER = {"safe_distance": 12, "cyber_obstacle": False}
+
+
+def record_mission(path, controller=CONTROLLER, max_speed=25):
+    with MissionRecorder(path, controller=controller, max_speed=max_speed) as recorder:
+        result = run_mission(
+            CONFIG,
+            plan_route(CONFIG),
+            max_time=20.0,
+            max_speed=max_speed,
+            controller=controller,
+            recorder=recorder,
+        )
+    return result
+
+
+def test_header_params(tmp_path):
+    path = tmp_path / "mission.log"
+    record_mission(path)
+    params = log_params(path)
+    assert params["max_speed"] == 25
+    assert params["controller"] == {
+        "stop_radius": 5,
+        "safe_distance": 12,
+        "num_sectors": 6,
+        "cyber_obstacle": False,
+    }
+
+
+def test_replay_matches_record(tmp_path, monkeypatch):
+    path = tmp_path / "mission.log"
+    result = record_mission(path)
+    log = load_log(path)
+    decisions = int(np.count_nonzero(log["kind"] == KIND_DECISION))
+    assert decisions == result["ticks"]
+
+    # параметры берутся из заголовка, а не из текущих значений по умолчанию
+    monkeypatch.setattr(control_systems_calc, "CYBER_OBSTACLE", True)
+    report = replay(path, security=lambda speed, direction: (speed, direction))
+    assert report["decisions"] == decisions
+    assert report["mismatches"] == 0
+    assert report["commands"] == decisions
+    assert report["command_mismatches"] == 0
+
+
+def test_replay_with_other_controller(tmp_path):
+    path = tmp_path / "mission.log"
+    record_mission(path)
+    report = replay(path, controller={"cyber_obstacle": True})
+    assert report["mismatches"] > 0
+
+
+def test_distances_beyond_max_sectors(tmp_path):
+    path = tmp_path / "mission.log"
+    distances = [float(i) for i in range(20)]
+    with MissionRecorder(path) as recorder:
+        recorder.sample(1.0, 1, 10.0, 20.0, distances)
+        recorder.sample(2.0, 2, 11.0, 21.0, distances[:3])
+    log = load_log(path)
+    samples = np.flatnonzero(log["kind"] == KIND_SAMPLE)
+    assert record_distances(log, samples[0]) == distances
+    assert record_distances(log, samples[1]) == distances[:3]
+    assert log["x"][samples[1]] == 11.0
+
+
+def test_version_1_log(tmp_path):
+    path = tmp_path / "old.log"
+    with MissionRecorder(path) as recorder:
+        recorder.sample(1.0, 1, 10.0, 20.0, [1.0, 2.0])
+    data = path.read_bytes()
+    offset = len(data) - _RECORD.size
+    path.write_bytes(_HEADER.pack(LOG_MAGIC, 1, _RECORD.size) + data[offset:])
+    assert log_params(path) == {}
+    log = load_log(path)
+    assert len(log) == 1
+    assert log["x"][0] == 10.0
@@ -0,0 +1,111 @@
+import pytest
+
+from src import simulation, wire
+from src.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def client():
+    return simulation.app.test_client()
+
+
+def test_plan_route(client):
+    response = client.post("/plan_route", json=[{"x": 100, "y": 200}])
+    assert response.status_code == 200
+    assert {"type": "checkpoint", "x": 100, "y": 200} in response.json
+
+
+def test_plan_route_without_body(client):
+    response = client.post("/plan_route")
+    assert response.status_code == 200
+    assert response.json[-1]["type"] == "waypoint"
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        [{"x": "a"}],
+        [{"x": 1}],
+        [{"x": 1, "y": None}],
+        [{"x": True, "y": 1}],
+        [[1, 2]],
+        {"x": 1, "y": 2},
+        "abc",
+    ],
+)
+def test_plan_route_rejects_malformed_checkpoints(client, body):
+    response = client.post("/plan_route", json=body)
+    assert response.status_code == 400
+
+
+def test_plan_route_rejects_broken_json(client):
+    response = client.post("/plan_route", data="[{", content_type="application/json")
+    assert response.status_code == 400
+
+
+def test_metrics_push(client):
+    registry = MetricsRegistry()
+    registry.inc("bus_messages_total", (("source", "Sensors"),), 5)
+    response = client.post("/metrics", json=registry.to_dict())
+    assert response.status_code == 200
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'bus_messages_total{source="Sensors"} 5' in text
+
+
+@pytest.mark.parametrize("body", [[1, 2], {"counters": [["x", [], "a"]]}, "abc"])
+def test_metrics_push_rejects_malformed(client, body):
+    response = client.post("/metrics", json=body)
+    assert response.status_code == 400
+
+
+def test_metrics_push_rejects_broken_json(client):
+    response = client.post("/metrics", data="{", content_type="application/json")
+    assert response.status_code == 400
+
+
+def test_set_velocity(client):
+    trace = {"sample": [1.0, 1.1, 1.2], "command": [1.3, 1.4, 1.5], "tick": 3}
+    response = client.post(
+        "/set_velocity", json={"speed": 0, "direction": 90, "trace": trace}
+    )
+    assert response.status_code == 200
+    assert simulation.engine.direction == 90
+
+
+def test_set_velocity_binary(client):
+    body = wire.pack_velocity({"speed": 0, "direction": 45})
+    response = client.post("/set_velocity", data=body, content_type=wire.CONTENT_TYPE)
+    assert response.status_code == 204
+    assert simulation.engine.direction == 45
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        [1, 2],
+        {"speed": "abc"},
+        {"speed": 1, "direction": None},
+        {"speed": True},
+        {"speed": 1, "trace": []},
+        {"speed": 1, "trace": {"sample": [1, 2]}},
+        {"speed": 1, "trace": {"tick": "x"}},
+    ],
+)
+@pytest.mark.parametrize("path", ["/set_velocity", "/vehicles/{id}/set_velocity"])
+def test_set_velocity_rejects_malformed(client, path, body):
+    vehicle_id = client.post("/vehicles", json={}).json["id"]
+    response = client.post(path.format(id=vehicle_id), json=body)
+    client.delete(f"/vehicles/{vehicle_id}")
+    assert response.status_code == 400
+
+
+def test_set_velocity_rejects_nan(client):
+    body = wire.pack_velocity({"speed": float("nan"), "direction": 0})
+    response = client.post("/set_velocity", data=body, content_type=wire.CONTENT_TYPE)
+    assert response.status_code == 400
+
+
+def test_batch_rejects_malformed(client):
+    body = {"commands": [{"id": 0, "speed": "abc"}]}
+    response = client.post("/vehicles/batch", json=body)
+    assert response.status_code == 400
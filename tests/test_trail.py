@@ -0,0 +1,76 @@
+from src.engine import SimulationEngine
+from src.simulation import CONFIG
+from src.trail import TrailBuffer
+
+
+def test_since_returns_new_points():
+    trail = TrailBuffer()
+    trail.append(0, 0)
+    trail.append(1, 1)
+    points, cursor, reset = trail.since(0)
+    assert points.tolist() == [[0, 0], [1, 1]]
+    assert not reset
+    trail.append(2, 2)
+    points, cursor, reset = trail.since(cursor)
+    assert points.tolist() == [[2, 2]]
+    assert cursor == 3
+    assert not reset
+    points, _, _ = trail.since(cursor)
+    assert len(points) == 0
+
+
+def test_since_after_clear_resets():
+    trail = TrailBuffer()
+    trail.append(0, 0)
+    _, cursor, _ = trail.since(0)
+    trail.clear()
+    trail.append(5, 5)
+    points, _, reset = trail.since(cursor)
+    assert reset
+    assert points.tolist() == [[5, 5]]
+
+
+def test_since_on_ring_buffer():
+    trail = TrailBuffer(max_points=3)
+    for i in range(5):
+        trail.append(i, 0)
+    points, cursor, reset = trail.since(0)
+    assert reset
+    assert points.tolist() == [[2, 0], [3, 0], [4, 0]]
+    trail.append(5, 0)
+    points, _, reset = trail.since(cursor)
+    assert not reset
+    assert points.tolist() == [[5, 0]]
+
+
+def test_simplification_drops_collinear_points():
+    trail = TrailBuffer(tolerance=0.5)
+    for i in range(10):
+        trail.append(i, 0)
+    trail.append(9, 5)
+    trail.flush()
+    points, _, _ = trail.since(0)
+    assert points.tolist() == [[0, 0], [9, 0], [9, 5]]
+
+
+def test_flush_commits_pending_point():
+    trail = TrailBuffer(tolerance=0.5)
+    for i in range(5):
+        trail.append(i, 0)
+    points, cursor, _ = trail.since(0)
+    assert points.tolist()[-1] != [4, 0]
+    trail.flush(5, 0)
+    points, cursor, _ = trail.since(cursor)
+    assert points.tolist()[-1] == [5, 0]
+    trail.flush(5, 0)
+    assert len(trail.since(cursor)[0]) == 0
+
+
+def test_engine_trail_ends_at_stop():
+    engine = SimulationEngine(CONFIG, trail_tolerance=0.5)
+    engine.set_velocity(20, 180)
+    engine.run(10)
+    engine.set_velocity(0, 180)
+    engine.step()
+    points, _, _ = engine.trail.since(0)
+    assert points[-1].tolist() == [engine.x, engine.y]
@@ -0,0 +1,84 @@
+import struct
+
+import pytest
+
+from src import wire
+
+
+def test_position_round_trip():
+    data = wire.pack_position(12.5, 300.25, 42)
+    assert len(data) == wire.POSITION.size
+    assert wire.unpack_position(data) == {"x": 12.5, "y": 300.25, "tick": 42}
+
+
+@pytest.mark.parametrize("distances", [(), (1.0, 2.5, 30.0, 0.0, 7.25, 9.0)])
+def test_telemetry_round_trip(distances):
+    snapshot = {
+        "tick": 7,
+        "time": 0.35,
+        "x": 20.0,
+        "y": 40.5,
+        "speed": 3.0,
+        "direction": 270.0,
+    }
+    data = wire.pack_telemetry(snapshot, distances)
+    assert wire.unpack_telemetry(data) == dict(snapshot, distances=list(distances))
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        {"speed": 10.0, "direction": 90.0},
+        {
+            "speed": 10.0,
+            "direction": -60.0,
+            "trace": {
+                "sample": [1.0, 1.5, 2.0],
+                "command": [2.5, 3.0, 3.5],
+                "sent": 4.0,
+                "tick": 0,
+            },
+        },
+        {"speed": 0.0, "direction": 0.0, "trace": {"sent": 4.0}},
+    ],
+)
+def test_velocity_round_trip(command):
+    data = wire.pack_velocity(command)
+    assert len(data) == wire.VELOCITY.size
+    assert wire.unpack_velocity(data) == command
+
+
+def test_velocity_wrong_size():
+    data = wire.pack_velocity({"speed": 1.0, "direction": 2.0})
+    with pytest.raises(struct.error):
+        wire.unpack_velocity(data[:-1])
+    with pytest.raises(struct.error):
+        wire.unpack_velocity(data + b"\0")
+
+
+def test_batch_round_trip():
+    commands = [
+        (3, {"speed": 5.0, "direction": 45.0}),
+        (8, {"speed": 1.0, "direction": 0.0, "trace": {"tick": 12}}),
+    ]
+    data = wire.pack_batch(commands, [3, 8, 11])
+    assert wire.unpack_batch(data) == (commands, [3, 8, 11])
+    assert wire.unpack_batch(wire.pack_batch()) == ([], [])
+
+
+def test_batch_wrong_size():
+    data = wire.pack_batch([(1, {"speed": 1.0, "direction": 0.0})], [1])
+    with pytest.raises(struct.error):
+        wire.unpack_batch(data[:-1])
+    with pytest.raises(struct.error):
+        wire.unpack_batch(b"\x01")
+
+
+def test_positions_round_trip():
+    positions = [(3, 10.0, 20.0, 5), (8, 30.5, 40.0, 5)]
+    data = wire.pack_positions(positions)
+    assert wire.unpack_positions(data) == {
+        3: {"x": 10.0, "y": 20.0, "tick": 5},
+        8: {"x": 30.5, "y": 40.0, "tick": 5},
+    }
+    assert wire.unpack_positions(wire.pack_positions([])) == {}